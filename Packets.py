@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 
-from checksum import check_checksum16, gen_checksum16
+from checksum import CHECKSUM_ALGOS, CRC32, XOR16, check_checksum, check_checksum16, gen_checksum, gen_checksum16
 
 
 @dataclass(frozen=True)
@@ -11,14 +11,24 @@ class Packet:
     full_pkt: bytes = field(init=False)
 
     # Check for data length/ack here too - Jesse
-    @staticmethod
-    def is_corrupt(pkt: bytes) -> bool:
-        if len(pkt) <= 2:
+    @classmethod
+    def is_corrupt(cls, pkt: bytes) -> bool:
+        algo = cls.checksum_algo_of(pkt)
+        if algo not in CHECKSUM_ALGOS:
             return True
 
-        # Last two bytes are the checksum
-        checksum = pkt[-2:]
-        return not check_checksum16(pkt[0:-2], checksum)
+        checksum_length = CHECKSUM_ALGOS[algo].length
+        if len(pkt) <= checksum_length:
+            return True
+
+        # Last bytes are the checksum
+        checksum = pkt[-checksum_length:]
+        return not check_checksum(pkt[0:-checksum_length], checksum, algo)
+
+    @staticmethod
+    def checksum_algo_of(pkt: bytes) -> int:
+        # The RDT 2.2 frames have no room to carry the algorithm, they always use the 16 bit XOR
+        return XOR16
 
     # Not sure if this is right - Jesse
     @staticmethod
@@ -46,19 +56,19 @@ class Packet:
 
     # --- CHANGED: make extract_data a static parser over raw bytes ---
     @staticmethod
-    def extract_data(pkt: bytes) -> bytes:
+    def extract_data(pkt: bytes, frame_size: int = 1024) -> bytes:
         """
         Extract payload from a DATA packet:
-        header (2 bytes: [seq|num_data15]) + payload(num_data) + padding + checksum(2)
+        header (2 bytes: [seq|num_data15]) + payload(num_data) + optional padding + checksum(2)
+        Returns b"" if the declared num_data does not match the datagram length.
         """
         if not Packet.is_data(pkt) or len(pkt) < 4:
             return b""
         header = int.from_bytes(pkt[0:2], "big")
         # lower 15 bits are num_data
         num_data = header & DataPacket.NUM_DATA_ACCESS_MASK
-        # defensive clamp in case of malformed input
-        max_payload = max(0, len(pkt) - 4)
-        num_data = min(num_data, max_payload)
+        if not DataPacket.valid_length(num_data, len(pkt), frame_size):
+            return b""
         return pkt[2 : 2 + num_data]
 
     # --- NEW: convenience to build ACK bytes ---
@@ -79,12 +89,14 @@ class DataPacket(Packet):
     SEQ_NUM_ACCESS_MASK: int = field(
         default=1 << 15, init=False
     )  # Used for accessing seq_num from first two bytes
-    FULL_SIZE: int = field(default=1024, init=False)
+    FULL_SIZE: int = field(default=1024, init=False)  # Default frame size
     HEADER_LENGTH: int = field(default=2, init=False)
     CHECKSUM_LENGTH: int = field(default=2, init=False)
-    DATA_SIZE: int = field(default=1024 - 2 - 2, init=False)
+    DATA_SIZE: int = field(default=1024 - 2 - 2, init=False)  # With the default frame size
+    MAX_FRAME_SIZE: int = field(default=2 + 0x7FFF + 2, init=False)  # num_data is a 15 bit field
 
-    def __init__(self, data: bytes, seq_num: int):
+    def __init__(self, data: bytes, seq_num: int, padded: bool = True, frame_size: int = 1024):
+        """padded=False sends a variable-length frame: header + data + checksum, without padding to frame_size"""
         object.__setattr__(self, "seq_num", seq_num)
         object.__setattr__(self, "data", data)
 
@@ -99,14 +111,17 @@ class DataPacket(Packet):
 
         header_bytes = header.to_bytes(2, "big")
 
-        if num_data > self.DATA_SIZE:
+        data_size = DataPacket.max_data(frame_size)
+
+        if num_data > data_size:
             raise ValueError(
-                f"Data too large ({num_data} bytes). Cannot exceed {self.DATA_SIZE} bytes"
+                f"Data too large ({num_data} bytes). Cannot exceed {data_size} bytes"
             )
 
-        padding = bytes(
-            self.FULL_SIZE - num_data - self.HEADER_LENGTH - self.CHECKSUM_LENGTH
-        )
+        if padded:
+            padding = bytes(data_size - num_data)
+        else:
+            padding = b""
 
         # The data that the checksum will be calculated over
         sumless_pkt = header_bytes + data + padding
@@ -116,7 +131,23 @@ class DataPacket(Packet):
         object.__setattr__(self, "full_pkt", sumless_pkt + checksum)
 
     @staticmethod
-    def packet_from_bytes(in_bytes: bytes):
+    def max_data(frame_size: int = 1024) -> int:
+        """Payload bytes that fit in one frame of frame_size bytes"""
+        overhead = DataPacket.HEADER_LENGTH + DataPacket.CHECKSUM_LENGTH
+        if not overhead < frame_size <= DataPacket.MAX_FRAME_SIZE:
+            raise ValueError(
+                f"Frame size must be between {overhead + 1} and {DataPacket.MAX_FRAME_SIZE} bytes, got {frame_size}"
+            )
+        return frame_size - overhead
+
+    @staticmethod
+    def valid_length(num_data: int, pkt_len: int, frame_size: int = 1024) -> bool:
+        """A frame is either padded to frame_size or exactly header + data + checksum long"""
+        exact_len = DataPacket.HEADER_LENGTH + num_data + DataPacket.CHECKSUM_LENGTH
+        return pkt_len == exact_len or (pkt_len == frame_size and exact_len <= pkt_len)
+
+    @staticmethod
+    def packet_from_bytes(in_bytes: bytes, frame_size: int = 1024):
         header = int.from_bytes(in_bytes[0:2], "big")
 
         # Grab the leftmost bit of the header for the sequence number
@@ -125,6 +156,10 @@ class DataPacket(Packet):
         # Grab the remaining 15 bits of the header as the number of data bytes
         num_data = header & DataPacket.NUM_DATA_ACCESS_MASK
 
+        if not DataPacket.valid_length(num_data, len(in_bytes), frame_size):
+            print("Data length does not match packet length!!!")
+            return None
+
         data = in_bytes[2 : 2 + num_data]
 
         # Last two bytes are the checksum
@@ -133,7 +168,7 @@ class DataPacket(Packet):
         valid_pkt = check_checksum16(in_bytes[0:-2], checksum)
 
         if valid_pkt:
-            return DataPacket(data, seq_num)
+            return DataPacket(data, seq_num, len(in_bytes) == frame_size, frame_size)
         else:
             print("Checksum detected error!!!")
             return None
@@ -182,3 +217,473 @@ class AckPacket(Packet):
     # NEW: expose raw bytes for convenience
     def to_bytes(self) -> bytes:
         return self.full_pkt
+
+
+@dataclass(frozen=True)
+class SeqDataPacket(Packet):
+    """Data packet for the pipelined protocols (Go-Back-N / Selective Repeat).
+    header: kind(1) | flags(1) | seq(4) | num_data(2), followed by data + padding + checksum(2 or 4).
+    Bits 2-3 of the flags carry the checksum algorithm so the receiver can verify any frame on its own."""
+
+    seq_num: int  # 32 bit sequence number
+    data: bytes
+    flags: int
+    checksum_algo: int
+
+    KIND: int = field(default=0xDA, init=False)
+    FLAG_START: int = field(default=0x01, init=False)  # First frame of a transfer
+    FLAG_EPOCH: int = field(default=0x02, init=False)  # Alternates between consecutive transfers
+    CHECKSUM_MASK: int = field(default=0x0C, init=False)  # Checksum algorithm id in the flags
+    CHECKSUM_SHIFT: int = field(default=2, init=False)
+    FULL_SIZE: int = field(default=1024, init=False)  # Default frame size
+    HEADER_LENGTH: int = field(default=8, init=False)
+    CHECKSUM_LENGTH: int = field(default=2, init=False)  # With the default XOR16 checksum
+    DATA_SIZE: int = field(default=1024 - 8 - 2, init=False)  # With the default frame size and XOR16 checksum
+    MAX_FRAME_SIZE: int = field(default=65507, init=False)  # Largest UDP payload over IPv4
+    MAX_SEQ: int = field(default=(1 << 32) - 1, init=False)
+
+    def __init__(
+        self,
+        data: bytes,
+        seq_num: int,
+        flags: int = 0,
+        checksum_algo: int = XOR16,
+        padded: bool = True,
+        frame_size: int = 1024,
+    ):
+        """padded=False sends a variable-length frame: header + data + checksum, without padding to frame_size"""
+        flags = (flags & ~self.CHECKSUM_MASK) | (checksum_algo << self.CHECKSUM_SHIFT)
+
+        object.__setattr__(self, "seq_num", seq_num)
+        object.__setattr__(self, "data", data)
+        object.__setattr__(self, "flags", flags)
+        object.__setattr__(self, "checksum_algo", checksum_algo)
+
+        num_data = len(data)
+        data_size = SeqDataPacket.max_data(checksum_algo, frame_size)
+
+        if num_data > data_size:
+            raise ValueError(
+                f"Data too large ({num_data} bytes). Cannot exceed {data_size} bytes"
+            )
+        if not 0 <= seq_num <= self.MAX_SEQ:
+            raise ValueError(f"Sequence number {seq_num} does not fit in 32 bits")
+
+        header_bytes = (
+            bytes([self.KIND, flags])
+            + seq_num.to_bytes(4, "big")
+            + num_data.to_bytes(2, "big")
+        )
+
+        padding = bytes(data_size - num_data) if padded else b""
+
+        # The data that the checksum will be calculated over
+        sumless_pkt = header_bytes + data + padding
+
+        checksum = gen_checksum(sumless_pkt, checksum_algo)
+
+        object.__setattr__(self, "full_pkt", sumless_pkt + checksum)
+
+    @property
+    def epoch(self) -> int:
+        return 1 if self.flags & self.FLAG_EPOCH else 0
+
+    @property
+    def is_start(self) -> bool:
+        return bool(self.flags & self.FLAG_START)
+
+    @staticmethod
+    def max_data(checksum_algo: int = XOR16, frame_size: int = 1024) -> int:
+        """Payload bytes that fit in one frame of frame_size bytes with the given checksum algorithm"""
+        overhead = SeqDataPacket.HEADER_LENGTH + CHECKSUM_ALGOS[checksum_algo].length
+        if not overhead < frame_size <= SeqDataPacket.MAX_FRAME_SIZE:
+            raise ValueError(
+                f"Frame size must be between {overhead + 1} and {SeqDataPacket.MAX_FRAME_SIZE} bytes, got {frame_size}"
+            )
+        return frame_size - overhead
+
+    @staticmethod
+    def valid_length(num_data: int, pkt_len: int, checksum_algo: int = XOR16, frame_size: int = 1024) -> bool:
+        """A frame is either padded to frame_size or exactly header + data + checksum long"""
+        exact_len = SeqDataPacket.HEADER_LENGTH + num_data + CHECKSUM_ALGOS[checksum_algo].length
+        return pkt_len == exact_len or (pkt_len == frame_size and exact_len <= pkt_len)
+
+    @staticmethod
+    def checksum_algo_of(pkt: bytes) -> int:
+        if len(pkt) < 2:
+            return XOR16
+        return (pkt[1] & SeqDataPacket.CHECKSUM_MASK) >> SeqDataPacket.CHECKSUM_SHIFT
+
+    @staticmethod
+    def is_seq_data(pkt: bytes) -> bool:
+        return len(pkt) >= SeqDataPacket.HEADER_LENGTH + 2 and pkt[0] == SeqDataPacket.KIND
+
+    @staticmethod
+    def packet_from_bytes(in_bytes: bytes, frame_size: int = 1024):
+        """Returns the data packet, or None if it is not a seq data frame, is corrupt or its length does not match.
+        Nothing is printed, the receivers count rejected frames (corrupt in get_stats())."""
+        if not SeqDataPacket.is_seq_data(in_bytes) or SeqDataPacket.is_corrupt(in_bytes):
+            return None
+
+        flags = in_bytes[1]
+        checksum_algo = SeqDataPacket.checksum_algo_of(in_bytes)
+        seq_num = int.from_bytes(in_bytes[2:6], "big")
+        num_data = int.from_bytes(in_bytes[6:8], "big")
+
+        # Declared length must match the datagram length
+        if not SeqDataPacket.valid_length(num_data, len(in_bytes), checksum_algo, frame_size):
+            return None
+
+        data = in_bytes[8 : 8 + num_data]
+
+        return SeqDataPacket(data, seq_num, flags, checksum_algo, len(in_bytes) == frame_size, frame_size)
+
+
+@dataclass(frozen=True)
+class SeqAckPacket(Packet):
+    """ACK packet for the pipelined protocols.
+    header: kind(1) | flags(1) | seq(4) | window(2, only with FLAG_WINDOW), followed by checksum(2 or 4)"""
+
+    seq_num: int  # Meaning depends on the protocol (cumulative for GBN, individual for SR)
+    flags: int
+    checksum_algo: int
+    window: int | None  # Frames the receiver can still take past its in-order point, None if not advertised
+
+    KIND: int = field(default=0xAA, init=False)
+    FLAG_EPOCH: int = field(default=0x02, init=False)
+    FLAG_RECOVERED: int = field(default=0x10, init=False)  # The frame was rebuilt from parity, not received
+    FLAG_WINDOW: int = field(default=0x20, init=False)  # The receiver's advertised window follows the seq
+    CHECKSUM_MASK: int = field(default=0x0C, init=False)
+    CHECKSUM_SHIFT: int = field(default=2, init=False)
+    HEADER_LENGTH: int = field(default=6, init=False)
+    MAX_WINDOW: int = field(default=0xFFFF, init=False)
+
+    def __init__(self, seq_num: int, flags: int = 0, checksum_algo: int = XOR16, window: int | None = None):
+        flags = (flags & ~(self.CHECKSUM_MASK | self.FLAG_WINDOW)) | (checksum_algo << self.CHECKSUM_SHIFT)
+        if window is not None:
+            window = max(0, min(self.MAX_WINDOW, window))
+            flags |= self.FLAG_WINDOW
+
+        object.__setattr__(self, "seq_num", seq_num)
+        object.__setattr__(self, "flags", flags)
+        object.__setattr__(self, "checksum_algo", checksum_algo)
+        object.__setattr__(self, "window", window)
+
+        # The data that the checksum will be calculated over
+        sumless_pkt = bytes([self.KIND, flags]) + seq_num.to_bytes(4, "big")
+        if window is not None:
+            sumless_pkt += window.to_bytes(2, "big")
+
+        checksum = gen_checksum(sumless_pkt, checksum_algo)
+
+        object.__setattr__(self, "full_pkt", sumless_pkt + checksum)
+
+    @property
+    def epoch(self) -> int:
+        return 1 if self.flags & self.FLAG_EPOCH else 0
+
+    @property
+    def recovered(self) -> bool:
+        return bool(self.flags & self.FLAG_RECOVERED)
+
+    @staticmethod
+    def checksum_algo_of(pkt: bytes) -> int:
+        if len(pkt) < 2:
+            return XOR16
+        return (pkt[1] & SeqAckPacket.CHECKSUM_MASK) >> SeqAckPacket.CHECKSUM_SHIFT
+
+    @staticmethod
+    def packet_from_bytes(in_bytes: bytes):
+        if len(in_bytes) < SeqAckPacket.HEADER_LENGTH or in_bytes[0] != SeqAckPacket.KIND:
+            return None
+
+        checksum_algo = SeqAckPacket.checksum_algo_of(in_bytes)
+        if checksum_algo not in CHECKSUM_ALGOS:
+            return None
+        flags = in_bytes[1]
+        has_window = bool(flags & SeqAckPacket.FLAG_WINDOW)
+        header_length = SeqAckPacket.HEADER_LENGTH + (2 if has_window else 0)
+        if len(in_bytes) != header_length + CHECKSUM_ALGOS[checksum_algo].length:
+            return None
+        if SeqAckPacket.is_corrupt(in_bytes):
+            return None
+
+        seq_num = int.from_bytes(in_bytes[2:6], "big")
+        window = int.from_bytes(in_bytes[6:8], "big") if has_window else None
+
+        return SeqAckPacket(seq_num, flags, checksum_algo, window)
+
+    def to_bytes(self) -> bytes:
+        return self.full_pkt
+
+
+@dataclass(frozen=True)
+class ParityPacket(Packet):
+    """XOR parity over a block of consecutive SeqDataPackets (forward error correction, see fec.py). With the
+    parity and all but one frame of the block the receiver can rebuild the missing frame.
+    header: kind(1) | flags(1) | first_seq(4) | num_data_xor(2), followed by the XOR of the block's data (each
+    zero padded to the longest) and checksum(2 or 4). The top 4 bits of the flags hold the block length - 1."""
+
+    flags: int
+    checksum_algo: int
+    count: int  # Frames in the block, first_seq..first_seq + count - 1
+    num_data_xor: int  # XOR of the frames' data lengths
+    parity: bytes
+
+    KIND: int = field(default=0xEC, init=False)
+    FLAG_EPOCH: int = field(default=0x02, init=False)
+    CHECKSUM_MASK: int = field(default=0x0C, init=False)
+    CHECKSUM_SHIFT: int = field(default=2, init=False)
+    COUNT_SHIFT: int = field(default=4, init=False)
+    MAX_COUNT: int = field(default=16, init=False)
+    HEADER_LENGTH: int = field(default=8, init=False)
+
+    def __init__(
+        self,
+        first_seq: int,
+        count: int,
+        num_data_xor: int,
+        parity: bytes,
+        epoch: int = 0,
+        checksum_algo: int = XOR16,
+    ):
+        if not 1 <= count <= self.MAX_COUNT:
+            raise ValueError(f"Parity covers 1 to {self.MAX_COUNT} frames, got {count}")
+        flags = ((count - 1) << self.COUNT_SHIFT) | (checksum_algo << self.CHECKSUM_SHIFT)
+        if epoch:
+            flags |= self.FLAG_EPOCH
+
+        object.__setattr__(self, "seq_num", first_seq)
+        object.__setattr__(self, "flags", flags)
+        object.__setattr__(self, "checksum_algo", checksum_algo)
+        object.__setattr__(self, "count", count)
+        object.__setattr__(self, "num_data_xor", num_data_xor)
+        object.__setattr__(self, "parity", parity)
+
+        sumless_pkt = (
+            bytes([self.KIND, flags]) + first_seq.to_bytes(4, "big") + num_data_xor.to_bytes(2, "big") + parity
+        )
+        object.__setattr__(self, "full_pkt", sumless_pkt + gen_checksum(sumless_pkt, checksum_algo))
+
+    @property
+    def epoch(self) -> int:
+        return 1 if self.flags & self.FLAG_EPOCH else 0
+
+    @staticmethod
+    def checksum_algo_of(pkt: bytes) -> int:
+        if len(pkt) < 2:
+            return XOR16
+        return (pkt[1] & ParityPacket.CHECKSUM_MASK) >> ParityPacket.CHECKSUM_SHIFT
+
+    @staticmethod
+    def is_parity(pkt: bytes) -> bool:
+        return len(pkt) >= ParityPacket.HEADER_LENGTH + 2 and pkt[0] == ParityPacket.KIND
+
+    @staticmethod
+    def packet_from_bytes(in_bytes: bytes, frame_size: int = 1024):
+        """Returns the parity packet, or None if it is corrupt or longer than a frame of the session"""
+        if not ParityPacket.is_parity(in_bytes) or len(in_bytes) > frame_size or ParityPacket.is_corrupt(in_bytes):
+            return None
+
+        flags = in_bytes[1]
+        checksum_algo = ParityPacket.checksum_algo_of(in_bytes)
+        end = len(in_bytes) - CHECKSUM_ALGOS[checksum_algo].length
+        return ParityPacket(
+            int.from_bytes(in_bytes[2:6], "big"),
+            (flags >> ParityPacket.COUNT_SHIFT) + 1,
+            int.from_bytes(in_bytes[6:8], "big"),
+            bytes(in_bytes[8:end]),
+            1 if flags & ParityPacket.FLAG_EPOCH else 0,
+            checksum_algo,
+        )
+
+    def to_bytes(self) -> bytes:
+        return self.full_pkt
+
+
+@dataclass(frozen=True)
+class FinPacket(Packet):
+    """Sent by the sender once every frame is ACKed, asks the receiver for its ReportPacket.
+    header: kind(1) | flags(1) | session(4), followed by a CRC32. Any protocol can send it, it never looks like a
+    data frame. The session is the nonce of the transfer's count frame (compression.session_header)."""
+
+    flags: int
+    session: int
+
+    KIND: int = field(default=0xF1, init=False)
+    FLAG_EPOCH: int = field(default=0x02, init=False)
+    HEADER_LENGTH: int = field(default=6, init=False)
+
+    def __init__(self, epoch: int = 0, session: int = 0):
+        flags = self.FLAG_EPOCH if epoch else 0
+        object.__setattr__(self, "seq_num", 0)
+        object.__setattr__(self, "flags", flags)
+        object.__setattr__(self, "session", session)
+
+        sumless_pkt = bytes([self.KIND, flags]) + session.to_bytes(4, "big")
+        object.__setattr__(self, "full_pkt", sumless_pkt + gen_checksum(sumless_pkt, CRC32))
+
+    @property
+    def epoch(self) -> int:
+        return 1 if self.flags & self.FLAG_EPOCH else 0
+
+    @staticmethod
+    def checksum_algo_of(pkt: bytes) -> int:
+        return CRC32
+
+    @staticmethod
+    def is_fin(pkt: bytes) -> bool:
+        return len(pkt) == FinPacket.HEADER_LENGTH + 4 and pkt[0] == FinPacket.KIND and not FinPacket.is_corrupt(pkt)
+
+    @staticmethod
+    def packet_from_bytes(in_bytes: bytes):
+        if not FinPacket.is_fin(in_bytes):
+            return None
+        return FinPacket(1 if in_bytes[1] & FinPacket.FLAG_EPOCH else 0, int.from_bytes(in_bytes[2:6], "big"))
+
+    def to_bytes(self) -> bytes:
+        return self.full_pkt
+
+
+@dataclass(frozen=True)
+class ReportPacket(Packet):
+    """The receiver's answer to a FIN: how the transfer looked from its side, timed with its own perf_counter.
+    header: kind(1) | flags(1) | duration_ns(8) | bytes(8) | frames(4) | duplicates(4) | corrupt(4) | session(4),
+    then a CRC32"""
+
+    flags: int
+    duration: float  # Seconds from the count frame to the last data frame
+    num_bytes: int  # Image bytes delivered
+    frames: int  # Valid data frames received, duplicates included
+    duplicates: int  # Frames that had already been received (retransmissions the receiver did not need)
+    corrupt: int  # Frames that failed the checksum or length checks
+    session: int  # Nonce from the transfer's count frame, the FIN asking for the report has to carry the same
+
+    KIND: int = field(default=0xFC, init=False)
+    FLAG_EPOCH: int = field(default=0x02, init=False)
+    HEADER_LENGTH: int = field(default=34, init=False)
+
+    def __init__(
+        self,
+        epoch: int,
+        duration: float,
+        num_bytes: int,
+        frames: int,
+        duplicates: int,
+        corrupt: int,
+        session: int = 0,
+    ):
+        flags = self.FLAG_EPOCH if epoch else 0
+        object.__setattr__(self, "seq_num", 0)
+        object.__setattr__(self, "flags", flags)
+        object.__setattr__(self, "duration", duration)
+        object.__setattr__(self, "num_bytes", num_bytes)
+        object.__setattr__(self, "frames", frames)
+        object.__setattr__(self, "duplicates", duplicates)
+        object.__setattr__(self, "corrupt", corrupt)
+        object.__setattr__(self, "session", session)
+
+        sumless_pkt = (
+            bytes([self.KIND, flags])
+            + round(duration * 1e9).to_bytes(8, "big")
+            + num_bytes.to_bytes(8, "big")
+            + frames.to_bytes(4, "big")
+            + duplicates.to_bytes(4, "big")
+            + corrupt.to_bytes(4, "big")
+            + session.to_bytes(4, "big")
+        )
+        object.__setattr__(self, "full_pkt", sumless_pkt + gen_checksum(sumless_pkt, CRC32))
+
+    @property
+    def epoch(self) -> int:
+        return 1 if self.flags & self.FLAG_EPOCH else 0
+
+    @staticmethod
+    def checksum_algo_of(pkt: bytes) -> int:
+        return CRC32
+
+    @staticmethod
+    def packet_from_bytes(in_bytes: bytes):
+        if len(in_bytes) != ReportPacket.HEADER_LENGTH + 4 or in_bytes[0] != ReportPacket.KIND:
+            return None
+        if ReportPacket.is_corrupt(in_bytes):
+            return None
+
+        return ReportPacket(
+            1 if in_bytes[1] & ReportPacket.FLAG_EPOCH else 0,
+            int.from_bytes(in_bytes[2:10], "big") / 1e9,
+            int.from_bytes(in_bytes[10:18], "big"),
+            int.from_bytes(in_bytes[18:22], "big"),
+            int.from_bytes(in_bytes[22:26], "big"),
+            int.from_bytes(in_bytes[26:30], "big"),
+            int.from_bytes(in_bytes[30:34], "big"),
+        )
+
+    def to_bytes(self) -> bytes:
+        return self.full_pkt
+
+
+@dataclass(frozen=True, slots=True)
+class DataPacketView:
+    """Read-only view of a received RDT 2.2 data frame. The checksum is verified once and data is a
+    memoryview into the receive buffer, so nothing is copied, re-padded or re-checksummed."""
+
+    seq_num: int  # 0 or 1
+    data: memoryview
+    full_pkt: memoryview
+
+    @staticmethod
+    def from_bytes(in_bytes: bytes | bytearray | memoryview, frame_size: int = 1024):
+        """Returns a view of the frame, or None if it is not a valid data frame of the session's frame size"""
+        pkt = memoryview(in_bytes)
+        if len(pkt) < DataPacket.HEADER_LENGTH + DataPacket.CHECKSUM_LENGTH or Packet.is_ack(pkt):
+            return None
+
+        # Last two bytes are the checksum
+        if not check_checksum16(pkt[0:-2], pkt[-2:]):
+            return None
+
+        header = int.from_bytes(pkt[0:2], "big")
+        num_data = header & DataPacket.NUM_DATA_ACCESS_MASK
+
+        # Declared length must match the datagram length
+        if not DataPacket.valid_length(num_data, len(pkt), frame_size):
+            return None
+
+        return DataPacketView(header >> 15, pkt[2 : 2 + num_data], pkt)
+
+
+@dataclass(frozen=True, slots=True)
+class SeqDataPacketView:
+    """Read-only view of a received SeqDataPacket, same idea as DataPacketView"""
+
+    seq_num: int
+    flags: int
+    checksum_algo: int
+    data: memoryview
+    full_pkt: memoryview
+
+    @property
+    def epoch(self) -> int:
+        return 1 if self.flags & SeqDataPacket.FLAG_EPOCH else 0
+
+    @property
+    def is_start(self) -> bool:
+        return bool(self.flags & SeqDataPacket.FLAG_START)
+
+    @staticmethod
+    def from_bytes(in_bytes: bytes | bytearray | memoryview, frame_size: int = 1024):
+        """Returns a view of the frame, or None if it is not a valid data frame of the session's frame size"""
+        pkt = memoryview(in_bytes)
+        if not SeqDataPacket.is_seq_data(pkt) or SeqDataPacket.is_corrupt(pkt):
+            return None
+
+        checksum_algo = SeqDataPacket.checksum_algo_of(pkt)
+        num_data = int.from_bytes(pkt[6:8], "big")
+
+        # Declared length must match the datagram length
+        if not SeqDataPacket.valid_length(num_data, len(pkt), checksum_algo, frame_size):
+            return None
+
+        seq_num = int.from_bytes(pkt[2:6], "big")
+        return SeqDataPacketView(seq_num, pkt[1], checksum_algo, pkt[8 : 8 + num_data], pkt)
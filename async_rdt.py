@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import os
+import socket as soc
+import time
+from typing import Iterable
+
+from constants import *
+from demux_receiver import DemuxReceiver
+from impairments import ImpairmentSpec, add_impairment_args, impairment_from_args
+from Packets import DataPacket, FinPacket, Packet, ReportPacket
+from rto import RTOEstimator
+from sender_app import accepts_report, find_image_file, iter_data_pkt, transfer_record, transfer_session
+
+# RDT 2.2 on asyncio: the senders and the receiver are DatagramProtocols, retransmissions are timers on the
+# event loop instead of blocking reads with a socket timeout, so one loop drives any number of transfers.
+# Frames, ACKs and the FIN/report exchange are the same as the blocking implementation, the two interoperate.
+
+
+class AsyncRDT22Sender(asyncio.DatagramProtocol):
+    """Stop-and-wait sender for one transfer. send() resolves once the frame is ACKed; a timeout or a corrupt ACK
+    resends it. Unlike RDT22Sender a duplicate ACK does not, see datagram_received()."""
+
+    def __init__(
+        self,
+        scenario: int,
+        loss_rate: float,
+        impairment: ImpairmentSpec = ImpairmentSpec(),
+        dest: tuple[str, int] = (RX_ADDR, RX_PORT),
+    ):
+        self.dest = dest
+        self.scenario = scenario
+        self.loss_rate = loss_rate if 0.0 <= loss_rate <= 1.0 else max(0.0, min(1.0, loss_rate / 100.0))
+        self.impairment = impairment.build(self.loss_rate)  # Applied to incoming ACKs in TX_ACK_LOSS
+        self.rto = RTOEstimator()
+        self.transport: asyncio.DatagramTransport | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+        self.pkt: DataPacket | None = None  # Frame waiting for its ACK
+        self.sent_time: float | None = None  # First transmission time of pkt, None once resent (Karn)
+        self.acked: asyncio.Future | None = None
+        self.timer: asyncio.TimerHandle | None = None
+        self.report: asyncio.Future | None = None
+        self.report_for: tuple[int, int, int | None] = (0, 0, None)  # epoch, session and size the report must match
+
+        self.frames_sent = 0
+        self.retransmissions = 0
+        self.timeouts = 0
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self.transport = transport
+        self.loop = asyncio.get_running_loop()
+
+    def connection_lost(self, exc: Exception | None):
+        if self.timer is not None:
+            self.timer.cancel()
+        for waiter in (self.acked, self.report):
+            if waiter is not None and not waiter.done():
+                waiter.set_exception(exc or ConnectionError("Transport closed"))
+
+    def error_received(self, exc: Exception):
+        pass  # e.g. ICMP port unreachable before the receiver is up, the timer resends
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]):
+        if self.report is not None:
+            report = ReportPacket.packet_from_bytes(data)
+            if accepts_report(report, *self.report_for) and not self.report.done():
+                self.report.set_result(report)
+            return  # Late ACKs and stale reports are skipped
+
+        if self.scenario == TX_ACK_LOSS:
+            data = self.impairment.apply(data)
+            if data is None:
+                return  # Dropped on the way, the timer will resend
+        if self.acked is None or self.acked.done():
+            return  # Duplicate ACK for a frame that is already done
+
+        if not Packet.is_ack(data) or Packet.is_corrupt(data):
+            self.__transmit(retransmission=True)  # corrupt, it may have been the ACK we wait for
+        elif Packet.ack_seq(data) == self.pkt.seq_num:
+            self.timer.cancel()
+            if self.sent_time is not None:
+                self.rto.sample(self.loop.time() - self.sent_time)
+            self.rto.reset_backoff()
+            self.acked.set_result(None)
+        # A duplicate ACK for the previous frame is left to the timer. Answering it with a resend would echo every
+        # spurious timeout forever (each resend earns another duplicate ACK), and with many transfers on one loop
+        # late ACKs are common.
+
+    async def send(self, pkt: DataPacket):
+        """Sends one frame and returns once the receiver ACKed it"""
+        self.pkt = pkt
+        self.acked = self.loop.create_future()
+        self.__transmit(retransmission=False)
+        await self.acked
+
+    async def request_report(
+        self, epoch: int, session: int, num_bytes: int | None = None, retries: int = FIN_RETRIES
+    ) -> ReportPacket | None:
+        """Sends FIN until the receiver answers with its report for this transfer, None if it never does.
+        See sender_app.request_report for what a report has to match."""
+        self.report = self.loop.create_future()
+        self.report_for = (epoch, session, num_bytes)
+        fin = FinPacket(epoch, session).to_bytes()
+        timeout = self.rto.rto
+        for _ in range(retries):
+            self.transport.sendto(fin, self.dest)
+            try:
+                return await asyncio.wait_for(asyncio.shield(self.report), timeout)
+            except asyncio.TimeoutError:
+                timeout = min(timeout * 2, MAX_RTO)
+        return None
+
+    def get_stats(self) -> dict:
+        """Per-transfer statistics, RTO/SRTT in seconds"""
+        return {
+            "frames_sent": self.frames_sent,
+            "retransmissions": self.retransmissions,
+            "timeouts": self.timeouts,
+            "rto": self.rto.rto,
+            "srtt": self.rto.srtt,
+        }
+
+    def __transmit(self, retransmission: bool):
+        self.transport.sendto(self.pkt.full_pkt, self.dest)
+        self.frames_sent += 1
+        if retransmission:
+            self.retransmissions += 1
+            self.sent_time = None
+        else:
+            self.sent_time = self.loop.time()
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = self.loop.call_later(self.rto.rto, self.__on_timeout)
+
+    def __on_timeout(self):
+        self.timeouts += 1
+        self.rto.backoff()
+        self.__transmit(retransmission=True)
+
+
+class AsyncRDT22Receiver(asyncio.DatagramProtocol):
+    """Receiver for any number of concurrent uploads, demultiplexed by sender address like DemuxReceiver.
+    Completed images queue up for receive_file()."""
+
+    def __init__(
+        self,
+        scenario: int,
+        loss_rate: float,
+        frame_size: int = FRAME_SIZE,
+        impairment: ImpairmentSpec = ImpairmentSpec(),
+    ):
+        self.scenario = scenario
+        self.loss_rate = loss_rate
+        self.frame_size = frame_size
+        self.impairment = impairment
+        self.demux: DemuxReceiver | None = None
+        self.images: asyncio.Queue[tuple[tuple[str, int], bytes]] = asyncio.Queue()
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        # The transport's sendto() is all the per-upload receivers need to ACK
+        self.demux = DemuxReceiver(transport, self.scenario, self.loss_rate, self.frame_size, self.impairment)
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]):
+        result = self.demux.handle(data, addr)
+        if result is not None:
+            self.images.put_nowait(result)
+
+    def error_received(self, exc: Exception):
+        pass  # An ACK to a sender that has already gone away
+
+    async def receive_file(self) -> tuple[tuple[str, int], bytes]:
+        """Waits for the next completed upload, returns the sender's address and the image"""
+        return await self.images.get()
+
+
+async def open_receiver(
+    scenario: int = NO_LOSS,
+    loss_rate: float = 0.0,
+    addr: tuple[str, int] = (RX_ADDR, RX_PORT),
+    frame_size: int = FRAME_SIZE,
+    impairment: ImpairmentSpec = ImpairmentSpec(),
+) -> tuple[asyncio.DatagramTransport, AsyncRDT22Receiver]:
+    """Binds a receiver on addr, close the transport to stop it"""
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(
+        lambda: AsyncRDT22Receiver(scenario, loss_rate, frame_size, impairment), local_addr=addr
+    )
+
+
+async def send_packets(
+    packets: Iterable[DataPacket],
+    scenario: int = NO_LOSS,
+    loss: float = 0.0,
+    dest: tuple[str, int] = (RX_ADDR, RX_PORT),
+    impairment: ImpairmentSpec = ImpairmentSpec(),
+) -> dict:
+    """Sends packets from a socket of their own, returns the transfer record like sender_app.send_packets"""
+    loop = asyncio.get_running_loop()
+    transport, sender = await loop.create_datagram_endpoint(
+        lambda: AsyncRDT22Sender(scenario, loss, impairment, dest), family=soc.AF_INET
+    )
+    try:
+        packets, session, num_bytes = transfer_session(packets)
+        start_time = time.time()
+        start = time.perf_counter()
+        for packet in packets:
+            await sender.send(packet)
+        elapsed = time.perf_counter() - start
+        return transfer_record(sender, start_time, elapsed, await sender.request_report(0, session, num_bytes))
+    finally:
+        transport.close()
+
+
+async def send_file(
+    path: str,
+    scenario: int = NO_LOSS,
+    loss: float = 0.0,
+    dest: tuple[str, int] = (RX_ADDR, RX_PORT),
+    padded: bool = True,
+    frame_size: int = FRAME_SIZE,
+    impairment: ImpairmentSpec = ImpairmentSpec(),
+) -> dict:
+    """Streams a file to the receiver, returns the transfer record"""
+    with open(path, "rb") as img_file:
+        num_bytes = os.fstat(img_file.fileno()).st_size
+        packets = iter_data_pkt(img_file, num_bytes, padded, frame_size)
+        return await send_packets(packets, scenario, loss, dest, impairment)
+
+
+def handle_CLI():
+    """Reads command line arguments to get the number of concurrent transfers and the scenario"""
+    parser = argparse.ArgumentParser(description="Concurrent RDT 2.2 transfers on one asyncio event loop")
+    parser.add_argument("-i", "--input_file", default="megamind",
+                        help="Image base name to send (no extension)")
+    parser.add_argument("-n", "--transfers", default=100, type=int,
+                        help="Transfers to run at once")
+    parser.add_argument("-s", "--scenario", default=NO_LOSS, type=int,
+                        help="Data transfer scenario: 1=NO_LOSS, 2=TX_ACK_LOSS, 3=RX_DATA_LOSS")
+    parser.add_argument("-l", "--loss", default=0, type=int,
+                        help="Loss percent for the lossy scenarios")
+    parser.add_argument("-f", "--frame_size", default=FRAME_SIZE, type=int,
+                        help="Datagram size of a data frame in bytes")
+    parser.add_argument("-p", "--port", default=RX_PORT, type=int,
+                        help="UDP port the receiver listens on")
+    parser.add_argument("--no_receiver", action="store_true",
+                        help="Only run the senders, against a receiver_app.py -d running elsewhere")
+    add_impairment_args(parser)
+    args = parser.parse_args()
+    return args, impairment_from_args(args)
+
+
+async def main(args: argparse.Namespace, impairment: ImpairmentSpec):
+    path = find_image_file(args.input_file)
+    dest = (RX_ADDR, args.port)
+    loss = args.loss / 100.0
+
+    transport = receiver = None
+    if not args.no_receiver:
+        rx_loss = loss if args.scenario == RX_DATA_LOSS else 0.0
+        transport, receiver = await open_receiver(args.scenario, rx_loss, dest, args.frame_size, impairment)
+
+    wall_start = time.perf_counter()
+    tx_loss = loss if args.scenario == TX_ACK_LOSS else 0.0
+    records = await asyncio.gather(
+        *(send_file(path, args.scenario, tx_loss, dest, True, args.frame_size, impairment)
+          for _ in range(args.transfers))
+    )
+    wall = time.perf_counter() - wall_start
+
+    if receiver is not None:
+        with open(path, "rb") as f:
+            expected = f.read()
+        intact = sum(receiver.images.get_nowait()[1] == expected for _ in range(receiver.images.qsize()))
+        print(f"Receiver: {intact}/{args.transfers} images intact")
+        transport.close()
+
+    reported = [r for r in records if r["rx_duration"] is not None]
+    total_bytes = sum(r["rx_bytes"] for r in reported)
+    print(
+        f"{args.transfers} transfers in {wall:.2f} s on one event loop, {total_bytes / wall / 1e6:.2f} MB/s in total; "
+        f"{sum(r['retransmissions'] for r in records)} retransmissions, {sum(r['timeouts'] for r in records)} "
+        f"timeouts, {len(reported)} reports"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*handle_CLI()))
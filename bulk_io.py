@@ -0,0 +1,295 @@
+import ctypes
+import ctypes.util
+import errno
+import socket as soc
+
+from constants import *
+from pacing import TokenBucket
+from Packets import SeqAckPacket
+
+# Batched datagram I/O for the pipelined protocols. On Linux, sendmmsg(2) hands a whole batch of datagrams to the
+# kernel in one call and recvmmsg(2) drains everything already queued in one call, both through ctypes. Anywhere
+# else (other platforms, IPv6, the channel emulator's sockets) the same classes fall back to one sendto/recvfrom
+# per datagram. socket.sendmsg is no help here: its scatter/gather still builds a single datagram per call.
+
+MSG_DONTWAIT = 0x40
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),  # Network byte order
+        ("sin_addr", ctypes.c_uint8 * 4),
+        ("sin_zero", ctypes.c_uint8 * 8),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IOVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+def _load_libc():
+    name = ctypes.util.find_library("c")
+    if name is None:
+        return None
+    try:
+        libc = ctypes.CDLL(name, use_errno=True)
+        libc.sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+        libc.recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    except (OSError, AttributeError):
+        return None  # No libc, or one without the mmsg calls
+    return libc
+
+
+_libc = _load_libc()
+
+
+def has_mmsg(sock) -> bool:
+    """True if sock can use the batched system calls (an IPv4 UDP socket on a libc that has them)"""
+    return _libc is not None and isinstance(sock, soc.socket) and sock.family == soc.AF_INET
+
+
+def _sockaddr(addr: tuple[str, int]) -> _SockAddrIn:
+    sa = _SockAddrIn()
+    sa.sin_family = soc.AF_INET
+    sa.sin_port = soc.htons(addr[1])
+    sa.sin_addr[:] = soc.inet_aton(soc.gethostbyname(addr[0]))
+    return sa
+
+
+def size_buffers(sock, window: int, frame_size: int, send: bool = True, receive: bool = True):
+    """Sizes the kernel socket buffers to hold a couple of windows of frames, so a full window sent in one burst
+    isn't dropped on the receiving side. Never shrinks them, and the kernel may cap the request
+    (net.core.rmem_max / wmem_max on Linux)."""
+    want = max(SOCKET_BUFFER_WINDOWS * window * frame_size, 64 * 1024)
+    for enabled, option in ((send, soc.SO_SNDBUF), (receive, soc.SO_RCVBUF)):
+        if not enabled:
+            continue
+        try:
+            if sock.getsockopt(soc.SOL_SOCKET, option) < want:
+                sock.setsockopt(soc.SOL_SOCKET, option, want)
+        except (AttributeError, OSError):
+            pass  # Not a real socket, or the platform refuses
+
+
+def receive_capacity(sock, frame_size: int) -> int:
+    """Frames of frame_size the socket's receive buffer holds, what a receiver advertises while it keeps up.
+    The kernel charges a datagram its allocation rather than its payload, about twice a small frame plus
+    DATAGRAM_OVERHEAD, so the estimate errs low. Call after size_buffers()."""
+    try:
+        rcvbuf = sock.getsockopt(soc.SOL_SOCKET, soc.SO_RCVBUF)
+    except (AttributeError, OSError):
+        return SeqAckPacket.MAX_WINDOW  # Not a real socket, nothing to overflow
+    return max(1, min(SeqAckPacket.MAX_WINDOW, rcvbuf // (2 * frame_size + DATAGRAM_OVERHEAD)))
+
+
+class BatchSender:
+    """Queues datagrams and sends them together on flush(). The batch is copied into one preallocated arena that
+    the kernel reads from, and the per-slot headers are only rewritten when a datagram's length or destination
+    differs from the last batch. syscalls counts the system calls made, so runs with and without batching can
+    be compared. With a pacer, the datagrams the token bucket covers leave together and sendto() waits for
+    tokens in between."""
+
+    def __init__(self, sock, max_batch: int = IO_BATCH, enabled: bool = True, pacer: TokenBucket | None = None):
+        self.sock = sock
+        self.pacer = pacer
+        self.max_batch = max_batch
+        self.batched = enabled and has_mmsg(sock)
+        self.queue: list[tuple[bytes, tuple[str, int]]] = []
+        self.addrs: dict[tuple[str, int], _SockAddrIn] = {}
+
+        if self.batched:
+            self.msgs = (_MMsgHdr * max_batch)()
+            self.iovs = (_IOVec * max_batch)()
+            for i in range(max_batch):
+                self.msgs[i].msg_hdr.msg_iov = ctypes.pointer(self.iovs[i])
+                self.msgs[i].msg_hdr.msg_iovlen = 1
+            self.arena = bytearray(0)
+            self.arena_addr = 0
+            self.lengths: list[int] = []  # Datagram lengths the iovecs are laid out for
+            self.slot_addrs: list[tuple[str, int] | None] = [None] * max_batch  # Destination each slot points at
+
+        self.syscalls = 0
+        self.datagrams = 0
+        self.bytes = 0
+
+    def sendto(self, pkt: bytes, addr: tuple[str, int]):
+        """Queues one datagram, it leaves on the next flush(). With a pacer this first waits, having flushed the
+        queue, until the datagram may leave, so callers that start a timer after queueing start it on time."""
+        if self.pacer is not None and not self.pacer.try_consume(len(pkt)):
+            self.flush()
+            self.pacer.consume(len(pkt))
+        self.queue.append((pkt, addr))
+
+    def flush(self):
+        """Sends every queued datagram, in order"""
+        queue = self.queue
+        if not queue:
+            return
+        self.queue = []
+        self.datagrams += len(queue)
+
+        start = 0
+        if self.batched and len(queue) > 1:
+            while start < len(queue):
+                sent = self.__sendmmsg(queue[start : start + self.max_batch])
+                if sent <= 0:
+                    break  # The socket buffer is full (non-blocking while a timeout is set), send the rest one by one
+                start += sent
+        for pkt, addr in queue[start:]:
+            self.sock.sendto(pkt, addr)
+            self.syscalls += 1
+            self.bytes += len(pkt)
+
+    def __sendmmsg(self, batch: list[tuple[bytes, tuple[str, int]]]) -> int:
+        payload = b"".join([pkt for pkt, _ in batch])
+        lengths = [len(pkt) for pkt, _ in batch]
+        if len(payload) > len(self.arena):
+            # A new arena, the old one may not be resized while ctypes has its address
+            self.arena = bytearray(max(len(payload), 2 * len(self.arena)))
+            self.arena_addr = ctypes.addressof(ctypes.c_char.from_buffer(self.arena))
+            self.lengths = []
+        self.arena[: len(payload)] = payload
+
+        if lengths != self.lengths[: len(lengths)]:
+            offset = 0
+            for iov, length in zip(self.iovs, lengths):
+                iov.iov_base = self.arena_addr + offset
+                iov.iov_len = length
+                offset += length
+            self.lengths = lengths
+        for i, (_, addr) in enumerate(batch):
+            if self.slot_addrs[i] != addr:
+                sa = self.addrs.get(addr)
+                if sa is None:
+                    sa = self.addrs[addr] = _sockaddr(addr)
+                self.msgs[i].msg_hdr.msg_name = ctypes.addressof(sa)
+                self.msgs[i].msg_hdr.msg_namelen = ctypes.sizeof(sa)
+                self.slot_addrs[i] = addr
+
+        self.syscalls += 1
+        sent = _libc.sendmmsg(self.sock.fileno(), self.msgs, len(batch), 0)
+        if sent < 0:
+            err = ctypes.get_errno()
+            if err not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise OSError(err, f"sendmmsg: {errno.errorcode.get(err, err)}")
+            return sent
+        self.bytes += sum(lengths[:sent])
+        return sent
+
+
+class BatchReceiver:
+    """recvfrom() replacement that receives into preallocated buffers. The first datagram is waited for with
+    recvfrom_into, so the socket's timeout behaves as before; then one non-blocking recvmmsg drains up to
+    max_batch - 1 datagrams that are already queued, and the following calls are served from those without a
+    system call. Datagrams come back as bytes: receivers keep views of them, so the buffers can't be handed out."""
+
+    def __init__(self, sock, bufsize: int, max_batch: int = IO_BATCH, enabled: bool = True):
+        self.sock = sock
+        self.bufsize = bufsize
+        self.batched = enabled and has_mmsg(sock) and max_batch > 1
+        self.pending: list[tuple[bytes, tuple[str, int]]] = []
+        self.next = 0  # Index of the next pending datagram
+        self.drain_next = True
+
+        if self.batched:
+            self.max_batch = max_batch
+            self.arena = bytearray(bufsize * max_batch)
+            self.view = memoryview(self.arena)
+            self.first_slot = self.view[:bufsize]
+            arena_addr = ctypes.addressof(ctypes.c_char.from_buffer(self.arena))
+            # Sender addresses land in a byte buffer too, so the raw sockaddr can key a cache of decoded ones
+            self.name_size = ctypes.sizeof(_SockAddrIn)
+            self.names = bytearray(self.name_size * max_batch)
+            names_addr = ctypes.addressof(ctypes.c_char.from_buffer(self.names))
+            self.names_view = memoryview(self.names)
+            self.decoded: dict[bytes, tuple[str, int]] = {}
+            self.msgs = (_MMsgHdr * max_batch)()
+            self.iovs = (_IOVec * max_batch)()
+            for i in range(max_batch):
+                self.iovs[i].iov_base = arena_addr + i * bufsize
+                self.iovs[i].iov_len = bufsize
+                self.msgs[i].msg_hdr.msg_iov = ctypes.pointer(self.iovs[i])
+                self.msgs[i].msg_hdr.msg_iovlen = 1
+                self.msgs[i].msg_hdr.msg_name = names_addr + i * self.name_size
+                self.msgs[i].msg_hdr.msg_namelen = self.name_size  # IPv4 only, the kernel writes back the same
+            self.drain_msgs = ctypes.pointer(self.msgs[1])  # Slot 0 holds the datagram recvfrom_into got
+            # msg_len of every slot read as plain ints, without building a ctypes object per datagram
+            self.msg_lens = memoryview(self.msgs).cast("B").cast("I")
+            self.len_stride = ctypes.sizeof(_MMsgHdr) // 4
+            self.len_offset = _MMsgHdr.msg_len.offset // 4
+
+        self.syscalls = 0
+        self.datagrams = 0
+        self.bytes = 0
+
+    def has_pending(self) -> bool:
+        """True if datagrams were already drained from the kernel and can be returned without waiting"""
+        return self.next < len(self.pending)
+
+    def backlog(self) -> int:
+        """Datagrams drained from the kernel but not returned yet"""
+        return len(self.pending) - self.next
+
+    def recvfrom(self) -> tuple[bytes, tuple[str, int]]:
+        if self.next < len(self.pending):
+            self.next += 1
+            return self.pending[self.next - 1]
+
+        self.syscalls += 1
+        if not self.batched:
+            data, addr = self.sock.recvfrom(self.bufsize)
+            self.datagrams += 1
+            self.bytes += len(data)
+            return data, addr
+
+        # Blocks (or times out) like recvfrom
+        nbytes, addr = self.sock.recvfrom_into(self.first_slot)
+        first = (bytes(self.first_slot[:nbytes]), addr)
+        self.datagrams += 1
+        self.bytes += nbytes
+
+        self.pending = [first]
+        self.next = 1
+        if self.drain_next:
+            self.__drain()
+        else:
+            self.drain_next = True  # Skipped once after an empty drain, so sparse traffic pays 1.5 calls at most
+        return first
+
+    def __drain(self):
+        self.syscalls += 1
+        got = _libc.recvmmsg(self.sock.fileno(), self.drain_msgs, self.max_batch - 1, MSG_DONTWAIT, None)
+        self.drain_next = got > 0
+        if got <= 0:
+            return
+
+        view, names, bufsize, name_size, decoded = self.view, self.names_view, self.bufsize, self.name_size, self.decoded
+        msg_lens, stride, offset = self.msg_lens, self.len_stride, self.len_offset
+        for i in range(1, got + 1):
+            nbytes = msg_lens[i * stride + offset]
+            start = i * bufsize
+            raw = bytes(names[i * name_size : (i + 1) * name_size])
+            addr = decoded.get(raw)
+            if addr is None:
+                name = _SockAddrIn.from_buffer_copy(raw)
+                addr = decoded[raw] = (soc.inet_ntoa(bytes(name.sin_addr)), soc.ntohs(name.sin_port))
+            self.pending.append((bytes(view[start : start + nbytes]), addr))
+            self.bytes += nbytes
+        self.datagrams += got
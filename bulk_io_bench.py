@@ -0,0 +1,52 @@
+import argparse
+
+import bulk_io
+from constants import *
+from frame_size_sweep import run_transfer
+from results_store import MODE_NAMES, SCENARIO_NAMES
+from sender_app import image_file_2_bytes
+
+
+def handle_CLI():
+    """Reads command line arguments to get the image, frame size, window and number of repetitions"""
+    parser = argparse.ArgumentParser(description="System calls and throughput with and without batched datagram I/O")
+    parser.add_argument("-i", "--input_file", default="megamind",
+                        help="Image base name to send (no extension)")
+    parser.add_argument("-f", "--frame_size", default=FRAME_SIZE, type=int,
+                        help="Datagram size of a data frame in bytes")
+    parser.add_argument("-w", "--window", default=WINDOW_SIZE, type=int,
+                        help="Window size in frames")
+    parser.add_argument("-s", "--scenario", default=NO_LOSS, type=int,
+                        help="Data transfer scenario: 1=NO_LOSS, 2=TX_ACK_LOSS, 3=RX_DATA_LOSS")
+    parser.add_argument("-l", "--loss", default=0, type=int,
+                        help="Loss percent for the lossy scenarios")
+    parser.add_argument("-n", "--number", default=5, type=int,
+                        help="Transfers per configuration, the fastest one is reported")
+    args = parser.parse_args()
+    return args.input_file, args.frame_size, args.window, args.scenario, args.loss, args.number
+
+
+if __name__ == "__main__":
+    input_file, frame_size, window, scenario, loss, number = handle_CLI()
+    bytes_image = image_file_2_bytes(input_file)
+    megabytes = len(bytes_image) / 1e6
+    if bulk_io._libc is None:
+        print("sendmmsg/recvmmsg not available, both columns use one system call per datagram")
+
+    print(
+        f"{SCENARIO_NAMES[scenario]}, loss {loss}%, {frame_size} byte frames, window {window}, "
+        f"{len(bytes_image)} byte image, best of {number}"
+    )
+    print(f"{'':>5} {'batch':>5}  {'tx calls/MB':>11}  {'rx calls/MB':>11}  {'MB/s':>8}")
+    for mode in (GBN_MODE, SR_MODE):
+        for batch in (False, True):
+            runs = [
+                run_transfer(bytes_image, mode, scenario, loss / 100.0, window, frame_size, batch=batch)
+                for _ in range(number)
+            ]
+            seconds, stats = min(runs, key=lambda run: run[0])
+            print(
+                f"{MODE_NAMES[mode]:>5} {'on' if batch else 'off':>5}  {stats['syscalls'] / megabytes:11.0f}  "
+                f"{stats['rx_syscalls'] / megabytes:11.0f}  {megabytes / seconds:8.2f}"
+                + ("" if all(run[1]["intact"] for run in runs) else "  (image corrupted)")
+            )
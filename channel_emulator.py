@@ -0,0 +1,166 @@
+import heapq
+import itertools
+import random
+import socket as soc
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+from constants import *
+
+
+class VirtualClock:
+    """Simulated time in seconds, only moves when the network advances it"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance_to(self, when: float):
+        self.now = max(self.now, when)
+
+
+@dataclass
+class LinkConfig:
+    """Impairments applied to every datagram on one direction of a link, probabilities in 0..1 and times in seconds"""
+
+    loss: float = 0.0  # Datagram silently dropped
+    corrupt: float = 0.0  # One random bit flipped
+    delay: float = 0.0005  # One-way propagation delay
+    jitter: float = 0.0  # Uniform extra delay in [0, jitter)
+    duplicate: float = 0.0  # Datagram delivered twice
+    reorder: float = 0.0  # Datagram held back by reorder_delay so later ones overtake it
+    reorder_delay: float = 0.002
+    bandwidth: float | None = None  # Bytes per second, None for an unlimited link
+
+
+class EmulatedNetwork:
+    """In-process datagram network driven by a virtual clock. Every datagram becomes a delivery event in a heap;
+    a socket blocked in recvfrom() runs the events in time order until something arrives for it or its timeout
+    passes, so timeouts cost no real time. All randomness comes from one seeded generator, so a run is repeatable."""
+
+    def __init__(self, seed: int = 0, clock: VirtualClock | None = None):
+        self.clock = clock if clock is not None else VirtualClock()
+        self.rng = random.Random(seed)
+        self.sockets: dict[tuple[str, int], EmulatedSocket] = {}
+        self.links: dict[tuple[tuple[str, int], tuple[str, int]], LinkConfig] = {}  # (src, dst) -> impairments
+        self.default_link = LinkConfig()
+        self.busy_until: dict[tuple[tuple[str, int], tuple[str, int]], float] = {}  # when each link is free again
+        self.events: list[tuple[float, int, tuple[str, int], tuple[str, int], bytes]] = []
+        self.order = itertools.count()  # Tie breaker so equal times deliver in send order
+        self.next_port = 40000
+
+        self.datagrams_sent = 0
+        self.datagrams_dropped = 0
+
+    def set_link(self, src: tuple[str, int], dst: tuple[str, int], config: LinkConfig):
+        self.links[(src, dst)] = config
+
+    def ephemeral_addr(self) -> tuple[str, int]:
+        self.next_port += 1
+        return (TX_ADDR, self.next_port)
+
+    def send(self, src: tuple[str, int], dst: tuple[str, int], data: bytes):
+        """Schedules the delivery of one datagram after applying the link's impairments"""
+        self.datagrams_sent += 1
+        config = self.links.get((src, dst), self.default_link)
+        rng = self.rng
+        now = self.clock.now
+
+        if rng.random() < config.loss:
+            self.datagrams_dropped += 1
+            return
+
+        if data and rng.random() < config.corrupt:
+            ba = bytearray(data)
+            ba[rng.randrange(len(ba))] ^= 1 << rng.randrange(8)
+            data = bytes(ba)
+
+        # Serialization on a rate limited link, datagrams queue behind each other
+        depart = now
+        if config.bandwidth is not None:
+            depart = max(now, self.busy_until.get((src, dst), now)) + len(data) / config.bandwidth
+            self.busy_until[(src, dst)] = depart
+
+        copies = 2 if rng.random() < config.duplicate else 1
+        for _ in range(copies):
+            arrive = depart + config.delay
+            if config.jitter:
+                arrive += rng.random() * config.jitter
+            if rng.random() < config.reorder:
+                arrive += config.reorder_delay
+            heapq.heappush(self.events, (arrive, next(self.order), src, dst, data))
+
+    def run_until(self, deadline: float | None, waiting: "EmulatedSocket") -> bool:
+        """Delivers events in time order until waiting has a datagram (True) or deadline passes (False)"""
+        while not waiting.inbox:
+            if not self.events or (deadline is not None and self.events[0][0] > deadline):
+                if deadline is None:
+                    raise RuntimeError("Deadlock: blocking receive with nothing in flight")
+                self.clock.advance_to(deadline)
+                return False
+
+            when, _, src, dst, data = heapq.heappop(self.events)
+            self.clock.advance_to(when)
+            sock = self.sockets.get(dst)
+            if sock is None:
+                self.datagrams_dropped += 1  # Nobody bound there, UDP drops it
+                continue
+            sock.inbox.append((data, src))
+            if sock.on_receive is not None:
+                sock.on_receive()
+        return True
+
+
+class EmulatedSocket:
+    """Stands in for a UDP socket in the senders and receivers, supports the calls they make.
+    A socket with an on_receive callback is passive: the network calls it as datagrams arrive and its recvfrom()
+    never blocks. Otherwise recvfrom() drives the network until a datagram arrives or the timeout passes."""
+
+    def __init__(self, network: EmulatedNetwork, on_receive: Callable[[], None] | None = None):
+        self.network = network
+        self.on_receive = on_receive
+        self.addr = network.ephemeral_addr()
+        network.sockets[self.addr] = self
+        self.inbox: deque[tuple[bytes, tuple[str, int]]] = deque()
+        self.timeout: float | None = None
+
+    def bind(self, addr: tuple[str, int]):
+        del self.network.sockets[self.addr]
+        self.addr = addr
+        self.network.sockets[addr] = self
+
+    def setsockopt(self, *args):
+        pass
+
+    def settimeout(self, timeout: float | None):
+        self.timeout = timeout
+
+    def gettimeout(self) -> float | None:
+        return self.timeout
+
+    def sendto(self, data: bytes, addr: tuple[str, int]) -> int:
+        self.network.send(self.addr, addr, bytes(data))
+        return len(data)
+
+    def recvfrom(self, bufsize: int) -> tuple[bytes, tuple[str, int]]:
+        if not self.inbox:
+            if self.on_receive is not None:
+                raise soc.timeout("timed out")
+            deadline = None if self.timeout is None else self.network.clock.now + self.timeout
+            if not self.network.run_until(deadline, self):
+                raise soc.timeout("timed out")
+
+        data, addr = self.inbox.popleft()
+        return data[:bufsize], addr  # Like UDP, the rest of a datagram larger than the buffer is lost
+
+    def close(self):
+        self.network.sockets.pop(self.addr, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,29 +1,129 @@
-def gen_checksum16(data: bytes) -> bytes:
+import zlib
+from dataclasses import dataclass
+from typing import Callable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, fall back to big integer folding
+    np = None
+
+
+def gen_checksum16(data: bytes | bytearray | memoryview) -> bytes:
     """Generates a 16 bit XOR based checksum for a byte array"""
+    return _xor16(data).to_bytes(2, "big")
 
-    # Make sure we are evenly divisible by 16 bits (2 bytes)
-    if len(data) % 2 != 0:
-        data += bytes([0x00])
 
-    # Number of 16 bit chunks to iterate over
-    num16_chunk = int(len(data) / 2)
+def check_checksum16(data: bytes | bytearray | memoryview, checksum: bytes) -> bool:
+    """Verifies that data has no error by comparing checksum. If no errors then returns true."""
+    # Locally calculate checksum of data and compare to the given checksum
+    return _xor16(data) == int.from_bytes(checksum, "big")
+
 
-    checksum = 0
-    for i in range(0, num16_chunk):
-        chunk = int.from_bytes(data[2 * i : 2 * (i + 1)], "big")
+def gen_inet_checksum16(data: bytes | bytearray | memoryview) -> bytes:
+    """Generates the RFC 1071 Internet checksum (one's complement of the one's complement sum of 16 bit words)"""
+    num_bytes = len(data)
+    value = int.from_bytes(data, "big")
 
-        # Running XOR
-        checksum ^= chunk
+    # Pad an odd trailing byte with 0x00
+    if num_bytes % 2 != 0:
+        value <<= 8
 
-    return checksum.to_bytes(2, "big")
+    # 2^16 = 1 (mod 0xFFFF), so the end-around carry sum of the words is the whole buffer mod 0xFFFF,
+    # except that a non-zero sum is represented as 0xFFFF rather than 0
+    total = value % 0xFFFF
+    if total == 0 and value != 0:
+        total = 0xFFFF
 
+    return (~total & 0xFFFF).to_bytes(2, "big")
 
-def check_checksum16(data: bytes, checksum: bytes) -> bool:
-    """Verifies that data has no error by comparing checksum. If no errors then returns true."""
-    # Locally calculate checksum of data
-    calc_checksum = int.from_bytes(gen_checksum16(data), "big")
 
-    # Compare to a given checksum
-    output = calc_checksum ^ int.from_bytes(checksum, "big")
+def gen_crc32(data: bytes | bytearray | memoryview) -> bytes:
+    """Generates a CRC-32 (zlib polynomial) for a byte array"""
+    return zlib.crc32(data).to_bytes(4, "big")
+
+
+@dataclass(frozen=True)
+class ChecksumAlgo:
+    name: str
+    length: int  # Bytes the checksum takes at the end of a frame
+    gen: Callable[[bytes | bytearray | memoryview], bytes]
+
+
+# Checksum ids carried in the frame header of the pipelined protocols
+XOR16 = 0
+INET16 = 1
+CRC32 = 2
+
+CHECKSUM_ALGOS: dict[int, ChecksumAlgo] = {
+    XOR16: ChecksumAlgo("xor16", 2, gen_checksum16),
+    INET16: ChecksumAlgo("inet16", 2, gen_inet_checksum16),
+    CRC32: ChecksumAlgo("crc32", 4, gen_crc32),
+}
+
+
+def gen_checksum(data: bytes | bytearray | memoryview, algo: int = XOR16) -> bytes:
+    """Generates the checksum of data with a registered algorithm"""
+    return CHECKSUM_ALGOS[algo].gen(data)
+
+
+def check_checksum(data: bytes | bytearray | memoryview, checksum: bytes, algo: int = XOR16) -> bool:
+    """Verifies data against a checksum made by a registered algorithm. If no errors then returns true."""
+    if algo not in CHECKSUM_ALGOS:
+        return False
+    return CHECKSUM_ALGOS[algo].gen(data) == checksum
+
+
+def _xor16(data: bytes | bytearray | memoryview) -> int:
+    """XOR of every big-endian 16 bit word in data, an odd trailing byte is padded with 0x00"""
+    if np is not None:
+        return _xor16_numpy(data)
+    return _xor16_fold(data)
+
+
+def _xor16_numpy(data: bytes | bytearray | memoryview) -> int:
+    # View the buffer as big-endian uint16 words (no copy) and reduce them in one call
+    num_bytes = len(data)
+    words = np.frombuffer(data, dtype=">u2", count=num_bytes // 2)
+    checksum = int(np.bitwise_xor.reduce(words))
+
+    if num_bytes % 2 != 0:
+        checksum ^= data[-1] << 8
+
+    return checksum
+
+
+def _xor16_fold(data: bytes | bytearray | memoryview) -> int:
+    # Read the whole buffer as one big integer and XOR its upper half onto its lower half
+    # until only 16 bits remain, O(log n) big integer operations instead of n/2 Python ones
+    num_bytes = len(data)
+    value = int.from_bytes(data, "big")
+
+    # Pad an odd trailing byte with 0x00
+    if num_bytes % 2 != 0:
+        value <<= 8
+        num_bytes += 1
+
+    # Round the width up to a power of two words, the leading zero words don't change the XOR
+    width = 16
+    while width < num_bytes * 8:
+        width <<= 1
+
+    while width > 16:
+        width >>= 1
+        value = (value >> width) ^ (value & ((1 << width) - 1))
+
+    return value
+
+
+def _xor16_loop(data: bytes | bytearray | memoryview) -> int:
+    """Original word at a time implementation, kept as the reference for tests and benchmarks"""
+    num16_chunk = len(data) // 2
+
+    checksum = 0
+    for i in range(0, num16_chunk):
+        checksum ^= int.from_bytes(data[2 * i : 2 * (i + 1)], "big")
+
+    if len(data) % 2 != 0:
+        checksum ^= data[-1] << 8
 
-    return output == 0
+    return checksum
@@ -0,0 +1,85 @@
+import argparse
+import os
+import random
+import timeit
+
+import checksum
+from checksum import CHECKSUM_ALGOS
+from Packets import SeqDataPacket
+
+
+def handle_CLI():
+    """Reads command line arguments to get the frame size, number of repetitions and error trials"""
+    parser = argparse.ArgumentParser(description="Microbenchmark for the frame checksums")
+    parser.add_argument("-b", "--bytes", default=1022, type=int,
+                        help="Bytes covered by the checksum (1022 for a full 1024 byte DataPacket)")
+    parser.add_argument("-n", "--number", default=5000, type=int,
+                        help="Checksums computed per implementation")
+    parser.add_argument("-e", "--error_trials", default=20000, type=int,
+                        help="Corrupted frames per checksum and error pattern")
+    args = parser.parse_args()
+    return args.bytes, args.number, args.error_trials
+
+
+def time_per_call(func, data, number: int) -> float:
+    """Best of 3 average time of one call in microseconds"""
+    return min(timeit.repeat(lambda: func(data), number=number, repeat=3)) / number * 1e6
+
+
+def flip_middle_bit(frame: bytearray, rng: random.Random):
+    """Same single bit flip the RX_DATA_LOSS scenario applies in the middle of the data area"""
+    frame[SeqDataPacket.HEADER_LENGTH + (len(frame) - SeqDataPacket.HEADER_LENGTH - 2) // 2] ^= 0x01
+
+
+def flip_same_column(frame: bytearray, rng: random.Random):
+    """Two flips of the same bit in different 16 bit words, invisible to an XOR checksum"""
+    bit = 1 << rng.randrange(8)
+    first, second = rng.sample(range(0, len(frame) // 2), 2)
+    column = rng.randrange(2)
+    frame[2 * first + column] ^= bit
+    frame[2 * second + column] ^= bit
+
+
+def flip_random_bits(frame: bytearray, rng: random.Random):
+    """Between 2 and 8 bit flips anywhere in the frame"""
+    for _ in range(rng.randint(2, 8)):
+        frame[rng.randrange(len(frame))] ^= 1 << rng.randrange(8)
+
+
+def undetected_rate(checksum_algo: int, corrupt, trials: int, rng: random.Random) -> float:
+    """Fraction of corrupted frames that still pass SeqDataPacket.is_corrupt"""
+    undetected = 0
+    for _ in range(trials):
+        pkt = SeqDataPacket(rng.randbytes(SeqDataPacket.max_data(checksum_algo)), rng.randrange(1 << 16), 0, checksum_algo)
+        frame = bytearray(pkt.full_pkt)
+        corrupt(frame, rng)
+        if frame != pkt.full_pkt and not SeqDataPacket.is_corrupt(bytes(frame)):
+            undetected += 1
+    return undetected / trials
+
+
+if __name__ == "__main__":
+    num_bytes, number, error_trials = handle_CLI()
+    frame = os.urandom(num_bytes)
+
+    print("XOR16 implementations")
+    implementations = [("loop (original)", checksum._xor16_loop), ("int fold", checksum._xor16_fold)]
+    if checksum.np is not None:
+        implementations.append(("numpy", checksum._xor16_numpy))
+    else:
+        print("NumPy not installed, skipping the numpy implementation")
+
+    baseline = time_per_call(checksum._xor16_loop, frame, number)
+    for name, func in implementations:
+        assert func(frame) == checksum._xor16_loop(frame)
+        per_frame = time_per_call(func, frame, number)
+        print(f"{name:>16}: {per_frame:8.2f} us/frame ({baseline / per_frame:6.1f}x)")
+
+    print("\nRegistered checksums: cost per frame and undetected error rate")
+    patterns = [("middle bit", flip_middle_bit), ("same column", flip_same_column), ("2-8 random", flip_random_bits)]
+    print(f"{'':>8}  {'us/frame':>8}" + "".join(f"  {name:>12}" for name, _ in patterns))
+    for algo_id, algo in CHECKSUM_ALGOS.items():
+        rng = random.Random(algo_id)
+        per_frame = time_per_call(algo.gen, frame, number)
+        rates = [undetected_rate(algo_id, corrupt, error_trials, rng) for _, corrupt in patterns]
+        print(f"{algo.name:>8}  {per_frame:8.2f}" + "".join(f"  {rate:12.4%}" for rate in rates))
@@ -1,4 +1,6 @@
-from checksum import check_checksum16, gen_checksum16
+import os
+
+from checksum import CHECKSUM_ALGOS, _xor16_fold, _xor16_loop, check_checksum, check_checksum16, gen_checksum, gen_checksum16, np
 
 data = bytes([0x40, 0xDF, 0x52, 0x66])
 bad_data = bytes([0x41, 0xDF, 0x51, 0x61])
@@ -18,3 +20,37 @@ if check_checksum16(full_bad[0:-2], full_bad[-2:]):
     print("[Fail] Checksum matched for bad data")
 else:
     print("[Pass] Checksum did not match for bad data")
+
+# The fast implementations must match the original word at a time loop bit for bit
+implementations = [_xor16_fold]
+if np is not None:
+    from checksum import _xor16_numpy
+
+    implementations.append(_xor16_numpy)
+
+for length in [0, 1, 2, 3, 4, 1021, 1022, 1024, 4095]:
+    sample = os.urandom(length)
+    expected = _xor16_loop(sample)
+    for buffer in [sample, bytearray(sample), memoryview(sample)]:
+        if all(impl(buffer) == expected for impl in implementations) and gen_checksum16(buffer) == expected.to_bytes(2, "big"):
+            continue
+        print(f"[Fail] Fast checksum does not match the original for {length} bytes ({type(buffer).__name__})")
+        break
+    else:
+        print(f"[Pass] Fast checksum matches the original for {length} bytes")
+
+# Every registered checksum must accept good data and reject a flipped bit
+for algo_id, algo in CHECKSUM_ALGOS.items():
+    sample = os.urandom(1022)
+    flipped = bytearray(sample)
+    flipped[511] ^= 0x01
+
+    if check_checksum(sample, gen_checksum(sample, algo_id), algo_id) and len(gen_checksum(sample, algo_id)) == algo.length:
+        print(f"[Pass] {algo.name} checksum matched for good data")
+    else:
+        print(f"[Fail] {algo.name} checksum did not match for good data")
+
+    if check_checksum(flipped, gen_checksum(sample, algo_id), algo_id):
+        print(f"[Fail] {algo.name} checksum matched for bad data")
+    else:
+        print(f"[Pass] {algo.name} checksum did not match for bad data")
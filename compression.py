@@ -0,0 +1,156 @@
+import lzma
+import os
+import tempfile
+import zlib
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator
+
+from constants import *
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    default_level: int
+    max_level: int
+    compressor: Callable[[int], object]  # level -> object with compress() and flush()
+    decompressor: Callable[[], object]  # -> object with decompress() and eof
+
+
+# Codec ids carried in the count frame, the first frame of a transfer
+NO_COMPRESSION = 0
+ZLIB = 1
+LZMA = 2
+
+CODECS: dict[int, Codec] = {
+    ZLIB: Codec("zlib", 6, 9, zlib.compressobj, zlib.decompressobj),
+    LZMA: Codec("lzma", 6, 9, lambda level: lzma.LZMACompressor(preset=level), lzma.LZMADecompressor),
+}
+
+CODEC_NAMES = {NO_COMPRESSION: "none", **{codec_id: codec.name for codec_id, codec in CODECS.items()}}
+
+
+def get_codec(codec: int) -> Codec:
+    """Looks up a registered codec, raises ValueError for an id this build does not know"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec {codec}")
+    return CODECS[codec]
+
+
+def new_session() -> int:
+    """A random 32 bit session nonce, drawn for every transfer"""
+    return int.from_bytes(os.urandom(4), "big")
+
+
+def session_header(num_pkts: int, codec: int = NO_COMPRESSION, session: int = 0, num_bytes: int = 0) -> bytes:
+    """Payload of the count frame: the number of data packets (8 bytes, big-endian), the codec id (1 byte), the
+    session nonce (4 bytes) and the size of the image before compression (8 bytes). The nonce makes the count
+    frames of two transfers differ even when the epoch, the image and the codec are the same, e.g. when a new
+    sender process meets a receiver that is still running. The size is what the receiver's report should say."""
+    return num_pkts.to_bytes(8, "big") + bytes([codec]) + session.to_bytes(4, "big") + num_bytes.to_bytes(8, "big")
+
+
+def parse_session_header(data: bytes | memoryview) -> tuple[int, int, int, int | None]:
+    """Returns (number of data packets, codec id, session nonce, image size) from a count frame's payload.
+    Headers from older senders, a bare 8 byte count or one followed by the codec id, parse with session 0;
+    the image size is None when the header does not carry it."""
+    codec = data[8] if len(data) > 8 else NO_COMPRESSION
+    session = int.from_bytes(data[9:13], "big") if len(data) >= 13 else 0
+    num_bytes = int.from_bytes(data[13:21], "big") if len(data) >= 21 else None
+    return int.from_bytes(data[:8], "big"), codec, session, num_bytes
+
+
+def iter_compressed(
+    stream: BinaryIO, codec: int, level: int | None = None, chunk_size: int = COMPRESS_CHUNK
+) -> Iterator[bytes]:
+    """Compresses stream chunk by chunk, so the input is never fully loaded"""
+    info = get_codec(codec)
+    level = info.default_level if level is None else level
+    if not 0 <= level <= info.max_level:
+        raise ValueError(f"{info.name} level must be between 0 and {info.max_level}, got {level}")
+
+    compressor = info.compressor(level)
+    while chunk := stream.read(chunk_size):
+        if out := compressor.compress(chunk):
+            yield out
+    yield compressor.flush()
+
+
+def compress_stream(stream: BinaryIO, codec: int, level: int | None = None) -> tuple[BinaryIO, int]:
+    """The compression stage in front of the packetizer. The count frame needs the compressed size before the
+    first data frame, so the output is spooled: in memory up to COMPRESS_SPOOL_BYTES, in a temporary file past
+    that. Returns the spool rewound to its start and its size."""
+    spool = tempfile.SpooledTemporaryFile(COMPRESS_SPOOL_BYTES)
+    for out in iter_compressed(stream, codec, level):
+        spool.write(out)
+    num_bytes = spool.tell()
+    spool.seek(0)
+    return spool, num_bytes
+
+
+def decompress(data: bytes, codec: int) -> bytes:
+    """Decompresses a whole payload, for the receivers that reassemble in memory"""
+    if codec == NO_COMPRESSION:
+        return data
+    decompressor = get_codec(codec).decompressor()
+    out = decompressor.decompress(data)
+    if not decompressor.eof:
+        raise ValueError(f"Truncated {CODEC_NAMES[codec]} stream")
+    return out
+
+
+class DecompressingSink:
+    """Receives a compressed transfer into a file, with the same interface as ReassemblySink. The receivers
+    deliver in order, so each payload goes straight through the decompressor and is appended to the output;
+    neither the compressed nor the decompressed image is held in memory. finish() checks the stream is
+    complete, fsyncs the file and renames it into place."""
+
+    def __init__(self, path: str, num_pkts: int, codec: int):
+        self.path = path
+        self.tmp_path = f"{path}.part"
+        self.num_pkts = num_pkts
+        self.decompressor = get_codec(codec).decompressor()
+        self.count = 0  # Frames written
+        self.size = 0  # Decompressed bytes written
+        self.file = open(self.tmp_path, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+    @property
+    def complete(self) -> bool:
+        return self.count == self.num_pkts
+
+    def write(self, index: int, payload: bytes | memoryview):
+        """Decompresses the payload of data frame index (0 based, count frame excluded), in order"""
+        if index < self.count:
+            return  # Duplicate
+        if index != self.count:
+            raise ValueError(f"Frame {index} out of order, expected frame {self.count}")
+        out = self.decompressor.decompress(payload)
+        self.file.write(out)
+        self.size += len(out)
+        self.count += 1
+
+    def finish(self) -> int:
+        """Makes the file durable under its final name, returns its size"""
+        if not self.complete:
+            raise RuntimeError(f"{self.num_pkts - self.count} of {self.num_pkts} frames missing")
+        if not self.decompressor.eof:
+            raise ValueError("Compressed stream ended early")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        return self.size
+
+    def abort(self):
+        """Drops the partial file"""
+        if not self.file.closed:
+            self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
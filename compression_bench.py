@@ -0,0 +1,81 @@
+import argparse
+import io
+import time
+
+from compression import CODEC_NAMES, NO_COMPRESSION, compress_stream, decompress
+from constants import *
+from frame_size_sweep import run_transfer
+from results_store import MODE_NAMES, SCENARIO_NAMES
+from sender_app import image_file_2_bytes
+
+
+def handle_CLI():
+    """Reads command line arguments to get the image, protocol, losses, compression level and repetitions"""
+    parser = argparse.ArgumentParser(description="Bytes on the wire and end-to-end time with and without compression")
+    parser.add_argument("-i", "--input_file", default="megamind",
+                        help="Image base name to send (no extension)")
+    parser.add_argument("-m", "--mode", default=SR_MODE, type=int,
+                        help="Transport protocol: 1=RDT 2.2, 2=Go-Back-N, 3=Selective Repeat")
+    parser.add_argument("-s", "--scenario", default=RX_DATA_LOSS, type=int,
+                        help="Scenario of the lossy runs: 2=TX_ACK_LOSS, 3=RX_DATA_LOSS (0% loss runs NO_LOSS)")
+    parser.add_argument("-l", "--losses", default=[0, 10, 30], type=int, nargs="+",
+                        help="Loss percentages")
+    parser.add_argument("--level", default=None, type=int,
+                        help="Compression level for both codecs, 0-9 (default 6)")
+    parser.add_argument("-f", "--frame_size", default=FRAME_SIZE, type=int,
+                        help="Datagram size of a data frame in bytes")
+    parser.add_argument("-n", "--number", default=3, type=int,
+                        help="Transfers per configuration, the fastest one is reported")
+    args = parser.parse_args()
+    return args.input_file, args.mode, args.scenario, args.losses, args.level, args.frame_size, args.number
+
+
+def time_codec(bytes_image: bytes, codec: int, level: int | None) -> tuple[int, float, float]:
+    """Compressed size, compression and decompression seconds of the image with one codec"""
+    if codec == NO_COMPRESSION:
+        return len(bytes_image), 0.0, 0.0
+    start = time.perf_counter()
+    spool, num_bytes = compress_stream(io.BytesIO(bytes_image), codec, level)
+    compress_seconds = time.perf_counter() - start
+    compressed = spool.read()
+    start = time.perf_counter()
+    decompress(compressed, codec)
+    return num_bytes, compress_seconds, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    input_file, mode, lossy_scenario, losses, level, frame_size, number = handle_CLI()
+    bytes_image = image_file_2_bytes(input_file)
+    codecs = {codec: time_codec(bytes_image, codec, level) for codec in CODEC_NAMES}
+
+    print(f"{MODE_NAMES[mode]}, {frame_size} byte frames, {len(bytes_image)} byte image, best of {number}")
+    print(f"{'codec':>5} {'payload KB':>10}  {'compress ms':>11}  {'decompress ms':>13}")
+    for codec, (num_bytes, compress_seconds, decompress_seconds) in codecs.items():
+        print(
+            f"{CODEC_NAMES[codec]:>5} {num_bytes / 1e3:10.1f}  {compress_seconds * 1000:11.1f}  "
+            f"{decompress_seconds * 1000:13.1f}"
+        )
+
+    # End to end is compression, then the transfer, then decompression: the receiver can only finish
+    # decompressing once the last frame is in
+    print(
+        f"\n{'scenario':>12} {'loss':>4} {'codec':>5}  {'frames':>6}  {'wire KB':>8}  {'transfer s':>10}  "
+        f"{'total s':>8}"
+    )
+    for loss in losses:
+        scenario = NO_LOSS if loss == 0 else lossy_scenario
+        for codec, (_, compress_seconds, decompress_seconds) in codecs.items():
+            runs = [
+                run_transfer(
+                    bytes_image, mode, scenario, loss / 100.0, WINDOW_SIZE, frame_size, codec=codec, level=level
+                )
+                for _ in range(number)
+            ]
+            seconds, stats = min(runs, key=lambda run: run[0])
+            wire_bytes = stats["frames_sent"] * frame_size  # Data frames are padded to the frame size
+            total = compress_seconds + seconds + decompress_seconds
+            print(
+                f"{SCENARIO_NAMES[scenario]:>12} {loss:>3}% {CODEC_NAMES[codec]:>5}  {stats['frames_sent']:6d}  "
+                f"{wire_bytes / 1e3:8.1f}  {seconds:10.3f}  {total:8.3f}"
+                + ("" if all(run[1]["intact"] for run in runs) else "  (image corrupted)")
+            )
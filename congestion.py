@@ -0,0 +1,40 @@
+from constants import *
+
+
+class AIMDWindow:
+    """Congestion window in frames, Reno style (RFC 5681): slow start adds a frame per ACK (doubling every round
+    trip) up to ssthresh, congestion avoidance adds one frame per round trip, and a loss halves the window and
+    makes that the new ssthresh. Senders report at most one loss per window of data, see is_new_loss()."""
+
+    def __init__(self, max_window: int, initial: int = INITIAL_CWND):
+        self.max_window = max_window
+        self.cwnd = float(max(1, min(initial, max_window)))
+        self.ssthresh = float(max_window)
+        self.recover = 0  # Frames sent before this were in flight at the last decrease
+        self.decreases = 0
+
+    @property
+    def window(self) -> int:
+        """Frames the sender may have in flight"""
+        return max(1, int(self.cwnd))
+
+    def on_ack(self, frames: int = 1):
+        """frames newly acknowledged"""
+        for _ in range(frames):
+            if self.cwnd < self.ssthresh:
+                self.cwnd += 1  # Slow start
+            else:
+                self.cwnd += 1 / self.cwnd  # Congestion avoidance
+        self.cwnd = min(self.cwnd, self.max_window)
+
+    def is_new_loss(self, seq: int) -> bool:
+        """True if frame seq was sent after the last decrease. Losses of the frames that were already in flight
+        then belong to the same congestion event and must not shrink the window again."""
+        return seq >= self.recover
+
+    def on_loss(self, next_seq: int):
+        """Multiplicative decrease, next_seq is the first frame not sent yet"""
+        self.ssthresh = min(max(self.cwnd / 2, MIN_CWND), self.max_window)
+        self.cwnd = self.ssthresh
+        self.recover = next_seq
+        self.decreases += 1
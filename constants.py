@@ -9,3 +9,42 @@ TX_ADDR = "127.0.0.1"
 TX_PORT = 54321
 
 NUM_ITER = 5
+
+# Transport protocols selectable from the apps
+RDT22_MODE = 1
+GBN_MODE = 2
+SR_MODE = 3
+
+WINDOW_SIZE = 16  # Frames in flight for the pipelined protocols
+FEC_ADAPTIVE = 0  # FEC block length that sizes the blocks from the observed loss (fec.py)
+FEC_TARGET_LOSSES = 0.5  # Lost frames the adaptive FEC expects per block, one parity frame covers one
+FRAME_SIZE = 1024  # Default datagram size of a data frame in bytes
+IO_BATCH = 64  # Most datagrams per sendmmsg/recvmmsg call in the pipelined protocols
+SOCKET_BUFFER_WINDOWS = 4  # Socket buffers are sized to hold this many windows of frames
+DATAGRAM_OVERHEAD = 512  # Receive buffer bytes the kernel charges a datagram on top of twice its size (Linux)
+
+# AIMD congestion window in frames (congestion.py)
+INITIAL_CWND = 4
+MIN_CWND = 2  # Floor of the window after a multiplicative decrease
+
+# Token bucket pacing of the senders (pacing.py)
+PACING_BURST = 16 * 1024  # Bytes that may leave back to back once the bucket is full
+PACING_SPIN = 0.0002  # Seconds before a send time that the pacer stops sleeping and busy-waits
+
+# Retransmission timeout bounds in seconds (RFC 6298 style estimator in rto.py)
+INITIAL_RTO = 0.5
+MIN_RTO = 0.01
+MAX_RTO = 4.0
+CLOCK_GRANULARITY = 0.01  # G of RFC 6298: a timer can fire this late, e.g. a thread not scheduled in time
+
+FRAME_CACHE_BYTES = 256 * 1024 * 1024  # Memory bound of the sender's encoded frame cache
+SINK_RELEASE_BYTES = 4 * 1024 * 1024  # Reassembled bytes the receiver keeps mapped before releasing them
+WRITER_QUEUE_DEPTH = 4  # Completed images waiting for the disk before the receiver stops reading
+COMPRESS_CHUNK = 64 * 1024  # Bytes of the file fed to the compressor at a time
+COMPRESS_SPOOL_BYTES = 16 * 1024 * 1024  # Compressed output kept in memory before spilling to a temporary file
+
+FIN_RETRIES = 10  # FINs the sender sends before giving up on the receiver's completion report
+
+# Demultiplexing receiver (demux_receiver.py)
+UPLOAD_IDLE_TIMEOUT = 30.0  # Seconds without a datagram before an upload's state is dropped
+MAX_UPLOADS = 256  # Uploads tracked at once, senders beyond that are ignored until a slot frees up
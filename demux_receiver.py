@@ -0,0 +1,124 @@
+import socket as soc
+import time
+from typing import Callable
+
+from compression import NO_COMPRESSION, decompress, parse_session_header
+from constants import *
+from impairments import ImpairmentSpec
+from Packets import DataPacketView, ReportPacket
+from rdt22_receiver import RDT22Receiver, udt_rcv
+
+
+class Upload:
+    """One sender's transfer: its own RDT 2.2 state machine and ACK cache (the RDT22Receiver) plus the image
+    being reassembled. Like receive_one_image, the first frame carries the packet count."""
+
+    def __init__(self, receiver: RDT22Receiver, now: float):
+        self.receiver = receiver
+        self.last_active = now
+        self.num_pkts: int | None = None
+        self.codec = NO_COMPRESSION
+        self.session = 0  # Nonce from the count frame, the report carries it back
+        self.chunks: list[memoryview] = []
+        self.start = 0.0
+        self.counts = (0, 0, 0)  # Receiver's frames/duplicates/corrupt when the count frame arrived
+
+    def add(self, pkt: DataPacketView) -> bytes | None:
+        """Takes the next in order frame, returns the image once its last frame is in"""
+        receiver = self.receiver
+        if self.num_pkts is None:
+            self.num_pkts, self.codec, self.session, _ = parse_session_header(pkt.data)
+            self.start = time.perf_counter()
+            self.counts = (receiver.frames_received, receiver.duplicates, receiver.corrupt)
+        else:
+            self.chunks.append(pkt.data)
+        if len(self.chunks) < self.num_pkts:
+            return None
+
+        image = decompress(b"".join(self.chunks), self.codec)
+        frames, duplicates, corrupt = self.counts
+        receiver.completed = ReportPacket(
+            receiver.epoch,
+            time.perf_counter() - self.start,
+            len(image),
+            receiver.frames_received - frames,
+            receiver.duplicates - duplicates,
+            receiver.corrupt - corrupt,
+            self.session,
+        )
+        # The state machine and the report stay, the sender may still resend its last frame or a FIN
+        self.num_pkts = None
+        self.chunks = []
+        return image
+
+
+class DemuxReceiver:
+    """RDT 2.2 receiver for many concurrent uploads on one socket. Datagrams are demultiplexed by the sender's
+    (address, port): every transfer sends from its own socket, so the ephemeral port doubles as the session id.
+    Each upload gets an independent state machine, ACK cache and reassembly buffer; uploads quiet for longer
+    than idle_timeout are forgotten, and at most max_uploads are tracked at once."""
+
+    def __init__(
+        self,
+        sock: soc.socket,
+        scenario: int,
+        loss_rate: float,
+        frame_size: int = FRAME_SIZE,
+        impairment: ImpairmentSpec = ImpairmentSpec(),
+        idle_timeout: float = UPLOAD_IDLE_TIMEOUT,
+        max_uploads: int = MAX_UPLOADS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.sock = sock
+        self.scenario = scenario
+        self.loss_rate = loss_rate
+        self.frame_size = frame_size
+        self.impairment = impairment
+        self.idle_timeout = idle_timeout
+        self.max_uploads = max_uploads
+        self.clock = clock
+        self.uploads: dict[tuple[str, int], Upload] = {}
+        self.next_sweep = clock() + idle_timeout
+
+        self.completed = 0
+        self.expired = 0
+        self.refused = 0  # Datagrams from new senders while max_uploads were in progress
+
+    def poll(self) -> tuple[tuple[str, int], bytes] | None:
+        """Reads and handles one datagram, returns (sender address, image) when it completes an upload.
+        Raises socket.timeout like the other receivers when the socket has a timeout and nothing arrives."""
+        rcvpkt, addr = udt_rcv(self.sock, self.frame_size)
+        return self.handle(rcvpkt, addr)
+
+    def handle(self, rcvpkt: bytes, addr: tuple[str, int]) -> tuple[tuple[str, int], bytes] | None:
+        """Handles one datagram from addr, for callers that get the datagrams themselves (e.g. an event loop).
+        sock then only needs sendto()."""
+        now = self.clock()
+        if now >= self.next_sweep:
+            self.__expire(now)
+
+        upload = self.uploads.get(addr)
+        if upload is None:
+            if len(self.uploads) >= self.max_uploads:
+                self.refused += 1
+                return None  # No ACK, the sender retries and may get in once an upload finishes or expires
+            receiver = RDT22Receiver(
+                self.sock, self.scenario, self.loss_rate, self.frame_size, self.impairment, peer=addr
+            )
+            upload = self.uploads[addr] = Upload(receiver, now)
+        upload.last_active = now
+
+        pkt = upload.receiver.handle_pkt(rcvpkt)
+        if pkt is None:
+            return None
+        image = upload.add(pkt)
+        if image is None:
+            return None
+        self.completed += 1
+        return addr, image
+
+    def __expire(self, now: float):
+        for addr in [addr for addr, upload in self.uploads.items() if now - upload.last_active > self.idle_timeout]:
+            del self.uploads[addr]
+            self.expired += 1
+        self.next_sweep = now + self.idle_timeout
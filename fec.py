@@ -0,0 +1,142 @@
+from checksum import XOR16
+from constants import *
+from Packets import ParityPacket, SeqDataPacket
+
+# Forward error correction for Selective Repeat: after every block of up to ParityPacket.MAX_COUNT data frames
+# the sender adds one parity frame, the XOR of the block's payloads. A receiver missing a single frame of the
+# block rebuilds it from the parity and the others and ACKs it, so the sender never times out on it.
+
+
+def xor_payloads(payloads) -> tuple[int, int, int]:
+    """XOR of payloads zero padded to the longest, as a little endian int so padding is free.
+    Returns (xor, longest length, XOR of the lengths)."""
+    acc = longest = num_data_xor = 0
+    for data in payloads:
+        acc ^= int.from_bytes(data, "little")
+        longest = max(longest, len(data))
+        num_data_xor ^= len(data)
+    return acc, longest, num_data_xor
+
+
+def block_for_loss(loss: float) -> int:
+    """Data frames per parity frame so a block plus its parity expects FEC_TARGET_LOSSES lost frames, enough
+    that one parity frame usually covers them. 1 (the parity is a copy) above about 25% loss."""
+    if loss <= 0.0:
+        return ParityPacket.MAX_COUNT
+    return max(1, min(ParityPacket.MAX_COUNT, int(FEC_TARGET_LOSSES / loss) - 1))
+
+
+class FecEncoder:
+    """Sender side: collects the data frames of a block and builds its parity frame. block is the fixed number
+    of data frames per parity frame, or FEC_ADAPTIVE to size every block from the loss the sender observes
+    (timeouts and frames the receiver had to rebuild, as a moving average)."""
+
+    LOSS_GAIN = 1 / 16
+
+    def __init__(self, block: int = FEC_ADAPTIVE):
+        if not 0 <= block <= ParityPacket.MAX_COUNT:
+            raise ValueError(f"FEC block must be between 1 and {ParityPacket.MAX_COUNT} frames (0 adapts), got {block}")
+        self.fixed = block
+        self.loss = 0.0  # Estimated frame loss rate
+        self.block = block or ParityPacket.MAX_COUNT  # Length of the block being built
+        self.payloads: list[bytes] = []
+        self.first_seq = 0
+        self.epoch = 0
+        self.checksum_algo = XOR16
+
+    def observe(self, lost: bool):
+        """One frame's fate: lost (timed out or rebuilt by the receiver) or ACKed the first time"""
+        self.loss += self.LOSS_GAIN * ((1.0 if lost else 0.0) - self.loss)
+
+    def add(self, pkt: SeqDataPacket) -> list[ParityPacket]:
+        """Takes a data frame on its first transmission, returns the parity frames of the blocks it completes"""
+        parities = []
+        if self.payloads and (
+            pkt.seq_num != self.first_seq + len(self.payloads)
+            or pkt.epoch != self.epoch
+            or pkt.checksum_algo != self.checksum_algo
+        ):
+            parities.append(self.flush())  # Not the same run of frames, close the block early
+        if not self.payloads:
+            self.first_seq, self.epoch, self.checksum_algo = pkt.seq_num, pkt.epoch, pkt.checksum_algo
+            self.block = self.fixed or block_for_loss(self.loss)
+        self.payloads.append(pkt.data)
+
+        if len(self.payloads) >= self.block:
+            parities.append(self.flush())
+        return parities
+
+    def flush(self) -> ParityPacket | None:
+        """Closes the block being built, returns its parity frame (None if it is empty)"""
+        if not self.payloads:
+            return None
+        acc, longest, num_data_xor = xor_payloads(self.payloads)
+        parity = ParityPacket(
+            self.first_seq,
+            len(self.payloads),
+            num_data_xor,
+            acc.to_bytes(longest, "little"),
+            self.epoch,
+            self.checksum_algo,
+        )
+        self.payloads = []
+        return parity
+
+
+class FecDecoder:
+    """Receiver side: keeps the payloads of the frames around the receive window and the parity frames of blocks
+    that miss more than one frame, and rebuilds a frame as soon as its block misses only that one."""
+
+    def __init__(self):
+        self.frames: dict[int, bytes | memoryview] = {}  # seq -> payload, from base - MAX_COUNT on
+        self.parities: dict[int, ParityPacket] = {}  # first_seq -> parity of a block still missing frames
+        self.base = 0  # Oldest frame not yet delivered, every frame before it was received or rebuilt
+
+    def reset(self):
+        """Forgets everything, for a new transfer"""
+        self.frames.clear()
+        self.parities.clear()
+        self.base = 0
+
+    def add_data(self, seq: int, data: bytes | memoryview) -> list[tuple[int, bytes]]:
+        """Records a received frame, returns the frames this lets the decoder rebuild as (seq, payload)"""
+        self.frames[seq] = data
+        for first_seq, parity in self.parities.items():
+            if first_seq <= seq < first_seq + parity.count:
+                return self.__try_recover(parity)
+        return []
+
+    def add_parity(self, parity: ParityPacket) -> list[tuple[int, bytes]]:
+        """Records a parity frame, returns the frame it rebuilds if its block misses exactly one"""
+        if parity.seq_num + parity.count <= self.base:
+            return []  # Every frame of the block was delivered already
+        self.parities[parity.seq_num] = parity
+        return self.__try_recover(parity)
+
+    def advance(self, base: int):
+        """Frames before base are delivered, drops what no block can need any more"""
+        if base <= self.base:
+            return
+        for seq in range(self.base - ParityPacket.MAX_COUNT, base - ParityPacket.MAX_COUNT):
+            self.frames.pop(seq, None)
+        self.base = base
+        for first_seq in [s for s, parity in self.parities.items() if s + parity.count <= base]:
+            del self.parities[first_seq]
+
+    def __try_recover(self, parity: ParityPacket) -> list[tuple[int, bytes]]:
+        block = range(parity.seq_num, parity.seq_num + parity.count)
+        missing = [seq for seq in block if seq not in self.frames]
+        if len(missing) > 1:
+            return []  # Wait for retransmissions, or for the block to be delivered
+        del self.parities[parity.seq_num]
+        if not missing:
+            return []
+
+        acc, _, num_data_xor = xor_payloads(self.frames[seq] for seq in block if seq != missing[0])
+        num_data = num_data_xor ^ parity.num_data_xor
+        if num_data > len(parity.parity):
+            return []  # Inconsistent with the parity, a frame from another transfer got mixed in
+        acc ^= int.from_bytes(parity.parity, "little")
+        data = acc.to_bytes(len(parity.parity), "little")[:num_data]
+        self.frames[missing[0]] = data
+        return [(missing[0], data)]
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from typing import Callable
+
+from constants import *
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content, read in chunks so large files are never fully loaded"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FrameCache:
+    """LRU cache of encoded frames, so sending the same payload again skips packetization.
+    Entries are keyed by a tuple starting with the content hash (plus frame size, checksum algorithm and anything
+    else that changes the bytes on the wire). Memory is bounded by the total size of the cached frames; when
+    cache_dir is given entries are also pickled there and survive across runs. Only point cache_dir at a
+    directory you trust, loading a pickle runs code."""
+
+    def __init__(self, max_bytes: int = FRAME_CACHE_BYTES, cache_dir: str | None = None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.entries: OrderedDict[tuple, tuple[list, int]] = OrderedDict()  # key -> (frames, size in bytes)
+        self.size = 0  # Bytes held by all entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key: tuple, build: Callable[[], list]) -> list:
+        """Returns the frames cached under key, calling build() to encode them on a miss"""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key][0]
+
+        frames = self.__load(key)
+        if frames is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            frames = build()
+            self.__store(key, frames)
+
+        self.__insert(key, frames)
+        return frames
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __insert(self, key: tuple, frames: list):
+        # Both the payload and the encoded frame stay referenced by each packet
+        size = sum(len(frame.full_pkt) + len(getattr(frame, "data", b"")) for frame in frames)
+        if size > self.max_bytes:
+            return  # Would evict everything and still not fit
+
+        while self.size + size > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+        self.entries[key] = (frames, size)
+        self.size += size
+
+    def __path(self, key: tuple) -> str:
+        return os.path.join(self.cache_dir, "_".join(str(part) for part in key) + ".frames")
+
+    def __load(self, key: tuple) -> list | None:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.__path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def __store(self, key: tuple, frames: list):
+        if self.cache_dir is None:
+            return
+        # Write then rename so an interrupted run never leaves a truncated entry behind
+        path = self.__path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(frames, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
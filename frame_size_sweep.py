@@ -0,0 +1,172 @@
+import argparse
+import csv
+import os
+import socket as soc
+import threading
+import time
+
+from bulk_io import size_buffers
+from compression import NO_COMPRESSION
+from constants import *
+from gbn_receiver import GBNReceiver
+from impairments import ImpairmentSpec
+from rdt22_receiver import RDT22Receiver
+from receiver_app import receive_one_image
+from results_store import MODE_NAMES, SCENARIO_NAMES
+from sender_app import image_file_2_bytes, make_data_pkt, make_sender, make_seq_data_pkt, run_sender
+from sr_receiver import SRReceiver
+
+
+def handle_CLI():
+    """Reads command line arguments to get the sweep grid"""
+    parser = argparse.ArgumentParser(description="Throughput vs frame size sweep over loopback")
+    parser.add_argument("-i", "--input_file", default="megamind",
+                        help="Image base name to send (no extension)")
+    parser.add_argument("-m", "--modes", default=[RDT22_MODE, GBN_MODE, SR_MODE], type=int, nargs="+",
+                        help="Transport protocols: 1=RDT 2.2, 2=Go-Back-N, 3=Selective Repeat")
+    parser.add_argument("-s", "--scenarios", default=[NO_LOSS, TX_ACK_LOSS, RX_DATA_LOSS], type=int, nargs="+",
+                        help="Data transfer scenarios: 1=NO_LOSS, 2=TX_ACK_LOSS, 3=RX_DATA_LOSS")
+    parser.add_argument("-l", "--losses", default=[0, 10, 30], type=int, nargs="+",
+                        help="Loss percentages for the lossy scenarios")
+    parser.add_argument("-f", "--frame_sizes", default=[512, 1024, 2048, 4096, 8192, 16384, 32768], type=int,
+                        nargs="+", help="Frame sizes in bytes")
+    parser.add_argument("-w", "--window", default=WINDOW_SIZE, type=int,
+                        help="Window size in frames for the pipelined protocols")
+    args = parser.parse_args()
+    return args.input_file, args.modes, args.scenarios, args.losses, args.frame_sizes, args.window
+
+
+def make_receiver(
+    rx_sock: soc.socket,
+    mode: int,
+    scenario: int,
+    loss: float,
+    window: int,
+    frame_size: int,
+    impairment: ImpairmentSpec = ImpairmentSpec(),
+    batch: bool = True,
+):
+    """Builds the receiver matching the sender's protocol, receiver-side loss only applies to RX_DATA_LOSS"""
+    rx_loss_rate = loss if scenario == RX_DATA_LOSS else 0.0
+    if mode == GBN_MODE:
+        return GBNReceiver(rx_sock, scenario, rx_loss_rate, frame_size, impairment, batch)
+    elif mode == SR_MODE:
+        return SRReceiver(rx_sock, scenario, rx_loss_rate, window, frame_size, impairment, batch)
+    else:
+        return RDT22Receiver(rx_sock, scenario, rx_loss_rate, frame_size, impairment)
+
+
+def run_transfer(
+    bytes_image: bytes,
+    mode: int,
+    scenario: int,
+    loss: float,
+    window: int,
+    frame_size: int,
+    port: int = RX_PORT,
+    impairment: ImpairmentSpec = ImpairmentSpec(),
+    batch: bool = True,
+    codec: int = NO_COMPRESSION,
+    level: int | None = None,
+    congestion: bool = False,
+) -> tuple[float, dict]:
+    """Sends one image to a receiver thread in this process over loopback on the given port.
+    Returns the transfer time in seconds and the sender's statistics, plus whether the image arrived intact (a
+    weak checksum can let corrupted frames through) and the receiver's system calls (rx_syscalls) for the
+    pipelined protocols. batch=False turns the batched system calls off. With a codec
+    the frames carry the compressed image; it is compressed before the clock starts. congestion turns on AIMD
+    in the pipelined senders."""
+    if mode in (GBN_MODE, SR_MODE):
+        packets = make_seq_data_pkt(bytes_image, 0, frame_size=frame_size, codec=codec, level=level)
+    else:
+        packets = make_data_pkt(bytes_image, frame_size=frame_size, codec=codec, level=level)
+
+    rx_sock = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    rx_sock.setsockopt(soc.SOL_SOCKET, soc.SO_REUSEADDR, 1)
+    rx_sock.bind((RX_ADDR, port))
+    size_buffers(rx_sock, window, frame_size)
+    receiver = make_receiver(rx_sock, mode, scenario, loss, window, frame_size, impairment, batch)
+
+    done = threading.Event()
+    received: list[bytes] = []
+
+    def receive():
+        received.append(receive_one_image(receiver))
+        # Keep answering retransmissions until the sender has seen its last ACK
+        rx_sock.settimeout(0.05)
+        while not done.is_set():
+            try:
+                receiver.get_data_pkt()
+            except soc.timeout:
+                pass
+
+    rx_thread = threading.Thread(target=receive, daemon=True)
+    tx_sock = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    with rx_sock, tx_sock:
+        rx_thread.start()
+        size_buffers(tx_sock, window, frame_size)
+        sender = make_sender(
+            tx_sock,
+            mode,
+            scenario,
+            loss,
+            window,
+            impairment=impairment,
+            dest=(RX_ADDR, port),
+            batch=batch,
+            congestion=congestion and mode in (GBN_MODE, SR_MODE),
+        )
+        start_time = time.perf_counter()
+        run_sender(sender, packets)
+        seconds = time.perf_counter() - start_time
+
+        done.set()
+        rx_thread.join()
+
+    stats = sender.get_stats()
+    stats["intact"] = received == [bytes_image]
+    if mode in (GBN_MODE, SR_MODE):
+        stats["rx_syscalls"] = receiver.get_stats()["syscalls"]
+    return seconds, stats
+
+
+if __name__ == "__main__":
+    input_file, modes, scenarios, losses, frame_sizes, window = handle_CLI()
+    bytes_image = image_file_2_bytes(input_file)
+
+    results_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+    os.makedirs(results_folder, exist_ok=True)
+    out_path = os.path.join(results_folder, "frame_size_sweep.csv")
+
+    rows = []
+    for mode in modes:
+        for scenario in scenarios:
+            for loss in ([0] if scenario == NO_LOSS else losses):
+                for frame_size in frame_sizes:
+                    seconds, stats = run_transfer(bytes_image, mode, scenario, loss / 100.0, window, frame_size)
+                    throughput = len(bytes_image) / seconds / 1e6
+                    rows.append(
+                        [MODE_NAMES[mode], SCENARIO_NAMES[scenario], loss, frame_size, seconds, throughput,
+                         stats["intact"]]
+                    )
+                    print(
+                        f"{MODE_NAMES[mode]:>5} {SCENARIO_NAMES[scenario]:>12} loss={loss:>2}% "
+                        f"frame={frame_size:>5}: {seconds:8.3f} s, {throughput:7.2f} MB/s"
+                        + ("" if stats["intact"] else ", image corrupted")
+                    )
+
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["mode", "scenario", "loss", "frame_size", "seconds", "throughput_MBps", "intact"])
+        writer.writerows(rows)
+
+    print(f"\nBest frame size per configuration (full results in {out_path}):")
+    best: dict[tuple, list] = {}
+    for row in rows:
+        if not row[6]:
+            continue  # A corrupted image is no candidate, however fast it went
+        key = tuple(row[:3])
+        if key not in best or row[5] > best[key][5]:
+            best[key] = row
+    for (mode_name, scenario_name, loss), row in best.items():
+        print(f"{mode_name:>5} {scenario_name:>12} loss={loss:>2}%: {row[3]} bytes ({row[5]:.2f} MB/s)")
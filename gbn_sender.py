@@ -0,0 +1,220 @@
+import socket as soc
+import time
+from typing import Callable
+
+from bulk_io import BatchReceiver, BatchSender
+from congestion import AIMDWindow
+from constants import *
+from impairments import ImpairmentSpec
+from pacing import TokenBucket
+from Packets import SeqAckPacket, SeqDataPacket
+from rto import RTOEstimator
+
+
+def udt_rcv(rx: BatchReceiver) -> bytes:
+    # Use recvfrom on UDP (works without connect()), ACKs that arrived together come from one system call
+    data, _ = rx.recvfrom()
+    return data
+
+
+def udt_send(out: BatchSender, pkt: bytes, addr: tuple[str, int] = (RX_ADDR, RX_PORT)):
+    out.sendto(pkt, addr)  # Leaves with the rest of the batch on out.flush()
+
+
+class GBNSender:
+    """Go-Back-N sender: up to `window` frames in flight, cumulative ACKs and a single retransmission timer"""
+
+    def __init__(
+        self,
+        sock: soc.socket,
+        scenario: int,
+        loss_rate: float,
+        window: int = WINDOW_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+        impairment: ImpairmentSpec = ImpairmentSpec(),
+        dest: tuple[str, int] = (RX_ADDR, RX_PORT),
+        batch: bool = True,
+        congestion: bool = False,
+        pacer: TokenBucket | None = None,
+    ):
+        self.sock = sock
+        # Frames queue up here until the sender waits for an ACK, resends wait for the pacer's tokens in sendto()
+        self.out = BatchSender(sock, enabled=batch, pacer=pacer)
+        self.pacer = pacer  # Spaces new frames out to a rate, None sends them as soon as the window allows
+        self.paced_len: int | None = None  # Length of the frame rdt_send() last held back for the pacer
+        self.acks = BatchReceiver(sock, 1024, enabled=batch)
+        self.dest = dest  # Address of the receiver
+        self.clock = clock  # Time source for RTT samples and timers, swapped for a virtual clock in simulation
+        self.rto = RTOEstimator()  # resend the whole window if the oldest frame isn't ACKed in time
+        self.window = window
+        self.rwnd = window  # Receiver's advertised window, from the latest ACK that carried one
+        self.cc = AIMDWindow(window) if congestion else None  # Congestion window, None keeps the fixed window
+        self.base = 0  # Oldest unACKed sequence number
+        self.next_seq = 0  # Sequence number of the next frame handed to rdt_send
+        self.unacked: dict[int, SeqDataPacket] = {}  # buffer of frames in flight
+        self.sent_times: dict[int, float] = {}  # first transmission time of frames never resent
+        self.epoch: int | None = None
+        self.timer_start: float | None = None
+        self.scenario = scenario
+        # Normalize loss_rate to 0..1 if user passes 0..100
+        self.loss_rate = loss_rate if 0.0 <= loss_rate <= 1.0 else max(0.0, min(1.0, loss_rate / 100.0))
+        self.impairment = impairment.build(self.loss_rate)  # Applied to incoming ACKs in TX_ACK_LOSS
+
+        self.frames_sent = 0
+        self.retransmissions = 0
+        self.timeouts = 0
+
+    def can_send(self) -> bool:
+        """True if the window has room for another frame"""
+        return self.next_seq < self.base + self.send_window()
+
+    def send_window(self) -> int:
+        """Frames allowed in flight: the configured window, capped by the receiver's advertised window and the
+        congestion window. Never below one, so a closed advertised window is probed with a single frame."""
+        window = min(self.window, self.rwnd)
+        if self.cc is not None:
+            window = min(window, self.cc.window)
+        return max(1, window)
+
+    def in_flight(self) -> int:
+        """Number of frames sent but not yet ACKed"""
+        return self.next_seq - self.base
+
+    def rdt_send(self, curr_packet: SeqDataPacket) -> bool:
+        """Called by application to send one frame, returns False if the window is full or the pacer holds
+        the frame back; input() then also waits for the pacer"""
+        self.paced_len = None
+        if not self.can_send():
+            return False
+        if self.pacer is not None and self.pacer.delay(len(curr_packet.full_pkt)) > 0:
+            self.paced_len = len(curr_packet.full_pkt)
+            return False
+
+        if curr_packet.seq_num != self.next_seq:
+            raise ValueError(f"Expected frame {self.next_seq}, got {curr_packet.seq_num}")
+
+        if self.epoch is None:
+            self.epoch = curr_packet.epoch
+
+        self.unacked[curr_packet.seq_num] = curr_packet
+        udt_send(self.out, curr_packet.full_pkt, self.dest)
+        self.frames_sent += 1
+        self.sent_times[curr_packet.seq_num] = self.clock()
+
+        if self.base == self.next_seq:
+            self.timer_start = self.sent_times[curr_packet.seq_num]
+        self.next_seq += 1
+        return True
+
+    def input(self) -> bool:
+        """Called to wait for one ACK (or the timer), returns True if the window was resent"""
+        self.out.flush()
+        if self.timer_start is None:
+            if self.paced_len is not None:
+                self.pacer.wait(self.paced_len)  # Nothing in flight, no ACK to read meanwhile
+            return False
+
+        remaining = self.timer_start + self.rto.rto - self.clock()
+        # ACKs are read while a held back frame waits for the pacer, the wait ends when it may leave
+        wait = remaining if self.paced_len is None else min(remaining, self.pacer.delay(self.paced_len))
+        try:
+            if wait <= 0:
+                raise soc.timeout
+            self.sock.settimeout(wait)
+            rcvpkt = udt_rcv(self.acks)
+        except soc.timeout:
+            if wait < remaining:
+                return False  # The held back frame may leave, no timer expired
+            # The deadline may have passed while we were sending or pacing, with the ACKs already waiting
+            self.__drain_acks()
+            if self.timer_start is None or self.clock() < self.timer_start + self.rto.rto:
+                return False  # They moved the window, which restarted the timer
+            # Timer expired -> go back N: resend every frame in flight
+            self.timeouts += 1
+            self.rto.backoff()
+            if self.cc is not None and self.cc.is_new_loss(self.base):
+                self.cc.on_loss(self.next_seq)
+            self.__resend_window()
+            return True
+
+        self.__handle_ack(rcvpkt)
+        return False
+
+    def __drain_acks(self):
+        # Handles every ACK that has already arrived without blocking, so the window is resent from the right base
+        self.sock.settimeout(0)
+        while True:
+            try:
+                rcvpkt = udt_rcv(self.acks)
+            except (soc.timeout, BlockingIOError):
+                return
+            self.__handle_ack(rcvpkt)
+
+    def __handle_ack(self, rcvpkt: bytes):
+        rcvpkt = self.__corrupt_ACK_bytes(rcvpkt)
+        if rcvpkt is None:
+            return  # Dropped on the way, the timer keeps running
+
+        if SeqAckPacket.is_corrupt(rcvpkt):
+            return  # Ignore corrupt ACKs, the timer will take care of it
+
+        ack = SeqAckPacket.packet_from_bytes(rcvpkt)
+        if ack is None or ack.epoch != self.epoch:
+            return  # Stale ACK from a previous transfer
+
+        if ack.window is not None:
+            self.rwnd = ack.window
+
+        # Cumulative ACK: seq_num is the next frame the receiver expects
+        if self.base < ack.seq_num <= self.next_seq:
+            if self.cc is not None:
+                self.cc.on_ack(ack.seq_num - self.base)
+            # Karn's algorithm: only time the newest ACKed frame if it was sent exactly once
+            sent_time = self.sent_times.get(ack.seq_num - 1)
+            if sent_time is not None:
+                self.rto.sample(self.clock() - sent_time)
+            self.rto.reset_backoff()
+
+            for seq in range(self.base, ack.seq_num):
+                del self.unacked[seq]
+                self.sent_times.pop(seq, None)
+            self.base = ack.seq_num
+
+            if self.base == self.next_seq:
+                self.timer_start = None
+            else:
+                self.timer_start = self.clock()
+
+    def get_stats(self) -> dict:
+        """Per-transfer statistics, RTO/SRTT in seconds"""
+        return {
+            "frames_sent": self.frames_sent,
+            "retransmissions": self.retransmissions,
+            "timeouts": self.timeouts,
+            "rto": self.rto.rto,
+            "srtt": self.rto.srtt,
+            "syscalls": self.out.syscalls + self.acks.syscalls,
+            "rwnd": self.rwnd,
+            "cwnd": self.cc.cwnd if self.cc is not None else None,
+        }
+
+    def __resend_window(self):
+        for seq in range(self.base, self.next_seq):
+            udt_send(self.out, self.unacked[seq].full_pkt, self.dest)
+            self.frames_sent += 1
+            self.retransmissions += 1
+        self.out.flush()
+        self.sent_times.clear()
+        self.timer_start = self.clock()
+
+    def __corrupt_ACK_bytes(self, rx_bytes: bytes) -> bytes | None:
+        """Impairs ACK packets depending on the scenario and loss rate, returns None if the ACK was dropped"""
+
+        if self.scenario == NO_LOSS:
+            return rx_bytes
+        elif self.scenario == TX_ACK_LOSS:
+            return self.impairment.apply(rx_bytes)
+        elif self.scenario == RX_DATA_LOSS:
+            return rx_bytes
+        else:
+            raise NotImplementedError
@@ -2,111 +2,225 @@ import argparse
 import os
 
 import matplotlib.pyplot as plt
+import numpy as np
 
 from constants import *
+from results_store import MODE_NAMES, SCENARIO_NAMES, load_columns, results_path
 
+PERCENTILES = (50, 95, 99)
+SUMMARY_FIELDS = ("mode", "scenario", "loss", "count", "mean", "p50", "p95", "p99", "goodput", "retransmit_ratio")
 
-def handle_CLI() -> str:
-    "Reads command line arguments to get the output file name"
 
-    parser = argparse.ArgumentParser(description="Image receiver with RDT 1.0 protocol")
+def handle_CLI():
+    "Reads command line arguments to get the results file and which transfers to analyze"
 
+    parser = argparse.ArgumentParser(description="Completion time analysis and plots per loss level and scenario")
+
+    parser.add_argument(
+        "-r",
+        "--results",
+        default=None,
+        help="Results CSV to analyze, defaults to results/transfers.csv (the sweep outputs work too)",
+    )
     parser.add_argument(
         "-s",
-        "--scenario",
-        default=1,
+        "--scenarios",
+        default=None,
+        type=int,
+        nargs="+",
+        help="Only these data transfer scenarios: 1=NO_LOSS, 2=TX_ACK_LOSS, 3=RX_DATA_LOSS (default all)",
+    )
+    parser.add_argument(
+        "-m",
+        "--modes",
+        default=None,
+        type=int,
+        nargs="+",
+        help="Only these transport protocols: 1=RDT 2.2, 2=Go-Back-N, 3=Selective Repeat (default all), with "
+        "their FEC, AIMD and compression variants",
+    )
+    parser.add_argument(
+        "-f",
+        "--frame_size",
+        default=None,
         type=int,
-        help="Data transfer scenario to implement",
+        help="Only transfers with this frame size, for results that mix several",
     )
 
     args = parser.parse_args()
 
-    return args.scenario
-
-
-def read_times_and_loss(file_name: str) -> dict[int, dict[int, list[int]]]:
-    """Read times and loss from a time file and extrac them into a dictionary"""
-    results_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
-    full_time_file_path = os.path.join(results_folder, file_name)
-
-    time_loss_dict: dict[int, list[int]] = {}
-
-    # Instantiate dictionary entries
-    for loss_int in range(0, 61, 5):
-        time_loss_dict[loss_int] = []
-
-    # Extract the loss and time
-    with open(full_time_file_path, "r") as f:
-        for line in f:
-            _, loss, time = map(int, line.strip().split(","))
-            time_loss_dict[loss].append(time)
-
-    return time_loss_dict
-
-
-def get_time_diffs(
-    start_time_loss: dict[int, list], end_time_loss: dict[int, list]
-) -> dict[int, int]:
-    """Given a start time dictionary and end time dictionary, calculate the average time difference for each loss level"""
-    avg_diffs_dict = {}
-
-    for loss_int in range(0, 61, 5):
-        diff_list = []
-        start_time_list = start_time_loss[loss_int]
-        end_time_list = end_time_loss[loss_int]
-
-        # Calculate the time difference for each iteration
-        for iter in range(len(start_time_list)):
-            diff_list.append(end_time_list[iter] - start_time_list[iter])
-
-        # Calculate the average difference over the iterations
-        if len(diff_list) != 0:
-            avg_diffs_dict[loss_int] = sum(diff_list) / len(diff_list)
-
-    return avg_diffs_dict
-
-
-def plot_time_loss(title: str, time_diffs: dict[int, int]):
-    """Plots the loss vs completion time and saves it to file"""
-    results_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
-    file_name = f"{title}_plot.png"
-    full_path = os.path.join(results_folder, file_name)
-
-    loss_axis = []
-    time_axis = []
-
-    for loss_int in range(0, 61, 5):
-        try:
-            time_axis.append(time_diffs[loss_int])
-            loss_axis.append(loss_int)
-        except:
-            pass
-
-    plt.plot(loss_axis, time_axis)
-    plt.grid()
-    plt.xlabel("Loss percentage")
-    plt.ylabel("Average completion time (s)")
-    plt.title(f"Scenario: {title}")
-
-    plt.savefig(full_path)
+    return args
+
+
+def named(column: np.ndarray, names: dict[int, str]) -> np.ndarray:
+    """Mode/scenario columns hold names, older records the numbers, map both to names"""
+    if column.dtype == object:
+        return column.astype(str)
+    return np.array([names.get(int(v), str(int(v))) for v in column])
+
+
+def column_or_nan(columns: dict[str, np.ndarray], name: str, n: int) -> np.ndarray:
+    column = columns.get(name)
+    if column is None or column.dtype == object:
+        return np.full(n, np.nan)
+    return column
+
+
+def transfer_durations(columns: dict[str, np.ndarray], n: int) -> np.ndarray:
+    """Completion time per transfer: the receiver's reported duration, else the sender's elapsed time.
+    The sweep outputs only have seconds."""
+    if "seconds" in columns:
+        return columns["seconds"]
+    rx_duration = column_or_nan(columns, "rx_duration", n)
+    return np.where(np.isnan(rx_duration), column_or_nan(columns, "elapsed", n), rx_duration)
+
+
+def group_percentiles(values: np.ndarray, group: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """q-th percentile (linear interpolation) of values within every group in one pass, groups numbered 0..n-1"""
+    order = np.lexsort((values, group))
+    ordered = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    pos = starts + (counts - 1) * (q / 100.0)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, starts + counts - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def group_mean(values: np.ndarray, group: np.ndarray, num_groups: int) -> np.ndarray:
+    """Mean within every group ignoring NaN, NaN for a group without any value"""
+    valid = ~np.isnan(values)
+    sums = np.bincount(group[valid], values[valid], minlength=num_groups)
+    counts = np.bincount(group[valid], minlength=num_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def summarize(
+    columns: dict[str, np.ndarray],
+    scenarios: list[str] | None = None,
+    modes: list[str] | None = None,
+    frame_size: int | None = None,
+) -> dict[str, np.ndarray]:
+    """Per (mode, scenario, loss) group: transfer count, mean and p50/p95/p99 completion time in seconds, mean
+    goodput in MB/s (NaN without a receiver report) and retransmissions per frame sent. Works for any loss grid."""
+    n = len(columns["loss"])
+    mode = named(columns["mode"], MODE_NAMES) if "mode" in columns else np.full(n, "")
+    scenario = named(columns["scenario"], SCENARIO_NAMES)
+    loss = columns["loss"]
+    duration = transfer_durations(columns, n)
+
+    keep = ~np.isnan(duration)
+    if scenarios is not None:
+        keep &= np.isin(scenario, scenarios)
+    if modes is not None:
+        # Variants such as sr+fec or gbn+zlib belong to their protocol, they still plot as separate lines
+        keep &= np.isin(np.char.partition(mode, "+")[:, 0], modes)
+    if frame_size is not None and "frame_size" in columns:
+        keep &= columns["frame_size"] == frame_size
+
+    mode, scenario, loss, duration = mode[keep], scenario[keep], loss[keep], duration[keep]
+    rx_bytes = column_or_nan(columns, "rx_bytes", n)[keep]
+    frames_sent = column_or_nan(columns, "frames_sent", n)[keep]
+    retransmissions = column_or_nan(columns, "retransmissions", n)[keep]
+    throughput = column_or_nan(columns, "throughput", n)[keep]
+
+    # One integer id per (mode, scenario, loss), numbered in sorted order
+    mode_ids, mode_inv = np.unique(mode, return_inverse=True)
+    scenario_ids, scenario_inv = np.unique(scenario, return_inverse=True)
+    loss_ids, loss_inv = np.unique(loss, return_inverse=True)
+    key = (mode_inv * len(scenario_ids) + scenario_inv) * len(loss_ids) + loss_inv
+    keys, group, counts = np.unique(key, return_inverse=True, return_counts=True)
+    num_groups = len(keys)
+
+    summary = {
+        "mode": mode_ids[keys // (len(scenario_ids) * len(loss_ids))],
+        "scenario": scenario_ids[keys // len(loss_ids) % len(scenario_ids)],
+        "loss": loss_ids[keys % len(loss_ids)],
+        "count": counts,
+        "mean": np.bincount(group, duration, minlength=num_groups) / np.maximum(counts, 1),
+    }
+    for q in PERCENTILES:
+        summary[f"p{q}"] = group_percentiles(duration, group, counts, q)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # frame_size_sweep records throughput in MB/s instead of the bytes received
+        goodput = throughput if "throughput" in columns else rx_bytes / duration / 1e6
+        summary["goodput"] = group_mean(goodput, group, num_groups)
+        sent = np.bincount(group, np.nan_to_num(frames_sent), minlength=num_groups)
+        retransmitted = np.bincount(group, np.nan_to_num(retransmissions), minlength=num_groups)
+        summary["retransmit_ratio"] = retransmitted / sent  # NaN for results without frame counts
+    return summary
+
+
+def write_summary(path: str, summary: dict[str, np.ndarray]):
+    """Writes the summary table as CSV, one row per group"""
+    with open(path, "w") as f:
+        f.write(",".join(SUMMARY_FIELDS) + "\n")
+        for i in range(len(summary["loss"])):
+            f.write(",".join(str(summary[name][i]) for name in SUMMARY_FIELDS) + "\n")
+
+
+def print_summary(summary: dict[str, np.ndarray]):
+    print(f"{'mode':>5} {'scenario':>12} {'loss':>5} {'n':>4} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} "
+          f"{'MB/s':>7} {'retx':>6}")
+    for i in range(len(summary["loss"])):
+        print(
+            f"{summary['mode'][i]:>5} {summary['scenario'][i]:>12} {summary['loss'][i]:>4g}% {summary['count'][i]:>4} "
+            f"{summary['mean'][i]:9.3f} {summary['p50'][i]:9.3f} {summary['p95'][i]:9.3f} {summary['p99'][i]:9.3f} "
+            f"{summary['goodput'][i]:7.2f} {summary['retransmit_ratio'][i]:6.3f}"
+        )
+
+
+def plot_time_loss(title: str, summary: dict[str, np.ndarray]):
+    """Plots loss vs completion time (mean with the p50..p99 spread), goodput and retransmit ratio for one
+    scenario, one line per protocol, and saves it to file"""
+    full_path = results_path(f"{title}_plot.png")
+
+    fig, (ax_time, ax_goodput, ax_retx) = plt.subplots(3, 1, sharex=True, figsize=(7, 10))
+    for mode in np.unique(summary["mode"]):
+        rows = summary["mode"] == mode
+        loss_axis = summary["loss"][rows]
+        label = mode or None
+        line = ax_time.plot(loss_axis, summary["mean"][rows], marker="o", label=label)[0]
+        ax_time.fill_between(loss_axis, summary["p50"][rows], summary["p99"][rows], color=line.get_color(), alpha=0.2)
+        ax_time.plot(loss_axis, summary["p95"][rows], linestyle="--", color=line.get_color())
+        ax_goodput.plot(loss_axis, summary["goodput"][rows], marker="o", label=label)
+        ax_retx.plot(loss_axis, summary["retransmit_ratio"][rows], marker="o", label=label)
+
+    ax_time.set_ylabel("Completion time (s)\nmean, p95 dashed, p50-p99 shaded")
+    ax_goodput.set_ylabel("Goodput (MB/s)")
+    ax_retx.set_ylabel("Retransmissions per frame sent")
+    ax_retx.set_xlabel("Loss percentage")
+    for ax in (ax_time, ax_goodput, ax_retx):
+        ax.grid()
+    if any(summary["mode"]):
+        ax_time.legend()
+    ax_time.set_title(f"Scenario: {title}")
+
+    fig.tight_layout()
+    fig.savefig(full_path)
+    plt.close(fig)
 
 
 if __name__ == "__main__":
-    scenario = handle_CLI()
-
-    if scenario == NO_LOSS:
-        file_name = "no_loss"
-    elif scenario == TX_ACK_LOSS:
-        file_name = "tx_ack_loss"
-    elif scenario == RX_DATA_LOSS:
-        file_name = "rx_data_loss"
-    else:
-        print("Unknown scenario. Valid options are 1, 2, and 3")
+    args = handle_CLI()
+    results_file = args.results or results_path("transfers.csv")
+    if not os.path.exists(results_file):
+        print(f"No results at {results_file}, run a transfer first")
         exit()
 
-    start_times_loss = read_times_and_loss(f"{file_name}_start_times.txt")
-    end_times_loss = read_times_and_loss(f"{file_name}_end_times.txt")
+    scenarios = None if args.scenarios is None else [SCENARIO_NAMES.get(s, str(s)) for s in args.scenarios]
+    modes = None if args.modes is None else [MODE_NAMES.get(m, str(m)) for m in args.modes]
+    summary = summarize(load_columns(results_file), scenarios, modes, args.frame_size)
+    if len(summary["loss"]) == 0:
+        print("No matching transfers")
+        exit()
 
-    avg_diffs_dict = get_time_diffs(start_times_loss, end_times_loss)
+    print_summary(summary)
+    stem = os.path.splitext(os.path.basename(results_file))[0]
+    summary_path = results_path(f"{stem}_summary.csv")
+    write_summary(summary_path, summary)
+    print(f"Summary written to {summary_path}")
 
-    plot_time_loss(file_name, avg_diffs_dict)
+    for scenario in np.unique(summary["scenario"]):
+        rows = summary["scenario"] == scenario
+        plot_time_loss(scenario, {name: column[rows] for name, column in summary.items()})
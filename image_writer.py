@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+from typing import Callable
+
+from compression import DecompressingSink
+from constants import *
+from reassembly import ReassemblySink
+
+
+class ImageWriter:
+    """Persists completed images on a background thread so the protocol thread goes straight back to reading
+    the socket. Jobs wait in a queue of at most max_queue images; when the disk falls that far behind,
+    submitting blocks (backpressure) and the time spent blocked is counted. A failed write is raised from the
+    next call made on the writer."""
+
+    def __init__(self, max_queue: int = WRITER_QUEUE_DEPTH):
+        self.jobs: queue.Queue[tuple[Callable[[], tuple[str, int]], float] | None] = queue.Queue(max_queue)
+        self.error: BaseException | None = None
+        self.lock = threading.Lock()  # Guards the counters, updated by both threads
+
+        self.submitted = 0
+        self.written = 0
+        self.bytes = 0
+        self.max_depth = 0
+        self.blocked_seconds = 0.0  # Protocol thread time spent waiting for room in the queue
+        self.write_seconds = 0.0  # Time spent writing, summed over the images
+        self.max_write_seconds = 0.0
+        self.max_latency_seconds = 0.0  # Longest submit to durable on disk
+
+        self.thread = threading.Thread(target=self.__run, name="image-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, path: str, image_bytes: bytes):
+        """Queues a whole image to be written to path"""
+
+        def job():
+            with open(path, "wb") as f:
+                f.write(image_bytes)
+            return path, len(image_bytes)
+
+        self.__submit(job)
+
+    def finish(self, sink: ReassemblySink | DecompressingSink):
+        """Queues the fsync and rename of an image that is already in its reassembly file"""
+
+        def job():
+            try:
+                return sink.path, sink.finish()
+            except BaseException:
+                sink.abort()
+                raise
+
+        self.__submit(job)
+
+    def depth(self) -> int:
+        """Images waiting for the writer, the one being written not included"""
+        return self.jobs.qsize()
+
+    def close(self):
+        """Waits for every queued image to be on disk"""
+        if self.thread.is_alive():
+            self.jobs.put(None)
+            self.thread.join()
+        self.__raise_error()
+
+    def get_stats(self) -> dict:
+        """Writer counters, times in seconds"""
+        with self.lock:
+            return {
+                "written": self.written,
+                "bytes": self.bytes,
+                "depth": self.depth(),
+                "max_depth": self.max_depth,
+                "blocked": self.blocked_seconds,
+                "mean_write": self.write_seconds / self.written if self.written else None,
+                "max_write": self.max_write_seconds,
+                "max_latency": self.max_latency_seconds,
+            }
+
+    def __submit(self, job: Callable[[], tuple[str, int]]):
+        self.__raise_error()
+        start = time.perf_counter()
+        self.jobs.put((job, start))  # Blocks while the queue is full
+        blocked = time.perf_counter() - start
+        with self.lock:
+            self.submitted += 1
+            self.blocked_seconds += blocked
+            self.max_depth = max(self.max_depth, self.jobs.qsize())
+
+    def __run(self):
+        while (item := self.jobs.get()) is not None:
+            job, submitted = item
+            start = time.perf_counter()
+            try:
+                path, num_bytes = job()
+            except BaseException as exc:
+                if self.error is None:
+                    self.error = exc
+                continue
+            end = time.perf_counter()
+            with self.lock:
+                self.written += 1
+                self.bytes += num_bytes
+                self.write_seconds += end - start
+                self.max_write_seconds = max(self.max_write_seconds, end - start)
+                self.max_latency_seconds = max(self.max_latency_seconds, end - submitted)
+            print(f"Saved image to: {path} ({num_bytes} bytes, {(end - start) * 1000:.1f} ms to write)")
+
+    def __raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
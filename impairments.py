@@ -0,0 +1,175 @@
+import argparse
+import random
+from dataclasses import dataclass
+
+# Loss processes decide WHICH packets are hit, actions decide WHAT happens to them.
+# Both draw from the same generator: the random module by default (the original behavior), or a private
+# random.Random(seed) so a run can be repeated exactly.
+
+LOSS_MODELS = ("bernoulli", "gilbert", "trace")
+ACTIONS = ("flip", "bits", "drop")
+
+
+class BernoulliLoss:
+    """Every packet is hit independently with probability rate"""
+
+    def __init__(self, rate: float, rng=random):
+        self.rate = rate
+        self.rng = rng
+
+    def hit(self) -> bool:
+        return self.rng.random() < self.rate
+
+
+class GilbertElliottLoss:
+    """Two state Markov chain: packets in the bad state are hit with probability loss_bad, in the good state
+    with loss_good. Losses come in bursts whose mean length is 1 / p_bad_to_good."""
+
+    def __init__(
+        self, p_good_to_bad: float, p_bad_to_good: float, loss_good: float = 0.0, loss_bad: float = 1.0, rng=random
+    ):
+        self.p_good_to_bad = p_good_to_bad
+        self.p_bad_to_good = p_bad_to_good
+        self.loss_good = loss_good
+        self.loss_bad = loss_bad
+        self.rng = rng
+        self.bad = False
+
+    @classmethod
+    def from_rate(cls, rate: float, burst: float, rng=random) -> "GilbertElliottLoss":
+        """Chain with the given long run loss rate and mean burst length in packets (every bad packet is hit).
+        Raises ValueError if bursts that short cannot add up to the rate: the good state is left at most once
+        per packet, so the mean burst has to be at least rate / (1 - rate)."""
+        if rate >= 1.0:
+            return cls(1.0, 0.0, rng=rng)
+        p_bad_to_good = 1.0 / max(burst, 1.0)
+        # Stationary share of the bad state is p_gb / (p_gb + p_bg), solve it for the loss rate
+        p_good_to_bad = rate * p_bad_to_good / (1.0 - rate)
+        if p_good_to_bad > 1.0 + 1e-9:
+            raise ValueError(
+                f"A mean burst of {burst:g} packets cannot reach {rate:.0%} loss, it needs at least "
+                f"{rate / (1.0 - rate):.2f}"
+            )
+        return cls(min(1.0, p_good_to_bad), p_bad_to_good, rng=rng)
+
+    def hit(self) -> bool:
+        if self.bad:
+            self.bad = self.rng.random() >= self.p_bad_to_good
+        else:
+            self.bad = self.rng.random() < self.p_good_to_bad
+        return self.rng.random() < (self.loss_bad if self.bad else self.loss_good)
+
+
+class TraceLoss:
+    """Replays a recorded per-packet trace: one 0 (delivered) or 1 (lost) per packet, whitespace optional,
+    '#' starts a comment. The trace wraps around when it runs out."""
+
+    def __init__(self, path: str):
+        with open(path) as f:
+            text = "".join(line.split("#", 1)[0] for line in f)
+        self.trace = [c == "1" for c in text if c in "01"]
+        if not self.trace:
+            raise ValueError(f"Loss trace {path} has no 0/1 entries")
+        self.pos = 0
+
+    def hit(self) -> bool:
+        lost = self.trace[self.pos]
+        self.pos = (self.pos + 1) % len(self.trace)
+        return lost
+
+
+def flip_middle_bit(pkt: bytes, header: int, trailer: int) -> bytes:
+    """Flips one bit in the middle of the packet body (keeps length, breaks the checksum)"""
+    i = header + (len(pkt) - header - trailer) // 2
+    if not 0 <= i < len(pkt):
+        return pkt
+    ba = bytearray(pkt)
+    ba[i] ^= 0x01
+    return bytes(ba)
+
+
+def flip_random_bits(pkt: bytes, max_bits: int, rng) -> bytes:
+    """Flips between 1 and max_bits bits anywhere in the packet, header and checksum included"""
+    if not pkt:
+        return pkt
+    ba = bytearray(pkt)
+    for _ in range(rng.randint(1, max_bits)):
+        ba[rng.randrange(len(ba))] ^= 1 << rng.randrange(8)
+    return bytes(ba)
+
+
+class Impairment:
+    """A loss process paired with what happens to the packets it hits. apply() returns None for a dropped packet"""
+
+    def __init__(self, process, action: str = "flip", header: int = 0, trailer: int = 0, max_bits: int = 8, rng=random):
+        self.process = process
+        self.action = action
+        self.header = header  # Bytes before the body, flip keeps clear of them
+        self.trailer = trailer  # Checksum bytes after the body
+        self.max_bits = max_bits
+        self.rng = rng
+
+        self.packets = 0
+        self.impaired = 0
+
+    def apply(self, pkt: bytes) -> bytes | None:
+        self.packets += 1
+        if not self.process.hit():
+            return pkt
+
+        self.impaired += 1
+        if self.action == "drop":
+            return None
+        elif self.action == "bits":
+            return flip_random_bits(pkt, self.max_bits, self.rng)
+        else:
+            return flip_middle_bit(pkt, self.header, self.trailer)
+
+
+@dataclass(frozen=True)
+class ImpairmentSpec:
+    """How packets get impaired, independent of where: each sender/receiver builds its own Impairment from it with
+    its loss rate and packet layout. The defaults reproduce the original single middle-bit flips."""
+
+    model: str = "bernoulli"  # One of LOSS_MODELS
+    action: str = "flip"  # One of ACTIONS
+    burst: float = 4.0  # Mean burst length in packets for the Gilbert-Elliott model
+    trace: str | None = None  # Loss trace file for the trace model
+    max_bits: int = 8  # Most bits flipped per packet by the bits action
+    seed: int | None = None  # None draws from the shared random module
+
+    def build(self, loss_rate: float, header: int = 0, trailer: int = 0) -> Impairment:
+        rng = random if self.seed is None else random.Random(self.seed)
+        if self.model == "gilbert":
+            process = GilbertElliottLoss.from_rate(loss_rate, self.burst, rng)
+        elif self.model == "trace":
+            if self.trace is None:
+                raise ValueError("The trace loss model needs a trace file")
+            process = TraceLoss(self.trace)
+        elif self.model == "bernoulli":
+            process = BernoulliLoss(loss_rate, rng)
+        else:
+            raise ValueError(f"Unknown loss model {self.model!r}")
+
+        if self.action not in ACTIONS:
+            raise ValueError(f"Unknown impairment action {self.action!r}")
+        return Impairment(process, self.action, header, trailer, self.max_bits, rng)
+
+
+def add_impairment_args(parser: argparse.ArgumentParser, seed: bool = True):
+    """Adds the impairment options shared by the apps and sweeps, seed=False for tools that derive their own seeds"""
+    parser.add_argument("--loss_model", default="bernoulli", choices=LOSS_MODELS,
+                        help="Which packets are hit: independent, bursty Gilbert-Elliott, or a recorded trace")
+    parser.add_argument("--impairment", default="flip", choices=ACTIONS,
+                        help="What happens to a hit packet: flip one middle bit, flip random bits, or drop it")
+    parser.add_argument("--burst", default=4.0, type=float,
+                        help="Mean loss burst length in packets for the Gilbert-Elliott model")
+    parser.add_argument("--trace", default=None,
+                        help="Per-packet loss trace file (0/1 per packet) for the trace model")
+    if seed:
+        parser.add_argument("--seed", default=None, type=int,
+                            help="Seed for the impairments, makes the loss pattern repeatable")
+
+
+def impairment_from_args(args: argparse.Namespace) -> ImpairmentSpec:
+    return ImpairmentSpec(args.loss_model, args.impairment, args.burst, args.trace, seed=getattr(args, "seed", None))
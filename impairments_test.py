@@ -0,0 +1,42 @@
+import random
+
+from impairments import GilbertElliottLoss
+
+# GilbertElliottLoss.from_rate: over a long seeded run the observed loss rate and mean burst length (runs of
+# consecutive losses) come out close to the requested ones
+NUM_PACKETS = 200_000
+for rate, burst in [(0.05, 1.0), (0.1, 3.0), (0.2, 5.0), (0.4, 8.0), (0.6, 1.5)]:
+    model = GilbertElliottLoss.from_rate(rate, burst, rng=random.Random(1234))
+    losses = 0
+    bursts = []
+    run = 0
+    for _ in range(NUM_PACKETS):
+        if model.hit():
+            losses += 1
+            run += 1
+        elif run:
+            bursts.append(run)
+            run = 0
+    observed_rate = losses / NUM_PACKETS
+    observed_burst = sum(bursts) / len(bursts)
+    if abs(observed_rate - rate) <= 0.05 * rate and abs(observed_burst - burst) <= 0.05 * burst:
+        print(f"[Pass] Gilbert-Elliott rate {rate:.0%} burst {burst}: observed {observed_rate:.2%}, "
+              f"mean burst {observed_burst:.2f}")
+    else:
+        print(f"[Fail] Gilbert-Elliott rate {rate:.0%} burst {burst}: observed {observed_rate:.2%}, "
+              f"mean burst {observed_burst:.2f}")
+
+# Bursts too short for the rate are refused instead of silently giving less loss
+try:
+    GilbertElliottLoss.from_rate(0.6, 1.0)
+    print("[Fail] A 60% loss rate with 1 packet bursts was accepted")
+except ValueError:
+    print("[Pass] A rate the mean burst length cannot reach is rejected")
+
+# The same seed gives the same loss pattern
+first = GilbertElliottLoss.from_rate(0.1, 3.0, rng=random.Random(7))
+second = GilbertElliottLoss.from_rate(0.1, 3.0, rng=random.Random(7))
+if [first.hit() for _ in range(1000)] == [second.hit() for _ in range(1000)]:
+    print("[Pass] Gilbert-Elliott losses are repeatable for a seed")
+else:
+    print("[Fail] Gilbert-Elliott losses differ for the same seed")
@@ -0,0 +1,97 @@
+import socket as soc
+import time
+from typing import Callable, Iterable
+
+from constants import *
+from Packets import Packet
+
+
+class TokenBucket:
+    """Paces datagrams to rate bytes per second. The bucket fills at rate up to burst bytes, and a datagram leaves
+    once the bucket covers it (or holds a full burst, for datagrams bigger than that); its size is then taken out.
+    Waiting sleeps while the send time is far off and busy-waits its last spin seconds, because sleep() overshoots
+    by more than the gap between two frames at high rates. Times come from perf_counter, the clock and sleep are
+    only swapped in tests."""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = PACING_BURST,
+        spin: float = PACING_SPIN,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0 or burst <= 0:
+            raise ValueError(f"Pacing needs a positive rate and burst, got {rate} B/s and {burst} B")
+        self.rate = rate
+        self.burst = burst
+        self.spin = spin
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(burst)  # Starts full, the first burst leaves right away
+        self.last = clock()  # When tokens was last brought up to date
+
+        self.bytes = 0
+        self.waits = 0
+        self.waited = 0.0  # Seconds blocked in wait() and consume()
+
+    def try_consume(self, size: int) -> bool:
+        """Takes size bytes and returns True if they may leave now, False (taking nothing) otherwise"""
+        self.__refill()
+        if self.tokens < min(size, self.burst):
+            return False
+        self.tokens -= size
+        self.bytes += size
+        return True
+
+    def delay(self, size: int) -> float:
+        """Seconds until size bytes may leave, 0 if they may leave now"""
+        self.__refill()
+        return max(0.0, (min(size, self.burst) - self.tokens) / self.rate)
+
+    def wait(self, size: int):
+        """Waits until size bytes may leave, without taking them"""
+        self.__refill()
+        missing = min(size, self.burst) - self.tokens
+        if missing > 0:
+            start = self.last
+            self.__wait_until(start + missing / self.rate)
+            self.__refill()
+            self.waits += 1
+            self.waited += self.last - start
+
+    def consume(self, size: int):
+        """Waits until size bytes may leave, then takes them"""
+        self.wait(size)
+        self.tokens -= size
+        self.bytes += size
+
+    def get_stats(self) -> dict:
+        """Pacing counters, times in seconds"""
+        return {"rate": self.rate, "burst": self.burst, "bytes": self.bytes, "waits": self.waits, "waited": self.waited}
+
+    def __refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def __wait_until(self, deadline: float):
+        while (remaining := deadline - self.clock()) > 0:
+            if remaining > self.spin:
+                self.sleep(remaining - self.spin)
+            else:
+                self.sleep(0)  # Busy-wait, but let a receiver thread in the same process have the GIL
+
+
+def blast(
+    sock: soc.socket, packets: Iterable[Packet], dest: tuple[str, int], pacer: TokenBucket | None = None
+) -> int:
+    """RDT 1.0 style sender: every frame goes out once, nothing is ACKed, so pacing is the only thing keeping the
+    receiver's buffer from overflowing. Returns the number of frames sent."""
+    sent = 0
+    for pkt in packets:
+        if pacer is not None:
+            pacer.consume(len(pkt.full_pkt))
+        sock.sendto(pkt.full_pkt, dest)
+        sent += 1
+    return sent
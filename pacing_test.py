@@ -0,0 +1,126 @@
+import socket as soc
+import threading
+import time
+
+from bulk_io import BatchSender
+from Packets import DataPacket
+from pacing import TokenBucket, blast
+
+
+class FakeClock:
+    """Clock whose sleep() only moves time forward, so the bucket's arithmetic can be checked exactly"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += max(seconds, 1e-6)  # sleep(0) still lets a little time pass
+
+
+def count_datagrams(sock: soc.socket, counts: list[int]):
+    """Receives until the sender has been quiet for half a second, counting datagrams in counts[0]"""
+    sock.settimeout(0.5)
+    while True:
+        try:
+            sock.recvfrom(2048)
+        except soc.timeout:
+            return
+        counts[0] += 1
+
+
+def paced_transfer(num_frames: int, frame_size: int, rate: float | None, batched: bool = False):
+    """Sends num_frames frames over loopback to a receiver thread with a small buffer.
+    Returns the achieved rate in bytes/s and the fraction of frames lost."""
+    rx_sock = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    rx_sock.setsockopt(soc.SOL_SOCKET, soc.SO_RCVBUF, 64 * 1024)
+    rx_sock.bind(("127.0.0.1", 0))
+    tx_sock = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    counts = [0]
+    receiver = threading.Thread(target=count_datagrams, args=(rx_sock, counts))
+    receiver.start()
+
+    packets = [DataPacket(bytes(DataPacket.max_data(frame_size)), i % 2) for i in range(num_frames)]
+    pacer = TokenBucket(rate, 4 * frame_size) if rate else None
+    dest = rx_sock.getsockname()
+    start = time.perf_counter()
+    if batched:
+        out = BatchSender(tx_sock, pacer=pacer)
+        for pkt in packets:
+            out.sendto(pkt.full_pkt, dest)
+            if len(out.queue) == 64:
+                out.flush()
+        out.flush()
+    else:
+        blast(tx_sock, packets, dest, pacer)
+    elapsed = time.perf_counter() - start
+
+    receiver.join()
+    tx_sock.close()
+    rx_sock.close()
+    return num_frames * frame_size / elapsed, 1 - counts[0] / num_frames
+
+
+# A full bucket lets a burst out right away, then each byte waits 1/rate
+clock = FakeClock()
+bucket = TokenBucket(1000, 500, spin=0.01, clock=clock, sleep=clock.sleep)
+bucket.consume(500)
+if clock.now == 0.0:
+    print("[Pass] A full burst leaves without waiting")
+else:
+    print(f"[Fail] A full burst waited {clock.now:.3f} s")
+bucket.consume(100)
+if 0.1 <= clock.now < 0.1 + 2e-6:
+    print("[Pass] The next 100 bytes wait 0.1 s at 1000 B/s")
+else:
+    print(f"[Fail] The next 100 bytes waited {clock.now:.6f} s instead of 0.1 s")
+
+if not bucket.try_consume(1) and bucket.bytes == 600:
+    print("[Pass] try_consume refuses when the bucket is empty and takes nothing")
+else:
+    print("[Fail] try_consume took bytes the bucket did not hold")
+clock.now += 0.05
+if bucket.try_consume(50) and not bucket.try_consume(1):
+    print("[Pass] try_consume accepts what refilled")
+else:
+    print("[Fail] try_consume does not follow the refill")
+
+# Datagrams bigger than a burst still leave, once the bucket is full
+clock.now += 10
+if bucket.try_consume(800) and bucket.tokens == -300:
+    print("[Pass] A datagram bigger than the burst leaves on a full bucket")
+else:
+    print("[Fail] A datagram bigger than the burst is stuck")
+
+try:
+    TokenBucket(0)
+    print("[Fail] A zero rate was accepted")
+except ValueError:
+    print("[Pass] A zero rate is rejected")
+
+print("")
+
+# Rate accuracy over loopback, one datagram per call and in batches
+target = 10e6
+for batched in [False, True]:
+    kind = "batched" if batched else "blast"
+    rate, _ = paced_transfer(2000, 1024, target, batched)
+    error = abs(rate - target) / target
+    if error < 0.05:
+        print(f"[Pass] {kind}: achieved {rate / 1e6:.2f} MB/s for a {target / 1e6:.0f} MB/s target")
+    else:
+        print(f"[Fail] {kind}: achieved {rate / 1e6:.2f} MB/s for a {target / 1e6:.0f} MB/s target ({error:.1%} off)")
+
+print("")
+
+# Loss at a target rate: an unpaced blast overruns the receiver's 64 KB buffer, a paced one it keeps up with
+_, unpaced_loss = paced_transfer(4000, 1024, None)
+print(f"[Info] Unpaced blast lost {unpaced_loss:.1%} of 4000 frames")
+target = 2e6
+rate, loss = paced_transfer(4000, 1024, target)
+if loss <= 0.001:
+    print(f"[Pass] Paced blast at {rate / 1e6:.2f} MB/s lost {loss:.2%} of 4000 frames")
+else:
+    print(f"[Fail] Paced blast at {rate / 1e6:.2f} MB/s lost {loss:.2%} of 4000 frames")
@@ -1,4 +1,22 @@
-from Packets import AckPacket, DataPacket
+import contextlib
+import io
+
+from checksum import CHECKSUM_ALGOS
+from compression import LZMA, NO_COMPRESSION, ZLIB, decompress, parse_session_header
+from fec import FecDecoder, FecEncoder
+from Packets import (
+    AckPacket,
+    DataPacket,
+    DataPacketView,
+    FinPacket,
+    Packet,
+    ParityPacket,
+    ReportPacket,
+    SeqAckPacket,
+    SeqDataPacket,
+    SeqDataPacketView,
+)
+from sender_app import accepts_report, make_seq_data_pkt
 import sys
 
 for orig_seq in [0, 1]:
@@ -45,3 +63,247 @@ for orig_ack_seq in [0, 1]:
         print(f"[Pass] Sequence numbers match in ACK Packet {orig_ack_seq}")
     else:
         print(f"[Fail] Sequence numbers do not match in ACK Packet {orig_ack_seq}")
+
+print("")
+
+for orig_seq in [0, 1, 70000]:
+    orig_data = bytes([0xDE, 0xAD, 0xBE, 0xAF])
+
+    orig_flags = SeqDataPacket.FLAG_START | SeqDataPacket.FLAG_EPOCH
+    rx_seqpacket = SeqDataPacket.packet_from_bytes(SeqDataPacket(orig_data, orig_seq, orig_flags).full_pkt)
+
+    if rx_seqpacket and rx_seqpacket.data == orig_data:
+        print(f"[Pass] Seq Data Packet {orig_seq} survived round trip")
+    else:
+        print(f"[Fail] Seq Data Packet {orig_seq} did not survive round trip")
+        sys.exit()
+
+    if rx_seqpacket.seq_num == orig_seq and rx_seqpacket.is_start and rx_seqpacket.epoch == 1:
+        print(f"[Pass] Header fields match in Seq Data Packet {orig_seq}")
+    else:
+        print(f"[Fail] Header fields do not match in Seq Data Packet {orig_seq}")
+
+    rx_seqack = SeqAckPacket.packet_from_bytes(SeqAckPacket(orig_seq, SeqAckPacket.FLAG_EPOCH).full_pkt)
+
+    if rx_seqack and rx_seqack.seq_num == orig_seq and rx_seqack.epoch == 1:
+        print(f"[Pass] Header fields match in Seq ACK Packet {orig_seq}")
+    else:
+        print(f"[Fail] Header fields do not match in Seq ACK Packet {orig_seq}")
+
+print("")
+
+for algo_id, algo in CHECKSUM_ALGOS.items():
+    orig_data = bytes([0xDE, 0xAD, 0xBE, 0xAF])
+    seqpacket_bytes = SeqDataPacket(orig_data, 5, 0, algo_id).full_pkt
+    seqack_bytes = SeqAckPacket(5, 0, algo_id).full_pkt
+
+    rx_seqpacket = SeqDataPacket.packet_from_bytes(seqpacket_bytes)
+    rx_seqack = SeqAckPacket.packet_from_bytes(seqack_bytes)
+
+    if rx_seqpacket and rx_seqpacket.checksum_algo == algo_id and rx_seqpacket.data == orig_data:
+        print(f"[Pass] {algo.name} Seq Data Packet survived round trip")
+    else:
+        print(f"[Fail] {algo.name} Seq Data Packet did not survive round trip")
+
+    if rx_seqack and rx_seqack.checksum_algo == algo_id and rx_seqack.seq_num == 5:
+        print(f"[Pass] {algo.name} Seq ACK Packet survived round trip")
+    else:
+        print(f"[Fail] {algo.name} Seq ACK Packet did not survive round trip")
+
+    corrupt_bytes = bytearray(seqpacket_bytes)
+    corrupt_bytes[100] ^= 0x01
+    if SeqDataPacket.is_corrupt(bytes(corrupt_bytes)) and not SeqDataPacket.is_corrupt(seqpacket_bytes):
+        print(f"[Pass] is_corrupt dispatched to {algo.name}")
+    else:
+        print(f"[Fail] is_corrupt did not dispatch to {algo.name}")
+
+# Frames that are not seq data (ACK, parity, FIN, report) are refused quietly
+others = [SeqAckPacket(5).full_pkt, ParityPacket(1, 2, 4, orig_data).full_pkt, FinPacket().to_bytes(),
+          ReportPacket(0, 0.1, 10, 2, 0, 0).to_bytes()]
+output = io.StringIO()
+with contextlib.redirect_stdout(output):
+    parsed = [SeqDataPacket.packet_from_bytes(pkt) for pkt in others]
+if parsed == [None] * len(others) and not output.getvalue():
+    print("[Pass] Seq Data Packet parser refuses other frame kinds without printing")
+else:
+    print(f"[Fail] Seq Data Packet parser gave {parsed} and printed {output.getvalue()!r}")
+
+print("")
+
+orig_data = bytes([0xDE, 0xAD, 0xBE, 0xAF])
+for orig_seq in [0, 1]:
+    view = DataPacketView.from_bytes(DataPacket(orig_data, orig_seq).full_pkt)
+    if view and view.seq_num == orig_seq and view.data == orig_data:
+        print(f"[Pass] Data Packet View {orig_seq} matches the packet")
+    else:
+        print(f"[Fail] Data Packet View {orig_seq} does not match the packet")
+
+seq_view = SeqDataPacketView.from_bytes(SeqDataPacket(orig_data, 42, SeqDataPacket.FLAG_START).full_pkt)
+if seq_view and seq_view.seq_num == 42 and seq_view.is_start and seq_view.data == orig_data:
+    print("[Pass] Seq Data Packet View matches the packet")
+else:
+    print("[Fail] Seq Data Packet View does not match the packet")
+
+corrupt_bytes = bytearray(DataPacket(orig_data, 0).full_pkt)
+corrupt_bytes[2] ^= 0x01
+if DataPacketView.from_bytes(bytes(corrupt_bytes)) is None:
+    print("[Pass] Data Packet View rejected a corrupt packet")
+else:
+    print("[Fail] Data Packet View accepted a corrupt packet")
+
+print("")
+
+short_bytes = DataPacket(orig_data, 1, padded=False).full_pkt
+rx_short = DataPacket.packet_from_bytes(short_bytes)
+if len(short_bytes) == DataPacket.HEADER_LENGTH + len(orig_data) + DataPacket.CHECKSUM_LENGTH and rx_short and rx_short.data == orig_data:
+    print("[Pass] Variable-length Data Packet survived round trip")
+else:
+    print("[Fail] Variable-length Data Packet did not survive round trip")
+
+short_seq_bytes = SeqDataPacket(orig_data, 7, padded=False).full_pkt
+short_view = SeqDataPacketView.from_bytes(short_seq_bytes)
+if len(short_seq_bytes) == SeqDataPacket.HEADER_LENGTH + len(orig_data) + 2 and short_view and short_view.data == orig_data:
+    print("[Pass] Variable-length Seq Data Packet survived round trip")
+else:
+    print("[Fail] Variable-length Seq Data Packet did not survive round trip")
+
+# Declares 4 data bytes but the datagram carries 5 -> length mismatch must be rejected
+long_bytes = DataPacket(orig_data + b"\x00", 1, padded=False).full_pkt
+mismatched = bytearray(long_bytes)
+mismatched[1] = len(orig_data)
+if Packet.extract_data(bytes(mismatched)) == b"" and DataPacketView.from_bytes(bytes(mismatched)) is None:
+    print("[Pass] Declared data length that does not match the datagram was rejected")
+else:
+    print("[Fail] Declared data length that does not match the datagram was accepted")
+
+# Frames too small for the header and checksum are refused, the message gives the real minimum
+smallest = DataPacket.HEADER_LENGTH + DataPacket.CHECKSUM_LENGTH + 1
+try:
+    DataPacket.max_data(smallest - 1)
+    print("[Fail] A frame too small for the header and checksum was accepted")
+except ValueError as error:
+    if f"between {smallest} and" in str(error) and DataPacket.max_data(smallest) == 1:
+        print("[Pass] Frame size limits follow the header and checksum lengths")
+    else:
+        print(f"[Fail] Frame size error does not give the minimum {smallest}: {error}")
+
+# The count frame carries the codec, the session nonce and the size before compression
+image = bytes(range(256)) * 64
+for codec in [NO_COMPRESSION, ZLIB, LZMA]:
+    pkts = make_seq_data_pkt(image, 0, codec=codec, session=0xC0FFEE)
+    frames = [SeqDataPacketView.from_bytes(pkt.full_pkt) for pkt in pkts]
+    num_pkts, rx_codec, session, num_bytes = parse_session_header(frames[0].data)
+    payload = b"".join(bytes(view.data) for view in frames[1:])
+    header_ok = num_pkts == len(frames) - 1 and rx_codec == codec and session == 0xC0FFEE and num_bytes == len(image)
+    if header_ok and decompress(payload, codec) == image:
+        print(f"[Pass] Session header and payload survive round trip with codec {codec}")
+    else:
+        print(f"[Fail] Session header or payload did not survive round trip with codec {codec}")
+
+# Two transfers of the same image on the same epoch still start with different count frames
+first, second = make_seq_data_pkt(image, 0)[0], make_seq_data_pkt(image, 0)[0]
+if first.full_pkt != second.full_pkt:
+    print("[Pass] Each transfer's count frame carries its own session nonce")
+else:
+    print("[Fail] Two transfers sent the same count frame")
+
+# Headers of older senders, a bare count or a count and a codec, still parse
+if parse_session_header((5).to_bytes(8, "big")) == (5, NO_COMPRESSION, 0, None) and parse_session_header(
+    (5).to_bytes(8, "big") + bytes([ZLIB])
+) == (5, ZLIB, 0, None):
+    print("[Pass] Session headers without a nonce parse with session 0")
+else:
+    print("[Fail] Session headers without a nonce do not parse")
+
+# FIN and report carry the session nonce, a sender only takes the report about its own transfer
+fin = FinPacket.packet_from_bytes(FinPacket(1, 0xC0FFEE).to_bytes())
+report = ReportPacket.packet_from_bytes(ReportPacket(1, 0.25, len(image), 20, 1, 2, 0xC0FFEE).to_bytes())
+if fin and fin.epoch == 1 and fin.session == 0xC0FFEE and report and report.session == 0xC0FFEE:
+    print("[Pass] FIN and report session nonce survive round trip")
+else:
+    print("[Fail] FIN and report session nonce did not survive round trip")
+if (
+    accepts_report(report, 1, 0xC0FFEE, len(image))
+    and accepts_report(report, 1, 0xC0FFEE, None)
+    and not accepts_report(report, 1, 0xBEEF, len(image))
+    and not accepts_report(report, 0, 0xC0FFEE, len(image))
+    and not accepts_report(report, 1, 0xC0FFEE, len(image) + 1)
+):
+    print("[Pass] Only the report with the transfer's epoch, session and byte count is accepted")
+else:
+    print("[Fail] A report about another transfer or with the wrong byte count was accepted")
+
+# The advertised window only goes on the wire when given, ACKs without one keep the original length
+windowed = SeqAckPacket.packet_from_bytes(SeqAckPacket(7, SeqAckPacket.FLAG_EPOCH, 2, 300).full_pkt)
+plain = SeqAckPacket.packet_from_bytes(SeqAckPacket(7).full_pkt)
+if windowed and windowed.window == 300 and windowed.epoch == 1 and plain and plain.window is None and len(plain.full_pkt) == 8:
+    print("[Pass] Seq ACK Packet advertised window survives round trip")
+else:
+    print("[Fail] Seq ACK Packet advertised window did not survive round trip")
+
+print("")
+
+# FEC: every frame of a block is rebuilt byte for byte from the parity and the rest of the block. Payloads have
+# different lengths and the last block is shorter than the others.
+frame_size = 1024
+payloads = [bytes((seq * 7 + i) & 0xFF for i in range(1 + (seq * 97) % 1000)) for seq in range(1, 11)]
+frames = [SeqDataPacket(data, seq, SeqDataPacket.FLAG_EPOCH) for seq, data in enumerate(payloads, 1)]
+encoder = FecEncoder(4)
+parities = [parity for pkt in frames for parity in encoder.add(pkt)] + [encoder.flush()]
+parities = [ParityPacket.packet_from_bytes(parity.full_pkt, frame_size) for parity in parities]
+if [(p.seq_num, p.count, p.epoch) for p in parities] == [(1, 4, 1), (5, 4, 1), (9, 2, 1)]:
+    print("[Pass] FEC encoder closes blocks of 4 and a shorter last block")
+else:
+    print(f"[Fail] FEC encoder built blocks {[(p.seq_num, p.count) for p in parities if p]}")
+
+rebuilt = 0
+for parity in parities:
+    block = range(parity.seq_num, parity.seq_num + parity.count)
+    for lost in block:
+        # Parity last rebuilds in add_parity, parity first in the add_data that completes the rest of the block
+        for parity_first in [False, True]:
+            decoder = FecDecoder()
+            recovered = decoder.add_parity(parity) if parity_first else []
+            for seq in block:
+                if seq != lost:
+                    recovered += decoder.add_data(seq, payloads[seq - 1])
+            if not parity_first:
+                recovered += decoder.add_parity(parity)
+            rebuilt += recovered == [(lost, payloads[lost - 1])]
+if rebuilt == 2 * len(payloads):
+    print("[Pass] FEC rebuilds every position of every block byte for byte")
+else:
+    print(f"[Fail] FEC rebuilt {rebuilt} of {2 * len(payloads)} lost frames")
+
+# Two frames lost: nothing can be rebuilt until one of them is resent
+decoder = FecDecoder()
+for seq in [1, 2]:
+    decoder.add_data(seq, payloads[seq - 1])
+if decoder.add_parity(parities[0]) == [] and decoder.add_data(3, payloads[2]) == [(4, payloads[3])]:
+    print("[Pass] FEC waits while a block misses two frames")
+else:
+    print("[Fail] FEC rebuilt a frame of a block missing two")
+
+# A parity whose length XOR promises more data than it holds is refused (a frame of another transfer mixed in)
+decoder = FecDecoder()
+for seq in [1, 2, 3]:
+    decoder.add_data(seq, payloads[seq - 1])
+bad = parities[0]
+forged = ParityPacket(bad.seq_num, bad.count, bad.num_data_xor ^ 0x7FF, bad.parity, bad.epoch, bad.checksum_algo)
+if decoder.add_parity(forged) == [] and 1 not in decoder.parities:
+    print("[Pass] FEC refuses a parity inconsistent with the block's lengths")
+else:
+    print("[Fail] FEC rebuilt a frame from an inconsistent parity")
+
+# advance() keeps the frames a block can still need, drops delivered blocks' parities and ignores late ones
+decoder = FecDecoder()
+decoder.add_parity(parities[0])  # Block 1-4 misses everything
+decoder.add_parity(parities[2])  # Block 9-10 too
+for seq in range(1, 41):
+    decoder.add_data(seq, bytes(1))
+decoder.advance(41)
+kept = min(decoder.frames) == 41 - ParityPacket.MAX_COUNT and not decoder.parities
+if kept and decoder.add_parity(parities[1]) == [] and not decoder.parities:
+    print("[Pass] FEC advance() prunes delivered frames and parities")
+else:
+    print(f"[Fail] FEC advance() kept frames from {min(decoder.frames)} and parities {list(decoder.parities)}")
@@ -0,0 +1,100 @@
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import time
+
+from constants import *
+from frame_size_sweep import run_transfer
+from impairments import add_impairment_args, impairment_from_args
+from results_store import MODE_NAMES, SCENARIO_NAMES
+from sender_app import image_file_2_bytes
+
+# Per-worker state, set once by init_worker
+_worker_port: int | None = None
+_worker_image: bytes | None = None
+
+
+def handle_CLI():
+    """Reads command line arguments to get the sweep grid and the number of workers"""
+    parser = argparse.ArgumentParser(description="Loss sweep with sender/receiver pairs running in parallel")
+    parser.add_argument("-i", "--input_file", default="megamind",
+                        help="Image base name to send (no extension)")
+    parser.add_argument("-m", "--modes", default=[RDT22_MODE], type=int, nargs="+",
+                        help="Transport protocols: 1=RDT 2.2, 2=Go-Back-N, 3=Selective Repeat")
+    parser.add_argument("-s", "--scenarios", default=[NO_LOSS, TX_ACK_LOSS, RX_DATA_LOSS], type=int, nargs="+",
+                        help="Data transfer scenarios: 1=NO_LOSS, 2=TX_ACK_LOSS, 3=RX_DATA_LOSS")
+    parser.add_argument("-l", "--losses", default=list(range(0, 61, 5)), type=int, nargs="+",
+                        help="Loss percentages for the lossy scenarios")
+    parser.add_argument("-n", "--iterations", default=NUM_ITER, type=int,
+                        help="Transfers per grid point")
+    parser.add_argument("-w", "--window", default=WINDOW_SIZE, type=int,
+                        help="Window size in frames for the pipelined protocols")
+    parser.add_argument("-f", "--frame_size", default=FRAME_SIZE, type=int,
+                        help="Datagram size of a data frame in bytes")
+    parser.add_argument("-j", "--jobs", default=os.cpu_count() or 1, type=int,
+                        help="Sender/receiver pairs running at once, defaults to one per core")
+    parser.add_argument("-p", "--base_port", default=RX_PORT, type=int,
+                        help="Worker k listens on base_port + k")
+    add_impairment_args(parser)
+    args = parser.parse_args()
+    return args, impairment_from_args(args)
+
+
+def init_worker(ports: mp.Queue, input_file: str):
+    """Gives each pool process its own receiver port and a copy of the image"""
+    global _worker_port, _worker_image
+    _worker_port = ports.get()
+    _worker_image = image_file_2_bytes(input_file)
+
+
+def run_job(job: tuple) -> list:
+    """Runs one transfer on this worker's port and returns its result row"""
+    mode, scenario, loss, iter, window, frame_size, impairment = job
+    seconds, stats = run_transfer(
+        _worker_image, mode, scenario, loss / 100.0, window, frame_size, _worker_port, impairment
+    )
+    return [MODE_NAMES[mode], SCENARIO_NAMES[scenario], loss, iter, _worker_port, seconds,
+            stats["frames_sent"], stats["retransmissions"], stats["timeouts"], stats["intact"]]
+
+
+if __name__ == "__main__":
+    args, impairment = handle_CLI()
+
+    results_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+    os.makedirs(results_folder, exist_ok=True)
+    out_path = os.path.join(results_folder, "parallel_sweep.csv")
+
+    jobs = [
+        (mode, scenario, loss, iter, args.window, args.frame_size, impairment)
+        for mode in args.modes
+        for scenario in args.scenarios
+        for loss in ([0] if scenario == NO_LOSS else args.losses)
+        for iter in range(args.iterations)
+    ]
+
+    ports = mp.Queue()
+    for k in range(args.jobs):
+        ports.put(args.base_port + k)
+
+    wall_start = time.perf_counter()
+    rows = []
+    with mp.Pool(args.jobs, init_worker, (ports, args.input_file)) as pool:
+        # Longest transfers first so the last ones to finish are short
+        jobs.sort(key=lambda job: -job[2])
+        for row in pool.imap_unordered(run_job, jobs):
+            rows.append(row)
+            print(f"[{len(rows)}/{len(jobs)}] {row[0]:>5} {row[1]:>12} loss={row[2]:>2}% iter={row[3]}: "
+                  f"{row[5]:.3f} s" + ("" if row[9] else ", image corrupted"))
+    wall = time.perf_counter() - wall_start
+
+    rows.sort(key=lambda row: (row[0], row[1], row[2], row[3]))
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["mode", "scenario", "loss", "iter", "port", "seconds", "frames_sent", "retransmissions",
+                         "timeouts", "intact"])
+        writer.writerows(rows)
+
+    total = sum(row[5] for row in rows)
+    print(f"\n{len(rows)} transfers on {args.jobs} workers in {wall:.2f} s "
+          f"(transfer times add up to {total:.2f} s, {total / wall:.1f}x), results in {out_path}")
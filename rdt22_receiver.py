@@ -1,105 +1,140 @@
-import random
 import socket as soc
 
 from constants import *
-from Packets import AckPacket, DataPacket, Packet
+from impairments import ImpairmentSpec
+from Packets import AckPacket, DataPacket, DataPacketView, FinPacket, ReportPacket
+from transfer_stats import ReceiverStats
 
 # --- State constants ---
 WAIT_0 = 0
 WAIT_1 = 1
 
-# remember where the last DATA came from so we can reply ACKs to that address
-_last_sender_addr: tuple[str, int] | None = None
 
+def udt_rcv(sock: soc.socket, bufsize: int = 2048) -> tuple[bytes, tuple[str, int]]:
+    return sock.recvfrom(bufsize)  # use recvfrom on UDP, the address is where the ACKs go
 
-def udt_rcv(sock: soc.socket) -> bytes:
-    data, addr = sock.recvfrom(2048)  # use recvfrom on UDP
-    global _last_sender_addr
-    _last_sender_addr = addr
-    return data
 
-
-def udt_send(sock: soc.socket, pkt: bytes):
-    # send ACKs back to the most recent sender (not RX_ADDR/RX_PORT)
-    if _last_sender_addr is not None:
-        sock.sendto(pkt, _last_sender_addr)
+def udt_send(sock: soc.socket, pkt: bytes, addr: tuple[str, int] | None):
+    # send ACKs back to the sender (not RX_ADDR/RX_PORT)
+    if addr is not None:
+        sock.sendto(pkt, addr)
 
 
 class RDT22Receiver:
-    def __init__(self, sock: soc.socket, scenario: int, loss_rate: float):
+    def __init__(
+        self,
+        sock: soc.socket,
+        scenario: int,
+        loss_rate: float,
+        frame_size: int = FRAME_SIZE,
+        impairment: ImpairmentSpec = ImpairmentSpec(),
+        stats: ReceiverStats | None = None,
+        peer: tuple[str, int] | None = None,
+    ):
         self.sock = sock
+        self.peer = peer  # Where ACKs go: the sender of the last datagram, or fixed when a demultiplexer owns the socket
+        self.frame_size = frame_size  # Frames of the session are at most this long
         self.state = WAIT_0
         self.once = False  # same as oncethru
         self.last_ack: dict[int, AckPacket | None] = {0: None, 1: None}
+        self.epoch = 0  # RDT 2.2 frames carry no epoch, reports always use 0
+        self.completed: ReportPacket | None = None  # Report of the last complete transfer, sent back on FIN
+        self.frames_received = 0  # Valid data frames, duplicates included
+        self.duplicates = 0
+        self.corrupt = 0
+        self.stats = stats  # Detailed counters, None keeps the hot path lean
         self.scenario = scenario
         # normalize to 0..1 if 0..100 was passed
         self.loss_rate = loss_rate if 0.0 <= loss_rate <= 1.0 else max(0.0, min(1.0, loss_rate / 100.0))
+        # Middle bit flips land in the DATA area, avoiding the 2-byte header and the 2-byte checksum
+        self.impairment = impairment.build(self.loss_rate, 2, 2)
 
-    def get_data_pkt(self) -> DataPacket | None:
+    def get_data_pkt(self) -> DataPacketView | None:
         "Called by application to get received data, returns None if data is corrupted"
-        rcvpkt = udt_rcv(self.sock)
+        rcvpkt, self.peer = udt_rcv(self.sock, self.frame_size)
+        return self.handle_pkt(rcvpkt)
+
+    def handle_pkt(self, rcvpkt: bytes) -> DataPacketView | None:
+        """Runs one datagram from self.peer through the state machine, for callers that read the socket themselves"""
+
+        # The sender is done and wants the report, control packets skip the impairments
+        if FinPacket.is_fin(rcvpkt):
+            if self.stats is not None:
+                self.stats.fins += 1
+            self.__answer_fin(FinPacket.packet_from_bytes(rcvpkt))
+            return None
 
         #  debug:
         # print(f"[RX] scenario={self.scenario} loss={self.loss_rate:.2f}")
 
         rcvpkt = self.__corrupt_data_bytes(rcvpkt)
+        if rcvpkt is None:
+            if self.stats is not None:
+                self.stats.dropped += 1
+            return None  # Dropped on the way, as if it never arrived
+
+        # Validates the checksum once and views the payload in place
+        data = DataPacketView.from_bytes(rcvpkt, self.frame_size)
+        if data is None:
+            self.corrupt += 1
+        else:
+            self.frames_received += 1
+            if self.stats is not None:
+                self.stats.bytes_received += len(rcvpkt)
+                self.stats.padding_bytes += (
+                    len(rcvpkt) - DataPacket.HEADER_LENGTH - DataPacket.CHECKSUM_LENGTH - len(data.data)
+                )
 
         if self.state == WAIT_0:
-            if not Packet.is_corrupt(rcvpkt) and Packet.data_seq(rcvpkt) == 0:
-                data = DataPacket.packet_from_bytes(rcvpkt)
-                if data is None:
-                    # Treat parse failure like corruption: resend last ACK1 (last good when WAIT_0)
-                    if self.last_ack[1]:
-                        udt_send(self.sock, self.last_ack[1].to_bytes())
-                    return None
-
+            if data is not None and data.seq_num == 0:
                 ack = AckPacket(0)
-                udt_send(self.sock, ack.to_bytes())
+                udt_send(self.sock, ack.to_bytes(), self.peer)
+                if self.stats is not None:
+                    self.stats.acks_sent += 1
                 self.last_ack[0] = ack
                 self.once = True
                 self.state = WAIT_1
                 return data
             else:  # corrupt or seq=1 while waiting for 0 -> resend last good ACK1
+                if data is not None:
+                    self.duplicates += 1
                 if self.last_ack[1]:
-                    udt_send(self.sock, self.last_ack[1].to_bytes())
+                    udt_send(self.sock, self.last_ack[1].to_bytes(), self.peer)
+                    if self.stats is not None:
+                        self.stats.reacks += 1
                 return None
 
         elif self.state == WAIT_1:
-            if not Packet.is_corrupt(rcvpkt) and Packet.data_seq(rcvpkt) == 1:
-                data = DataPacket.packet_from_bytes(rcvpkt)
-                if data is None:
-                    # Treat parse failure like corruption: resend last good ACK0 (last good when WAIT_1)
-                    if self.last_ack[0]:
-                        udt_send(self.sock, self.last_ack[0].to_bytes())
-                    return None
-
+            if data is not None and data.seq_num == 1:
                 ack = AckPacket(1)
-                udt_send(self.sock, ack.to_bytes())
+                udt_send(self.sock, ack.to_bytes(), self.peer)
+                if self.stats is not None:
+                    self.stats.acks_sent += 1
                 self.last_ack[1] = ack
                 self.state = WAIT_0
                 return data
             else:  # corrupt or seq=0 while waiting for 1 -> resend last good ACK0
+                if data is not None:
+                    self.duplicates += 1
                 if self.last_ack[0]:
-                    udt_send(self.sock, self.last_ack[0].to_bytes())
+                    udt_send(self.sock, self.last_ack[0].to_bytes(), self.peer)
+                    if self.stats is not None:
+                        self.stats.reacks += 1
                 return None
 
-    def __corrupt_data_bytes(self, rx_bytes: bytes) -> bytes:
-        """Randomly corrupts data packets depending on the scenario and loss rate"""
+    def __answer_fin(self, fin: FinPacket):
+        # Only the transfer the FIN is about (same epoch and session nonce) gets a report, others go unanswered
+        completed = self.completed
+        if completed is not None and completed.epoch == fin.epoch and completed.session == fin.session:
+            udt_send(self.sock, completed.to_bytes(), self.peer)
+
+    def __corrupt_data_bytes(self, rx_bytes: bytes) -> bytes | None:
+        """Impairs data packets depending on the scenario and loss rate, returns None if the packet was dropped"""
         if self.scenario == NO_LOSS:
             return rx_bytes
         elif self.scenario == TX_ACK_LOSS:
             return rx_bytes
         elif self.scenario == RX_DATA_LOSS:
-            if random.random() < self.loss_rate and len(rx_bytes) >= 4:
-                # Flip a single bit in the DATA area.
-                # Avoid the 2-byte header [0:2] and the 2-byte checksum [-2:].
-                ba = bytearray(rx_bytes)
-                # pick a middle index within the data/padding region
-                i = max(2, min(len(ba) - 3, 2 + (len(ba) - 4) // 2))
-                ba[i] ^= 0x01
-                # print("[RX] CORRUPTED one DATA pkt")  # DEBUG
-                return bytes(ba)
-            else:
-                return rx_bytes
+            return self.impairment.apply(rx_bytes)
         else:
             raise NotImplementedError
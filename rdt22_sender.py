@@ -1,8 +1,13 @@
-import random
 import socket as soc
+import time
+from typing import Callable
 
 from constants import *
+from impairments import ImpairmentSpec
+from pacing import TokenBucket
 from Packets import DataPacket, Packet
+from rto import RTOEstimator
+from transfer_stats import SenderStats
 
 # --- State constants ---
 WAIT_CALL_0 = 0
@@ -16,30 +21,62 @@ def udt_rcv(sock: soc.socket) -> bytes:
     data, _ = sock.recvfrom(1024)
     return data
 
-def udt_send(sock: soc.socket, pkt: bytes):
-    sock.sendto(pkt, (RX_ADDR, RX_PORT))
+def udt_send(
+    sock: soc.socket, pkt: bytes, addr: tuple[str, int] = (RX_ADDR, RX_PORT), pacer: TokenBucket | None = None
+):
+    if pacer is not None:
+        pacer.consume(len(pkt))  # Waits for the datagram's send time
+    sock.sendto(pkt, addr)
 
 
 class RDT22Sender:
-    def __init__(self, sock: soc.socket, scenario: int, loss_rate: float):
+    def __init__(
+        self,
+        sock: soc.socket,
+        scenario: int,
+        loss_rate: float,
+        clock: Callable[[], float] = time.monotonic,
+        impairment: ImpairmentSpec = ImpairmentSpec(),
+        dest: tuple[str, int] = (RX_ADDR, RX_PORT),
+        stats: SenderStats | None = None,
+        pacer: TokenBucket | None = None,
+    ):
         self.sock = sock
-        self.sock.settimeout(0.5)  # resend if no ACK within 500 ms
+        self.dest = dest  # Address of the receiver
+        self.pacer = pacer  # Spaces the frames out to a rate, None sends them as soon as they are due
+        self.clock = clock  # Time source for RTT samples and timers, swapped for a virtual clock in simulation
+        self.rto = RTOEstimator()  # resend if no ACK within the adaptive timeout
         self.state = WAIT_CALL_0
         self.last_pkt: DataPacket | None = None  # buffer last sent packet
+        self.sent_time: float | None = None  # first transmission time of last_pkt, None once resent
         self.scenario = scenario
         # Normalize loss_rate to 0..1 if user passes 0..100
         self.loss_rate = loss_rate if 0.0 <= loss_rate <= 1.0 else max(0.0, min(1.0, loss_rate / 100.0))
+        self.impairment = impairment.build(self.loss_rate)  # Applied to incoming ACKs in TX_ACK_LOSS
+
+        self.frames_sent = 0
+        self.retransmissions = 0
+        self.timeouts = 0
+        self.stats = stats  # Detailed counters, None keeps the hot path lean
 
     def rdt_send(self, curr_packet: DataPacket):
         """Called by application to send one chunk of data"""
         if self.state == WAIT_CALL_0:
             self.last_pkt = curr_packet
-            udt_send(self.sock, self.last_pkt.full_pkt)
+            udt_send(self.sock, self.last_pkt.full_pkt, self.dest, self.pacer)
+            self.frames_sent += 1
+            if self.stats is not None:
+                self.__count_bytes(self.last_pkt)
+            self.sent_time = self.clock()
             self.state = WAIT_ACK_0
 
         elif self.state == WAIT_CALL_1:
             self.last_pkt = curr_packet
-            udt_send(self.sock, self.last_pkt.full_pkt)
+            udt_send(self.sock, self.last_pkt.full_pkt, self.dest, self.pacer)
+            self.frames_sent += 1
+            if self.stats is not None:
+                self.__count_bytes(self.last_pkt)
+            self.sent_time = self.clock()
             self.state = WAIT_ACK_1
 
         else:
@@ -48,55 +85,108 @@ class RDT22Sender:
 
     def input(self) -> bool:
         """Called when a packet arrives from receiver"""
+        deadline = self.clock() + self.rto.rto
         try:
-            rcvpkt = udt_rcv(self.sock)
+            rcvpkt = None
+            while rcvpkt is None:  # None means the ACK was dropped on the way, keep waiting for the rest of the RTO
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    raise soc.timeout
+                self.sock.settimeout(remaining)
+                rcvpkt = self.__corrupt_ACK_bytes(udt_rcv(self.sock))
+                if self.stats is not None:
+                    self.stats.acks_received += 1
+                    self.stats.acks_dropped += rcvpkt is None
         except soc.timeout:
             # Treat timeout as lost ACK -> resend last packet
             if self.last_pkt is not None:
                 #print("[TX] resend (timeout); state=", self.state)
-                udt_send(self.sock, self.last_pkt.full_pkt)
+                self.timeouts += 1
+                if self.stats is not None:
+                    self.stats.resent_timeout += 1
+                self.rto.backoff()
+                self.__resend()
                 return True
             return False
 
-        rcvpkt = self.__corrupt_ACK_bytes(rcvpkt)
-
         resent = False
 
         if self.last_pkt is None:
             return resent
 
         if self.state == WAIT_ACK_0:
-            if not Packet.is_corrupt(rcvpkt) and Packet.ack_seq(rcvpkt) == 0:
+            if Packet.is_ack(rcvpkt) and not Packet.is_corrupt(rcvpkt) and Packet.ack_seq(rcvpkt) == 0:
+                self.__sample_rtt()
                 self.state = WAIT_CALL_1
             else:  # corrupt or wrong ACK
                 #print("[TX] resend (bad ACK for seq0); state=", self.state)
-                udt_send(self.sock, self.last_pkt.full_pkt)
+                if self.stats is not None:
+                    self.__count_bad_ack(rcvpkt)
+                self.__resend()
                 resent = True
 
         elif self.state == WAIT_ACK_1:
-            if not Packet.is_corrupt(rcvpkt) and Packet.ack_seq(rcvpkt) == 1:
+            if Packet.is_ack(rcvpkt) and not Packet.is_corrupt(rcvpkt) and Packet.ack_seq(rcvpkt) == 1:
+                self.__sample_rtt()
                 self.state = WAIT_CALL_0
             else:  # corrupt or wrong ACK
                 #print("[TX] resend (bad ACK for seq1); state=", self.state)
-                udt_send(self.sock, self.last_pkt.full_pkt)
+                if self.stats is not None:
+                    self.__count_bad_ack(rcvpkt)
+                self.__resend()
                 resent = True
 
         return resent
 
-    def __corrupt_ACK_bytes(self, rx_bytes: bytes) -> bytes:
-        """Randomly corrupts ACK packets depending on the scenario and loss rate"""
+    def get_stats(self) -> dict:
+        """Per-transfer statistics, RTO/SRTT in seconds, plus the detailed counters when they are kept"""
+        stats = {
+            "frames_sent": self.frames_sent,
+            "retransmissions": self.retransmissions,
+            "timeouts": self.timeouts,
+            "rto": self.rto.rto,
+            "srtt": self.rto.srtt,
+        }
+        if self.stats is not None:
+            stats.update(self.stats.to_dict())
+        return stats
+
+    def __sample_rtt(self):
+        # Karn's algorithm: only time frames that were sent exactly once
+        if self.sent_time is not None:
+            rtt = self.clock() - self.sent_time
+            self.rto.sample(rtt)
+            if self.stats is not None:
+                self.stats.add_rtt(rtt)
+        self.rto.reset_backoff()
+
+    def __resend(self):
+        udt_send(self.sock, self.last_pkt.full_pkt, self.dest, self.pacer)
+        self.frames_sent += 1
+        self.retransmissions += 1
+        if self.stats is not None:
+            self.__count_bytes(self.last_pkt)
+        self.sent_time = None
+
+    def __count_bytes(self, pkt: DataPacket):
+        self.stats.bytes_sent += len(pkt.full_pkt)
+        self.stats.padding_bytes += (
+            len(pkt.full_pkt) - DataPacket.HEADER_LENGTH - DataPacket.CHECKSUM_LENGTH - len(pkt.data)
+        )
+
+    def __count_bad_ack(self, rcvpkt: bytes):
+        if Packet.is_ack(rcvpkt) and not Packet.is_corrupt(rcvpkt):
+            self.stats.resent_duplicate_ack += 1
+        else:
+            self.stats.resent_corrupt_ack += 1
+
+    def __corrupt_ACK_bytes(self, rx_bytes: bytes) -> bytes | None:
+        """Impairs ACK packets depending on the scenario and loss rate, returns None if the ACK was dropped"""
 
         if self.scenario == NO_LOSS:
             return rx_bytes
         elif self.scenario == TX_ACK_LOSS:
-            if random.random() < self.loss_rate and len(rx_bytes) >= 3:
-                # Flip a single bit in the middle (keeps length; breaks checksum)
-                ba = bytearray(rx_bytes)
-                mid = len(ba) // 2
-                ba[mid] ^= 0x01
-                return bytes(ba)
-            else:
-                return rx_bytes
+            return self.impairment.apply(rx_bytes)
         elif self.scenario == RX_DATA_LOSS:
             return rx_bytes
         else:
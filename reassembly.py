@@ -0,0 +1,95 @@
+import mmap
+import os
+
+from constants import *
+
+
+class ReassemblySink:
+    """Writes a transfer's payloads straight into the output file. The count frame bounds the size (every frame
+    but the last carries exactly data_size bytes), so the file is preallocated to that bound, memory-mapped and
+    each payload is copied to its offset as it arrives, in any order; duplicates are ignored. finish() trims
+    the file to the real size, fsyncs it and renames it into place, so a partial image never shows up under the
+    final name. Written pages are handed back to the page cache as the in-order prefix grows, so the process
+    only keeps about SINK_RELEASE_BYTES of the image mapped."""
+
+    def __init__(self, path: str, num_pkts: int, data_size: int):
+        if num_pkts < 1 or data_size < 1:
+            raise ValueError(f"Nothing to reassemble: {num_pkts} frames of {data_size} bytes")
+        self.path = path
+        self.tmp_path = f"{path}.part"
+        self.num_pkts = num_pkts
+        self.data_size = data_size
+        self.received = bytearray(num_pkts)  # 1 per frame already written
+        self.count = 0  # Distinct frames written
+        self.prefix = 0  # Frames 0..prefix-1 are all in
+        self.released = 0  # Bytes of the mapping already given back
+        self.size: int | None = None  # Known once the last frame is in
+
+        self.file = open(self.tmp_path, "w+b")
+        try:
+            self.file.truncate(num_pkts * data_size)
+            self.map = mmap.mmap(self.file.fileno(), num_pkts * data_size)
+        except BaseException:
+            self.file.close()
+            os.remove(self.tmp_path)
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+    @property
+    def complete(self) -> bool:
+        return self.count == self.num_pkts
+
+    def write(self, index: int, payload: bytes | memoryview):
+        """Places the payload of data frame index (0 based, count frame excluded)"""
+        if not 0 <= index < self.num_pkts:
+            raise IndexError(f"Frame {index} outside of the {self.num_pkts} frame transfer")
+        if self.received[index]:
+            return
+        if index < self.num_pkts - 1 and len(payload) != self.data_size:
+            raise ValueError(f"Frame {index} carries {len(payload)} bytes, expected {self.data_size}")
+
+        offset = index * self.data_size
+        self.map[offset : offset + len(payload)] = payload
+        self.received[index] = 1
+        self.count += 1
+        if index == self.num_pkts - 1:
+            self.size = offset + len(payload)
+
+        while self.prefix < self.num_pkts and self.received[self.prefix]:
+            self.prefix += 1
+        self.__release(self.prefix * self.data_size)
+
+    def finish(self) -> int:
+        """Makes the file durable under its final name, returns its size"""
+        if not self.complete:
+            raise RuntimeError(f"{self.num_pkts - self.count} of {self.num_pkts} frames missing")
+        self.map.close()
+        self.file.truncate(self.size)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        return self.size
+
+    def abort(self):
+        """Drops the partial file"""
+        if not self.map.closed:
+            self.map.close()
+        if not self.file.closed:
+            self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __release(self, done: int):
+        # MADV_DONTNEED on a shared file mapping only unmaps: dirty pages stay in the page cache and are written back
+        if not hasattr(mmap, "MADV_DONTNEED") or done - self.released < SINK_RELEASE_BYTES:
+            return
+        end = done - done % mmap.PAGESIZE
+        self.map.madvise(mmap.MADV_DONTNEED, self.released, end - self.released)
+        self.released = end
@@ -3,9 +3,19 @@ import os
 import socket as soc
 import time
 
+from bulk_io import size_buffers
+from compression import NO_COMPRESSION, DecompressingSink, decompress, parse_session_header
 from constants import *
-from Packets import DataPacket
+from demux_receiver import DemuxReceiver
+from gbn_receiver import GBNReceiver
+from image_writer import ImageWriter
+from impairments import add_impairment_args, impairment_from_args
+from Packets import DataPacket, DataPacketView, ReportPacket, SeqDataPacket, SeqDataPacketView
 from rdt22_receiver import RDT22Receiver
+from reassembly import ReassemblySink
+from results_store import append_jsonl
+from sr_receiver import SRReceiver
+from transfer_stats import ReceiverStats
 
 
 def handle_CLI():
@@ -17,30 +27,69 @@ def handle_CLI():
                         help="Data transfer scenario: 0=NO_LOSS, 1=TX_ACK_LOSS, 2=RX_DATA_LOSS")
     parser.add_argument("-l", "--loss", default=0, type=int,
                         help="Receiver loss percent for RX_DATA_LOSS (0–100)")
+    parser.add_argument("-m", "--mode", default=RDT22_MODE, type=int,
+                        help="Transport protocol: 1=RDT 2.2 (stop-and-wait), 2=Go-Back-N, 3=Selective Repeat")
+    parser.add_argument("-w", "--window", default=WINDOW_SIZE, type=int,
+                        help="Receive window in frames for Selective Repeat")
+    parser.add_argument("-f", "--frame_size", default=FRAME_SIZE, type=int,
+                        help="Datagram size of a data frame in bytes, must match the sender")
+    parser.add_argument("-p", "--port", default=RX_PORT, type=int,
+                        help="UDP port to listen on")
+    parser.add_argument("--stats_file", default=None,
+                        help="Keep detailed RDT 2.2 statistics and append one JSON line per image to this file")
+    parser.add_argument("-d", "--demux", action="store_true",
+                        help="Accept RDT 2.2 uploads from many senders at once, each with its own state")
+    add_impairment_args(parser)
     args = parser.parse_args()
-    return args.output_file, args.scenario, args.loss
+    return (
+        args.output_file,
+        args.scenario,
+        args.loss,
+        args.mode,
+        args.window,
+        args.frame_size,
+        impairment_from_args(args),
+        args.port,
+        args.stats_file,
+        args.demux,
+    )
 
 
-def write_image_file(output_name: str, image_bytes: bytes):
-    """Writes received bytes to ./data/<output_name>.bmp"""
+def image_path(output_name: str) -> str:
+    """Path of ./data/<output_name>.bmp, creating the folder if needed"""
     data_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
     os.makedirs(data_folder, exist_ok=True)
-    out_path = os.path.join(data_folder, f"{output_name}.bmp")
+    return os.path.join(data_folder, f"{output_name}.bmp")
+
+
+def write_image_file(output_name: str, image_bytes: bytes):
+    """Writes received bytes to ./data/<output_name>.bmp"""
+    out_path = image_path(output_name)
     with open(out_path, "wb") as f:
         f.write(image_bytes)
     print(f"Saved image to: {out_path} ({len(image_bytes)} bytes)")
 
 
-def receive_one_image(receiver: RDT22Receiver) -> bytes:
-    """Receive exactly one image using an existing RDT22Receiver; return raw bytes."""
-    # First packet: number of data packets (8 bytes big-endian)
-    first_pkt: DataPacket | None = None
+def wait_count_frame(receiver: RDT22Receiver | GBNReceiver | SRReceiver) -> DataPacketView | SeqDataPacketView:
+    """Waits for the first frame of a transfer, the number of data packets and the codec
+    (compression.session_header)"""
+    first_pkt: DataPacketView | SeqDataPacketView | None = None
     while first_pkt is None:
         first_pkt = receiver.get_data_pkt()
-    num_pkts = int.from_bytes(first_pkt.data, "big")
+    return first_pkt
+
+
+def receive_one_image(receiver: RDT22Receiver | GBNReceiver | SRReceiver) -> bytes:
+    """Receive exactly one image using an existing receiver; return raw bytes.
+    Leaves the transfer's ReportPacket in receiver.completed for the sender's FIN."""
+    num_pkts, codec, session, _ = parse_session_header(wait_count_frame(receiver).data)
+
+    # Timed and counted from the count frame on, so idle time before the transfer is left out
+    start = time.perf_counter()
+    frames, duplicates, corrupt = receiver.frames_received, receiver.duplicates, receiver.corrupt
 
     # Receive the data packets
-    data_pkt_list: list[DataPacket] = []
+    data_pkt_list: list[DataPacketView | SeqDataPacketView] = []
     got = 0
     while got < num_pkts:
         pkt = receiver.get_data_pkt()
@@ -48,31 +97,174 @@ def receive_one_image(receiver: RDT22Receiver) -> bytes:
             data_pkt_list.append(pkt)
             got += 1
 
-    return b"".join(p.data for p in data_pkt_list)
+    image_bytes = decompress(b"".join(p.data for p in data_pkt_list), codec)
+
+    receiver.completed = ReportPacket(
+        receiver.epoch,
+        time.perf_counter() - start,
+        len(image_bytes),
+        receiver.frames_received - frames,
+        receiver.duplicates - duplicates,
+        receiver.corrupt - corrupt,
+        session,
+    )
+    return image_bytes
+
+
+def receive_image_file(
+    receiver: RDT22Receiver | GBNReceiver | SRReceiver, out_path: str, writer: ImageWriter | None = None
+) -> int:
+    """Receive exactly one image into out_path through a ReassemblySink, so only about a window of frames is
+    held in memory whatever the image size; returns the number of bytes. With a writer the final fsync and
+    rename happen on its thread and this returns as soon as the last frame is in. A compressed transfer is
+    decompressed as its frames arrive (DecompressingSink) and the reported size is the decompressed one.
+    Leaves the transfer's ReportPacket in receiver.completed for the sender's FIN."""
+    first_pkt = wait_count_frame(receiver)
+    num_pkts, codec, session, _ = parse_session_header(first_pkt.data)
+    if codec != NO_COMPRESSION:
+        sink = DecompressingSink(out_path, num_pkts, codec)
+    elif isinstance(first_pkt, SeqDataPacketView):
+        data_size = SeqDataPacket.max_data(first_pkt.checksum_algo, receiver.frame_size)
+        sink = ReassemblySink(out_path, num_pkts, data_size)
+    else:
+        sink = ReassemblySink(out_path, num_pkts, DataPacket.max_data(receiver.frame_size))
+
+    start = time.perf_counter()
+    frames, duplicates, corrupt = receiver.frames_received, receiver.duplicates, receiver.corrupt
+
+    with sink:
+        got = 0
+        while got < num_pkts:
+            pkt = receiver.get_data_pkt()
+            if pkt is not None:
+                sink.write(got, pkt.data)  # The receivers deliver in order
+                got += 1
+        duration = time.perf_counter() - start
+        if writer is None:
+            num_bytes = sink.finish()
+        else:
+            num_bytes = sink.size
+            writer.finish(sink)
+
+    receiver.completed = ReportPacket(
+        receiver.epoch,
+        duration,
+        num_bytes,
+        receiver.frames_received - frames,
+        receiver.duplicates - duplicates,
+        receiver.corrupt - corrupt,
+        session,
+    )
+    return num_bytes
+
+
+def print_writer_stats(writer: ImageWriter) -> None:
+    """Prints how far the disk writes lagged behind the protocol thread"""
+    stats = writer.get_stats()
+    mean = "n/a" if stats["mean_write"] is None else f"{stats['mean_write'] * 1000:.1f} ms"
+    print(
+        f"Writer: {stats['written']} images, {stats['bytes']} bytes, write mean {mean} max "
+        f"{stats['max_write'] * 1000:.1f} ms, queue depth max {stats['max_depth']}, receiver blocked "
+        f"{stats['blocked']:.3f} s"
+    )
+
+
+def serve_uploads(demux: DemuxReceiver, output_base: str, writer: ImageWriter):
+    """Saves every upload the demultiplexing receiver completes through writer, until interrupted"""
+    try:
+        while True:
+            result = demux.poll()
+            if result is None:
+                continue
+            (host, port), image_bytes = result
+            writer.write(image_path(f"{output_base}_{host}_{port}"), image_bytes)
+            report = demux.uploads[(host, port)].receiver.completed
+            print(
+                f"Upload from {host}:{port} received in {report.duration:.3f}s, {report.frames} frames, "
+                f"{report.duplicates} duplicates, {report.corrupt} corrupt ({len(demux.uploads)} uploads open)"
+            )
+    except KeyboardInterrupt:
+        print(f"\nShutting down receiver after {demux.completed} uploads.")
+    finally:
+        demux.sock.close()
+        writer.close()
+        print_writer_stats(writer)
 
 
 if __name__ == "__main__":
-    output_base, scenario, rx_loss_percent = handle_CLI()
+    (
+        output_base,
+        scenario,
+        rx_loss_percent,
+        mode,
+        window,
+        frame_size,
+        impairment,
+        port,
+        stats_file,
+        demux,
+    ) = handle_CLI()
+    if demux and mode != RDT22_MODE:
+        print("Only RDT 2.2 uploads can be demultiplexed")
+        exit()
+    if stats_file is not None and mode != RDT22_MODE:
+        print("Detailed statistics are only kept for RDT 2.2 (-m 1)")
+        exit()
 
     # Bind once and keep listening
     rx_sock = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
     rx_sock.setsockopt(soc.SOL_SOCKET, soc.SO_REUSEADDR, 1)
-    rx_sock.bind((RX_ADDR, RX_PORT))
+    rx_sock.bind((RX_ADDR, port))
 
     # Apply receiver-side loss only for scenario 2
     rx_loss_rate = (rx_loss_percent / 100.0) if scenario == RX_DATA_LOSS else 0.0
-    receiver = RDT22Receiver(rx_sock, scenario, rx_loss_rate)
+    if demux:
+        demux_receiver = DemuxReceiver(rx_sock, scenario, rx_loss_rate, frame_size, impairment)
+        serve_uploads(demux_receiver, output_base, ImageWriter())
+        exit()
+
+    if mode in (GBN_MODE, SR_MODE):
+        size_buffers(rx_sock, window, frame_size)  # Room for the bursts a full window arrives in
+    if mode == GBN_MODE:
+        receiver = GBNReceiver(rx_sock, scenario, rx_loss_rate, frame_size, impairment)
+    elif mode == SR_MODE:
+        receiver = SRReceiver(rx_sock, scenario, rx_loss_rate, window, frame_size, impairment)
+    else:
+        stats = ReceiverStats() if stats_file is not None else None
+        receiver = RDT22Receiver(rx_sock, scenario, rx_loss_rate, frame_size, impairment, stats)
 
+    # Images are made durable in the background while the next transfer is already being received
+    writer = ImageWriter()
     idx = 0
     try:
         while True:
-            start = time.time()
-            image_bytes = receive_one_image(receiver)
-            end = time.time()
-            write_image_file(f"{output_base}_{idx}", image_bytes)
-            print(f"Image #{idx} received in {end - start:.3f}s (scenario={scenario}, rx_loss={rx_loss_percent}%)")
+            out_path = image_path(f"{output_base}_{idx}")
+            receive_image_file(receiver, out_path, writer)
+            report = receiver.completed
+            print(
+                f"Image #{idx} received in {report.duration:.3f}s (scenario={scenario}, rx_loss={rx_loss_percent}%), "
+                f"{report.frames} frames, {report.duplicates} duplicates, {report.corrupt} corrupt, "
+                f"{writer.depth()} images waiting for the writer"
+            )
+            if stats_file is not None:
+                # Counted since the previous image, so the FIN of the previous transfer lands in this line
+                append_jsonl(
+                    stats_file,
+                    {
+                        "image": idx,
+                        "duration": report.duration,
+                        "bytes": report.num_bytes,
+                        "frames": report.frames,
+                        "duplicates": report.duplicates,
+                        "corrupt": report.corrupt,
+                        **receiver.stats.to_dict(),
+                    },
+                )
+                receiver.stats = ReceiverStats()
             idx += 1
     except KeyboardInterrupt:
         print("\nShutting down receiver.")
     finally:
         rx_sock.close()
+        writer.close()
+        print_writer_stats(writer)
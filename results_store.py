@@ -0,0 +1,94 @@
+import csv
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError:  # Only loading for analysis needs NumPy, appending records doesn't
+    np = None
+
+from compression import CODEC_NAMES, NO_COMPRESSION
+from constants import *
+
+MODE_NAMES = {RDT22_MODE: "rdt22", GBN_MODE: "gbn", SR_MODE: "sr"}
+SCENARIO_NAMES = {NO_LOSS: "no_loss", TX_ACK_LOSS: "tx_ack_loss", RX_DATA_LOSS: "rx_data_loss"}
+
+
+def mode_name(mode: int, fec: int | None = None, codec: int = NO_COMPRESSION, congestion: bool = False) -> str:
+    """Protocol name for the results, runs with FEC, compression or congestion control get their own (sr+fec
+    adaptive, sr+fec8 fixed blocks of 8, gbn+zlib, sr+aimd) so the analysis groups and plots them separately"""
+    name = MODE_NAMES.get(mode, str(mode))
+    if fec is not None:
+        name = f"{name}+fec" if fec == FEC_ADAPTIVE else f"{name}+fec{fec}"
+    if congestion:
+        name = f"{name}+aimd"
+    if codec != NO_COMPRESSION:
+        name = f"{name}+{CODEC_NAMES.get(codec, codec)}"
+    return name
+
+# Columns of the per-transfer store, in file order. Empty fields are values nobody measured (e.g. no report
+# from the receiver), they load as NaN.
+TRANSFER_FIELDS = (
+    "mode",
+    "scenario",
+    "loss",
+    "iter",
+    "frame_size",
+    "start_time",
+    "elapsed",
+    "frames_sent",
+    "retransmissions",
+    "timeouts",
+    "rto",
+    "srtt",
+    "rx_duration",
+    "rx_bytes",
+    "rx_frames",
+    "rx_duplicates",
+    "rx_corrupt",
+)
+
+
+def results_path(file_name: str) -> str:
+    """Path of a file in ./results, the folder is created on first use"""
+    results_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+    os.makedirs(results_folder, exist_ok=True)
+    return os.path.join(results_folder, file_name)
+
+
+def append_record(path: str, record: dict, fields: tuple[str, ...] = TRANSFER_FIELDS) -> None:
+    """Appends one record as a CSV row, writing the header if the file is new. Keys outside fields are ignored,
+    missing keys and None are left empty."""
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore", restval="")
+        if new_file:
+            writer.writeheader()
+        writer.writerow({key: "" if value is None else value for key, value in record.items()})
+
+
+def append_jsonl(path: str, record: dict) -> None:
+    """Appends one record as a line of JSON, for records whose fields vary (e.g. the detailed statistics)"""
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def _column(values: list[str]) -> "np.ndarray":
+    try:
+        return np.array([float(v) if v != "" else np.nan for v in values], dtype=np.float64)
+    except ValueError:
+        return np.array(values, dtype=object)
+
+
+def load_columns(path: str) -> dict[str, "np.ndarray"]:
+    """Loads a results CSV (the transfer store or any of the sweep outputs) column by column: numeric columns
+    become float64 arrays with NaN for empty fields, anything else an object array of strings"""
+    if np is None:
+        raise RuntimeError("Loading results needs NumPy")
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return {}
+        rows = [row for row in reader if row]
+    return {name: _column([row[i] if i < len(row) else "" for row in rows]) for i, name in enumerate(header)}
@@ -0,0 +1,57 @@
+from constants import *
+
+
+class RTOEstimator:
+    """Smoothed retransmission timeout estimator (RFC 6298): SRTT/RTTVAR from RTT samples,
+    RTO = SRTT + max(G, 4 * RTTVAR) clamped to [min_rto, max_rto] and doubled on every timeout. G is the clock
+    granularity: on loopback RTTVAR is microseconds, far below how late a Python thread may wake up."""
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(
+        self,
+        initial_rto: float = INITIAL_RTO,
+        min_rto: float = MIN_RTO,
+        max_rto: float = MAX_RTO,
+        granularity: float = CLOCK_GRANULARITY,
+    ):
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.granularity = granularity
+        self.srtt: float | None = None
+        self.rttvar: float | None = None
+        self.base_rto = self.__clamp(initial_rto)  # RTO before backoff
+        self.backoffs = 0  # Timeouts since the last ACK of new data
+        self.samples = 0
+
+    @property
+    def rto(self) -> float:
+        """Current timeout in seconds, including exponential backoff"""
+        return self.__clamp(self.base_rto * (1 << self.backoffs))
+
+    def sample(self, rtt: float):
+        """Feed one RTT measurement. Callers must skip frames that were retransmitted (Karn's algorithm)."""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+
+        self.base_rto = self.__clamp(self.srtt + max(self.granularity, self.K * self.rttvar))
+        self.samples += 1
+
+    def backoff(self):
+        """Exponential backoff after a timeout"""
+        if self.rto < self.max_rto:
+            self.backoffs += 1
+
+    def reset_backoff(self):
+        """An ACK acknowledged new data, so the path is alive again. Without this a lossy link rarely yields a
+        sample that Karn's algorithm accepts and the backed off RTO would stay pinned at max_rto."""
+        self.backoffs = 0
+
+    def __clamp(self, rto: float) -> float:
+        return max(self.min_rto, min(self.max_rto, rto))
@@ -0,0 +1,62 @@
+from math import isclose
+
+from rto import RTOEstimator
+
+# SRTT/RTTVAR follow RFC 6298: the first sample sets SRTT = R and RTTVAR = R/2, later ones are smoothed
+rto = RTOEstimator(initial_rto=1.0, min_rto=0.01, max_rto=4.0, granularity=0.01)
+if rto.rto == 1.0 and rto.srtt is None:
+    print("[Pass] The RTO starts at the initial value")
+else:
+    print(f"[Fail] The RTO starts at {rto.rto} instead of 1.0")
+
+rto.sample(0.1)
+if isclose(rto.srtt, 0.1) and isclose(rto.rttvar, 0.05) and isclose(rto.rto, 0.3):
+    print("[Pass] First sample: SRTT = R, RTTVAR = R/2, RTO = SRTT + 4 * RTTVAR")
+else:
+    print(f"[Fail] First sample gave SRTT {rto.srtt}, RTTVAR {rto.rttvar}, RTO {rto.rto}")
+
+rto.sample(0.2)
+if isclose(rto.srtt, 0.1125) and isclose(rto.rttvar, 0.0625) and isclose(rto.rto, 0.3625):
+    print("[Pass] Second sample is smoothed with alpha 1/8 and beta 1/4")
+else:
+    print(f"[Fail] Second sample gave SRTT {rto.srtt}, RTTVAR {rto.rttvar}, RTO {rto.rto}")
+
+# On a fast link the variance term is the clock granularity, not the microseconds of RTTVAR
+fast = RTOEstimator(min_rto=0.001, granularity=0.01)
+for _ in range(50):
+    fast.sample(0.0001)
+if isclose(fast.rto, 0.0101):
+    print("[Pass] The variance term never drops below the clock granularity")
+else:
+    print(f"[Fail] RTO of a steady 0.1 ms path is {fast.rto} instead of 10.1 ms")
+
+# Clamping to [min_rto, max_rto]
+low = RTOEstimator(min_rto=0.05, granularity=0.0)
+low.sample(0.001)
+high = RTOEstimator(max_rto=4.0)
+high.sample(10.0)
+if low.rto == 0.05 and high.rto == 4.0 and RTOEstimator(initial_rto=9.0, max_rto=4.0).rto == 4.0:
+    print("[Pass] The RTO is clamped to min_rto and max_rto")
+else:
+    print(f"[Fail] Clamping gave {low.rto} for the floor and {high.rto} for the ceiling")
+
+# Backoff doubles the RTO up to max_rto and stops counting there, an ACK of new data undoes it
+doubled = []
+for _ in range(3):
+    rto.backoff()
+    doubled.append(rto.rto)
+if all(isclose(a, b) for a, b in zip(doubled, [0.725, 1.45, 2.9])):
+    print("[Pass] Every backoff doubles the RTO")
+else:
+    print(f"[Fail] Backoffs gave {doubled}")
+for _ in range(10):
+    rto.backoff()
+if rto.rto == 4.0 and rto.backoffs == 4:
+    print("[Pass] Backoff is capped at max_rto")
+else:
+    print(f"[Fail] After many backoffs the RTO is {rto.rto} with {rto.backoffs} backoffs")
+rto.reset_backoff()
+if isclose(rto.rto, 0.3625) and rto.backoffs == 0:
+    print("[Pass] reset_backoff returns to the estimated RTO")
+else:
+    print(f"[Fail] After reset_backoff the RTO is {rto.rto}")
@@ -1,57 +1,187 @@
 import argparse
+import io
+import itertools
 import os
 import socket as soc
 import time
+from typing import BinaryIO, Callable, Iterable, Iterator
 
+from bulk_io import size_buffers
+from checksum import CHECKSUM_ALGOS, XOR16
+from compression import CODEC_NAMES, NO_COMPRESSION, compress_stream, new_session, parse_session_header, session_header
 from constants import *
-from Packets import DataPacket
+from frame_cache import FrameCache, file_digest
+from gbn_sender import GBNSender
+from impairments import ImpairmentSpec, add_impairment_args, impairment_from_args
+from pacing import TokenBucket
+from Packets import DataPacket, FinPacket, ReportPacket, SeqDataPacket
 from rdt22_sender import RDT22Sender
+from results_store import SCENARIO_NAMES, append_jsonl, append_record, mode_name, results_path
+from sr_sender import SRSender
+from transfer_stats import SenderStats
 
 
-def make_data_pkt(data: bytes) -> list[DataPacket]:
-    """Helper function that takes an array of bytes and converts it to a list of Data Packets."""
-    num_bytes = len(data)
-    num_full_pkts = num_bytes // DataPacket.DATA_SIZE
+def print_stats(stats: dict) -> None:
+    """Prints the per-transfer statistics reported by a sender, plus the receiver's side when it reported back"""
+    srtt = "n/a" if stats["srtt"] is None else f"{stats['srtt'] * 1000:.3f} ms"
+    print(
+        f"Sent {stats['frames_sent']} frames, {stats['retransmissions']} retransmissions, "
+        f"{stats['timeouts']} timeouts, RTO {stats['rto'] * 1000:.3f} ms, SRTT {srtt}"
+    )
+    if stats.get("rx_duration") is not None:
+        goodput = stats["rx_bytes"] / stats["rx_duration"] / 1e6 if stats["rx_duration"] > 0 else float("inf")
+        print(
+            f"Receiver got {stats['rx_bytes']} bytes in {stats['rx_duration']:.3f} s ({goodput:.2f} MB/s), "
+            f"{stats['rx_duplicates']} duplicate and {stats['rx_corrupt']} corrupt frames"
+        )
+    else:
+        print("No completion report from the receiver")
+
+
+def count_data_pkt(
+    num_pkts: int, codec: int, session: int, num_bytes: int, padded: bool = True, frame_size: int = FRAME_SIZE
+) -> DataPacket:
+    """First frame of an RDT 2.2 transfer: the number of data packets to follow, the codec, the session nonce
+    and the image size (compression.session_header)"""
+    return DataPacket(session_header(num_pkts, codec, session, num_bytes), 0, padded, frame_size)
+
 
-    pkt_list: list[DataPacket] = []
+def count_seq_data_pkt(
+    num_pkts: int,
+    codec: int,
+    session: int,
+    num_bytes: int,
+    epoch: int,
+    checksum_algo: int = XOR16,
+    padded: bool = True,
+    frame_size: int = FRAME_SIZE,
+) -> SeqDataPacket:
+    """Same as count_data_pkt for the pipelined protocols, flagged as the start of the transfer"""
+    flags = SeqDataPacket.FLAG_START | (SeqDataPacket.FLAG_EPOCH if epoch else 0)
+    header = session_header(num_pkts, codec, session, num_bytes)
+    return SeqDataPacket(header, 0, flags, checksum_algo, padded, frame_size)
+
+
+def iter_data_pkt(
+    stream: BinaryIO,
+    num_bytes: int,
+    padded: bool = True,
+    frame_size: int = FRAME_SIZE,
+    codec: int = NO_COMPRESSION,
+    level: int | None = None,
+    session: int | None = None,
+) -> Iterator[DataPacket]:
+    """Lazily packetizes num_bytes read from stream, one frame at a time. The packet count is known from
+    num_bytes alone, so the count frame goes first without reading the data ahead. With a codec the stream
+    goes through the compression stage first, which has to finish before the count is known. A fresh
+    session nonce is drawn unless one is given."""
+    image_size = num_bytes
+    if codec != NO_COMPRESSION:
+        stream, num_bytes = compress_stream(stream, codec, level)
+    data_size = DataPacket.max_data(frame_size)
+    num_full_pkts = num_bytes // data_size
     seq_num = 0
 
-    # First packet carries the number of data packets to follow (8 bytes, big-endian)
     num_data_packets = num_full_pkts + 1
-    num_packets_bytes = num_data_packets.to_bytes(8, "big")
-    pkt_list.append(DataPacket(num_packets_bytes, seq_num))
-    seq_num ^= 1
-
-    # Full-sized packets
-    for i in range(num_full_pkts):
-        start = i * DataPacket.DATA_SIZE
-        end = (i + 1) * DataPacket.DATA_SIZE
-        pkt_list.append(DataPacket(data[start:end], seq_num))
+    session = new_session() if session is None else session
+    yield count_data_pkt(num_data_packets, codec, session, image_size, padded, frame_size)
+
+    # Full-sized packets, then the final (possibly partial) packet
+    for i in range(num_data_packets):
         seq_num ^= 1
+        expected = data_size if i < num_full_pkts else num_bytes - num_full_pkts * data_size
+        yield DataPacket(read_chunk(stream, expected), seq_num, padded, frame_size)
 
-    # Final (possibly partial) packet
-    pkt_list.append(DataPacket(data[num_full_pkts * DataPacket.DATA_SIZE :], seq_num))
-    return pkt_list
 
+def iter_seq_data_pkt(
+    stream: BinaryIO,
+    num_bytes: int,
+    epoch: int,
+    checksum_algo: int = XOR16,
+    padded: bool = True,
+    frame_size: int = FRAME_SIZE,
+    codec: int = NO_COMPRESSION,
+    level: int | None = None,
+    session: int | None = None,
+) -> Iterator[SeqDataPacket]:
+    """Same as iter_data_pkt but builds numbered frames for the pipelined protocols.
+    The count frame is flagged as the start of the transfer and every frame carries the epoch."""
+    image_size = num_bytes
+    if codec != NO_COMPRESSION:
+        stream, num_bytes = compress_stream(stream, codec, level)
+    data_size = SeqDataPacket.max_data(checksum_algo, frame_size)
+    num_full_pkts = num_bytes // data_size
+    flags = SeqDataPacket.FLAG_EPOCH if epoch else 0
 
-def image_file_2_bytes(image_file_name: str) -> bytes:
-    """Reads an image by base name (no extension) and returns its bytes."""
+    num_data_packets = num_full_pkts + 1
+    session = new_session() if session is None else session
+    yield count_seq_data_pkt(num_data_packets, codec, session, image_size, epoch, checksum_algo, padded, frame_size)
+
+    # Full-sized packets, then the final (possibly partial) packet
+    for i in range(num_data_packets):
+        expected = data_size if i < num_full_pkts else num_bytes - num_full_pkts * data_size
+        yield SeqDataPacket(read_chunk(stream, expected), i + 1, flags, checksum_algo, padded, frame_size)
+
+
+def read_chunk(stream: BinaryIO, num_bytes: int) -> bytes:
+    """Reads exactly num_bytes, the count frame has already promised the receiver this many"""
+    chunk = stream.read(num_bytes)
+    if len(chunk) != num_bytes:
+        raise ValueError(f"Input ended early: expected {num_bytes} bytes, read {len(chunk)}")
+    return chunk
+
+
+def make_data_pkt(
+    data: bytes,
+    padded: bool = True,
+    frame_size: int = FRAME_SIZE,
+    codec: int = NO_COMPRESSION,
+    level: int | None = None,
+    session: int | None = None,
+) -> list[DataPacket]:
+    """Helper function that takes an array of bytes and converts it to a list of Data Packets.
+    With padded=False the short frames (count frame, final frame) go on the wire at their real length."""
+    return list(iter_data_pkt(io.BytesIO(data), len(data), padded, frame_size, codec, level, session))
+
+
+def make_seq_data_pkt(
+    data: bytes,
+    epoch: int,
+    checksum_algo: int = XOR16,
+    padded: bool = True,
+    frame_size: int = FRAME_SIZE,
+    codec: int = NO_COMPRESSION,
+    level: int | None = None,
+    session: int | None = None,
+) -> list[SeqDataPacket]:
+    """Same as make_data_pkt but builds numbered frames for the pipelined protocols."""
+    stream = io.BytesIO(data)
+    return list(
+        iter_seq_data_pkt(stream, len(data), epoch, checksum_algo, padded, frame_size, codec, level, session)
+    )
+
+
+def find_image_file(image_file_name: str) -> str:
+    """Finds an image by base name (no extension) and returns its path."""
     here = os.path.dirname(os.path.abspath(__file__))
     data_folder = os.path.join(here, "data")
     primary = os.path.join(data_folder, f"{image_file_name}.bmp")
     fallback = os.path.join(here, f"{image_file_name}.bmp")
 
     for path in (primary, fallback):
-        try:
-            with open(path, "rb") as img_file:
-                return img_file.read()
-        except FileNotFoundError:
-            continue
+        if os.path.isfile(path):
+            return path
 
     print(f"Could not find file in either:\n  {primary}\n  {fallback}\nExiting program!")
     exit(1)
 
 
+def image_file_2_bytes(image_file_name: str) -> bytes:
+    """Reads an image by base name (no extension) and returns its bytes."""
+    with open(find_image_file(image_file_name), "rb") as img_file:
+        return img_file.read()
+
+
 def handle_CLI():
     """Reads command line arguments to get the input file name and scenario."""
     parser = argparse.ArgumentParser(description="Image sender with RDT 2.2 protocol")
@@ -59,56 +189,448 @@ def handle_CLI():
                         help="Image base name to send (no extension)")
     parser.add_argument("-s", "--scenario", default=1, type=int,
                         help="Data transfer scenario: 0=NO_LOSS, 1=TX_ACK_LOSS, 2=RX_DATA_LOSS")
+    parser.add_argument("-m", "--mode", default=RDT22_MODE, type=int,
+                        help="Transport protocol: 1=RDT 2.2 (stop-and-wait), 2=Go-Back-N, 3=Selective Repeat")
+    parser.add_argument("-w", "--window", default=WINDOW_SIZE, type=int,
+                        help="Window size in frames for the pipelined protocols")
+    parser.add_argument("-c", "--checksum", default=XOR16, type=int, choices=sorted(CHECKSUM_ALGOS),
+                        help="Checksum for the pipelined protocols: 0=XOR16, 1=INET16 (RFC 1071), 2=CRC32")
+    parser.add_argument("-v", "--variable_length", action="store_true",
+                        help="Send short frames at their real length instead of padding them to the frame size")
+    parser.add_argument("-f", "--frame_size", default=FRAME_SIZE, type=int,
+                        help="Datagram size of a data frame in bytes, must match the receiver")
+    parser.add_argument("--cache_dir", default=None,
+                        help="Also keep encoded frames in this directory so later runs skip packetization")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Encode the frames again for every transfer instead of caching them")
+    parser.add_argument("-p", "--port", default=RX_PORT, type=int,
+                        help="UDP port the receiver listens on")
+    parser.add_argument("--stats_file", default=None,
+                        help="Keep detailed RDT 2.2 statistics and append one JSON line per transfer to this file")
+    parser.add_argument("--fec", default=None, type=int,
+                        help="Selective Repeat only: add one XOR parity frame per this many data frames (1-16), "
+                             "0 sizes the blocks from the observed loss")
+    parser.add_argument("--aimd", action="store_true",
+                        help="Pipelined protocols: AIMD congestion control on top of the receiver's advertised window")
+    parser.add_argument("-z", "--codec", default=NO_COMPRESSION, type=int, choices=sorted(CODEC_NAMES),
+                        help="Compress the image before sending it: 0=none, 1=zlib, 2=lzma")
+    parser.add_argument("--level", default=None, type=int,
+                        help="Compression level, 0-9 for both codecs (default 6)")
+    parser.add_argument("--pace_rate", default=None, type=float,
+                        help="Pace the data frames to this many bytes per second (default: send as fast as allowed)")
+    parser.add_argument("--pace_burst", default=PACING_BURST, type=int,
+                        help="Bytes that may leave back to back when pacing")
+    add_impairment_args(parser)
     args = parser.parse_args()
-    return args.input_file, args.scenario
+    return (
+        args.input_file,
+        args.scenario,
+        args.mode,
+        args.window,
+        args.checksum,
+        not args.variable_length,
+        args.frame_size,
+        args.cache_dir,
+        not args.no_cache,
+        impairment_from_args(args),
+        args.port,
+        args.stats_file,
+        args.fec,
+        args.aimd,
+        args.codec,
+        args.level,
+        args.pace_rate,
+        args.pace_burst,
+    )
+
+
+def make_sender(
+    sock: soc.socket,
+    mode: int,
+    scenario: int,
+    loss: float,
+    window: int = WINDOW_SIZE,
+    clock: Callable[[], float] = time.monotonic,
+    impairment: ImpairmentSpec = ImpairmentSpec(),
+    dest: tuple[str, int] = (RX_ADDR, RX_PORT),
+    stats: SenderStats | None = None,
+    batch: bool = True,
+    fec: int | None = None,
+    congestion: bool = False,
+    pacer: TokenBucket | None = None,
+) -> RDT22Sender | GBNSender | SRSender:
+    """Builds the sender for the chosen protocol, only RDT 2.2 keeps detailed stats, only the pipelined
+    protocols batch their system calls and run congestion control (stop-and-wait has a single datagram in
+    flight) and only Selective Repeat sends FEC parity (the other receivers drop the frames a block needs).
+    Every protocol can be paced."""
+    if fec is not None and mode != SR_MODE:
+        raise ValueError("FEC needs Selective Repeat")
+    if mode == SR_MODE:
+        return SRSender(sock, scenario, loss, window, clock, impairment, dest, batch, fec, congestion, pacer)
+    elif mode == GBN_MODE:
+        return GBNSender(sock, scenario, loss, window, clock, impairment, dest, batch, congestion, pacer)
+    else:
+        return RDT22Sender(sock, scenario, loss, clock, impairment, dest, stats, pacer)
+
+
+def run_sender(sender: RDT22Sender | GBNSender | SRSender, packets: Iterable[DataPacket | SeqDataPacket]) -> None:
+    """Pushes every packet through the sender and returns once the last one is ACKed"""
+    if isinstance(sender, RDT22Sender):
+        for packet in packets:
+            sender.rdt_send(packet)
+            # input() returns True while it is still resending this packet
+            while sender.input():
+                pass
+        return
+
+    packets = iter(packets)
+    next_packet = next(packets, None)
+
+    # Keep the window full, then block for one ACK (or the timer, or the pacer) at a time
+    while next_packet is not None or sender.in_flight():
+        while next_packet is not None and sender.rdt_send(next_packet):
+            next_packet = next(packets, None)
+        sender.input()
+
 
+def transfer_session(packets: Iterable[DataPacket | SeqDataPacket]) -> tuple[Iterator, int, int | None]:
+    """Reads the session nonce and the image size from the count frame at the head of packets. Returns them with
+    an iterator over all the packets, count frame included, so a generator is not consumed."""
+    packets = iter(packets)
+    count = next(packets, None)
+    if count is None:
+        return packets, 0, None
+    _, _, session, num_bytes = parse_session_header(count.data)
+    return itertools.chain([count], packets), session, num_bytes
 
-def send_image(bytes_image: bytes, scenario: int, loss: float) -> float:
-    """Main loop that uses RDT 2.2 to send bytes to receiver. Returns start_time."""
+
+def accepts_report(report: ReportPacket | None, epoch: int, session: int, num_bytes: int | None) -> bool:
+    """Whether report is the receiver's answer about this transfer: same epoch, same session nonce and, when the
+    count frame said how big the image is, that many bytes received"""
+    if report is None or report.epoch != epoch or report.session != session:
+        return False
+    return num_bytes is None or report.num_bytes == num_bytes
+
+
+def request_report(
+    sender: RDT22Sender | GBNSender | SRSender,
+    epoch: int,
+    session: int,
+    num_bytes: int | None = None,
+    retries: int = FIN_RETRIES,
+):
+    """Sends FIN until the receiver answers with its ReportPacket for this transfer, None if it never does.
+    Call once every frame is ACKed; anything else still arriving (late ACKs, stale reports, a report about
+    another transfer or with the wrong byte count) is skipped."""
+    fin = FinPacket(epoch, session).to_bytes()
+    timeout = sender.rto.rto
+    for _ in range(retries):
+        sender.sock.sendto(fin, sender.dest)
+        deadline = sender.clock() + timeout
+        while (remaining := deadline - sender.clock()) > 0:
+            sender.sock.settimeout(remaining)
+            try:
+                rcvpkt, _ = sender.sock.recvfrom(1024)
+            except soc.timeout:
+                break
+            report = ReportPacket.packet_from_bytes(rcvpkt)
+            if accepts_report(report, epoch, session, num_bytes):
+                return report
+        timeout = min(timeout * 2, MAX_RTO)
+    return None
+
+
+def transfer_record(
+    sender: RDT22Sender | GBNSender | SRSender, start_time: float, elapsed: float, report: ReportPacket | None
+) -> dict:
+    """One record per transfer: the sender's statistics plus what the receiver reported (None if it didn't).
+    start_time is wall clock for lining runs up, all durations come from a single process's perf_counter."""
+    record = {"start_time": start_time, "elapsed": elapsed, **sender.get_stats()}
+    record["rx_duration"] = report.duration if report else None
+    record["rx_bytes"] = report.num_bytes if report else None
+    record["rx_frames"] = report.frames if report else None
+    record["rx_duplicates"] = report.duplicates if report else None
+    record["rx_corrupt"] = report.corrupt if report else None
+    return record
+
+
+def send_packets(
+    packets: Iterable[DataPacket],
+    scenario: int,
+    loss: float,
+    impairment: ImpairmentSpec = ImpairmentSpec(),
+    dest: tuple[str, int] = (RX_ADDR, RX_PORT),
+    stats: bool = False,
+    pacer: TokenBucket | None = None,
+) -> dict:
+    """Main loop that uses RDT 2.2 to send packets to receiver. Returns the transfer record, with the detailed
+    statistics in it if stats is set."""
     tx_soc = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
     with tx_soc:
         # NOTE: We don't connect(). rdt22_sender.udt_rcv() uses recvfrom() safely.
-        data_packet_list = make_data_pkt(bytes_image)
-        sender = RDT22Sender(tx_soc, scenario, loss)
+        sender = make_sender(
+            tx_soc,
+            RDT22_MODE,
+            scenario,
+            loss,
+            impairment=impairment,
+            dest=dest,
+            stats=SenderStats() if stats else None,
+            pacer=pacer,
+        )
+
+        packets, session, num_bytes = transfer_session(packets)
+        start_time = time.time()
+        start = time.perf_counter()
+        run_sender(sender, packets)
+        elapsed = time.perf_counter() - start
+
+        record = transfer_record(sender, start_time, elapsed, request_report(sender, 0, session, num_bytes))
+        print_stats(record)
+        return record
+
+
+def send_packets_pipelined(
+    packets: Iterable[SeqDataPacket],
+    scenario: int,
+    loss: float,
+    mode: int,
+    window: int,
+    impairment: ImpairmentSpec = ImpairmentSpec(),
+    dest: tuple[str, int] = (RX_ADDR, RX_PORT),
+    frame_size: int = FRAME_SIZE,
+    fec: int | None = None,
+    congestion: bool = False,
+    pacer: TokenBucket | None = None,
+) -> dict:
+    """Main loop that uses Go-Back-N or Selective Repeat to send packets to receiver. Returns the transfer record."""
+    tx_soc = soc.socket(soc.AF_INET, soc.SOCK_DGRAM)
+    with tx_soc:
+        size_buffers(tx_soc, window, frame_size)  # A whole window leaves in one burst
+        sender = make_sender(
+            tx_soc,
+            mode,
+            scenario,
+            loss,
+            window,
+            impairment=impairment,
+            dest=dest,
+            fec=fec,
+            congestion=congestion,
+            pacer=pacer,
+        )
 
-        data_idx = 0
+        packets, session, num_bytes = transfer_session(packets)
         start_time = time.time()
+        start = time.perf_counter()
+        run_sender(sender, packets)
+        elapsed = time.perf_counter() - start
 
-        while data_idx < len(data_packet_list):
-            sender.rdt_send(data_packet_list[data_idx])
-            resent = sender.input()
-            if not resent:
-                data_idx += 1
+        report = request_report(sender, sender.epoch or 0, session, num_bytes)
+        record = transfer_record(sender, start_time, elapsed, report)
+        print_stats(record)
+        return record
 
-        return start_time
 
+def send_image(
+    bytes_image: bytes, scenario: int, loss: float, padded: bool = True, frame_size: int = FRAME_SIZE
+) -> dict:
+    """Uses RDT 2.2 to send bytes to receiver. Returns the transfer record."""
+    return send_packets(make_data_pkt(bytes_image, padded, frame_size), scenario, loss)
 
-def write_time_file(scenario: int, iter: int, loss: int, start_time: float) -> None:
-    here = os.path.dirname(os.path.abspath(__file__))
-    results_folder = os.path.join(here, "results")
-    os.makedirs(results_folder, exist_ok=True)  # ensure folder exists
-
-    if scenario == NO_LOSS:
-        time_file = "no_loss_start_times.txt"
-    elif scenario == TX_ACK_LOSS:
-        time_file = "tx_ack_loss_start_times.txt"
-    elif scenario == RX_DATA_LOSS:
-        time_file = "rx_data_loss_start_times.txt"
+
+def send_image_pipelined(
+    bytes_image: bytes,
+    scenario: int,
+    loss: float,
+    mode: int,
+    window: int,
+    epoch: int,
+    checksum_algo: int = XOR16,
+    padded: bool = True,
+    frame_size: int = FRAME_SIZE,
+) -> dict:
+    """Uses Go-Back-N or Selective Repeat to send bytes to receiver. Returns the transfer record."""
+    data_packet_list = make_seq_data_pkt(bytes_image, epoch, checksum_algo, padded, frame_size)
+    return send_packets_pipelined(data_packet_list, scenario, loss, mode, window, frame_size=frame_size)
+
+
+def send_image_file(
+    path: str,
+    scenario: int,
+    loss: float,
+    mode: int = RDT22_MODE,
+    window: int = WINDOW_SIZE,
+    epoch: int = 0,
+    checksum_algo: int = XOR16,
+    padded: bool = True,
+    frame_size: int = FRAME_SIZE,
+    cache: FrameCache | None = None,
+    impairment: ImpairmentSpec = ImpairmentSpec(),
+    dest: tuple[str, int] = (RX_ADDR, RX_PORT),
+    stats: bool = False,
+    fec: int | None = None,
+    codec: int = NO_COMPRESSION,
+    level: int | None = None,
+    congestion: bool = False,
+    pacer: TokenBucket | None = None,
+) -> dict:
+    """Streams a file to the receiver, frames are built as the window opens up so memory stays bounded
+    and the first frame leaves right away no matter how big the file is. With a codec the file is compressed
+    (to a spool, compression.compress_stream) before the first frame. With a cache, repeated sends of the
+    same content reuse the frames encoded the first time instead, behind a count frame of their own since
+    every transfer has a new session nonce. With a pacer the frames leave at most at its rate. Returns the
+    transfer record."""
+    pipelined = mode in (GBN_MODE, SR_MODE)
+    session = new_session()
+
+    def packetize():
+        with open(path, "rb") as img_file:
+            num_bytes = os.fstat(img_file.fileno()).st_size
+            if pipelined:
+                yield from iter_seq_data_pkt(
+                    img_file, num_bytes, epoch, checksum_algo, padded, frame_size, codec, level, session
+                )
+            else:
+                yield from iter_data_pkt(img_file, num_bytes, padded, frame_size, codec, level, session)
+
+    if cache is None:
+        packets = packetize()
     else:
-        time_file = f"scenario_{scenario}_start_times.txt"
+        # Only the data frames are cached. GBN and SR share them; RDT 2.2 frames always use XOR16 and carry no
+        # epoch
+        if pipelined:
+            key = (file_digest(path), frame_size, checksum_algo, "seq_data", int(padded), epoch, codec, level)
+        else:
+            key = (file_digest(path), frame_size, XOR16, "rdt22_data", int(padded), 0, codec, level)
+        frames = cache.get(key, lambda: list(packetize())[1:])
+        num_bytes = os.path.getsize(path)
+        if pipelined:
+            count = count_seq_data_pkt(
+                len(frames), codec, session, num_bytes, epoch, checksum_algo, padded, frame_size
+            )
+        else:
+            count = count_data_pkt(len(frames), codec, session, num_bytes, padded, frame_size)
+        packets = [count, *frames]
 
-    full_time_file_path = os.path.join(results_folder, time_file)
+    if pipelined:
+        return send_packets_pipelined(
+            packets, scenario, loss, mode, window, impairment, dest, frame_size, fec, congestion, pacer
+        )
+    else:
+        return send_packets(packets, scenario, loss, impairment, dest, stats, pacer)
+
+
+def write_time_file(scenario: int, iter: int, loss: int, timestamp: float, kind: str = "start") -> None:
+    """Appends to results/<scenario>_<kind>_times.txt, kind is start or end"""
+    prefix = SCENARIO_NAMES.get(scenario, f"scenario_{scenario}")
+    full_time_file_path = results_path(f"{prefix}_{kind}_times.txt")
     with open(full_time_file_path, "a") as f:
-        f.write(f"{iter},{loss},{start_time}\n")
+        f.write(f"{iter},{loss},{timestamp}\n")
+
+
+def write_transfer_record(
+    mode: int,
+    scenario: int,
+    iter: int,
+    loss: int,
+    frame_size: int,
+    record: dict,
+    fec: int | None = None,
+    codec: int = NO_COMPRESSION,
+    congestion: bool = False,
+) -> None:
+    """Appends one transfer's record to the results store, results/transfers.csv"""
+    row = {
+        "mode": mode_name(mode, fec, codec, congestion),
+        "scenario": SCENARIO_NAMES.get(scenario, scenario),
+        "loss": loss,
+        "iter": iter,
+        "frame_size": frame_size,
+        **record,
+    }
+    append_record(results_path("transfers.csv"), row)
 
 
 if __name__ == "__main__":
-    input_file, scenario = handle_CLI()
-    bytes_image = image_file_2_bytes(input_file)
+    (
+        input_file,
+        scenario,
+        mode,
+        window,
+        checksum_algo,
+        padded,
+        frame_size,
+        cache_dir,
+        use_cache,
+        impairment,
+        port,
+        stats_file,
+        fec,
+        congestion,
+        codec,
+        level,
+        rate,
+        burst,
+    ) = handle_CLI()
+    if fec is not None and mode != SR_MODE:
+        print("FEC is only available with Selective Repeat (-m 3)")
+        exit()
+    if congestion and mode not in (GBN_MODE, SR_MODE):
+        print("Congestion control is only available with the pipelined protocols (-m 2 or 3)")
+        exit()
+    image_path = find_image_file(input_file)
+
+    # One bucket for the whole run, it fills back up to a burst in the gaps between transfers
+    pacer = TokenBucket(rate, burst) if rate else None
+
+    # Every transfer sends the same image, so the frames only need encoding once per epoch
+    cache = FrameCache(FRAME_CACHE_BYTES, cache_dir) if use_cache else None
+
+    # Consecutive pipelined transfers alternate epochs so the receiver can tell them apart
+    epoch = 0
 
     # Iterate loss rate 0..60% in steps of 5 (sender-side loss only matters for scenario 1)
     for loss in range(0, 61, 5):
         for iter in range(0, NUM_ITER):
-            start_time = send_image(bytes_image, scenario, loss / 100.0)
-            write_time_file(scenario, iter, loss, start_time)
-            time.sleep(1)  # brief pause between runs
+            record = send_image_file(
+                image_path,
+                scenario,
+                loss / 100.0,
+                mode,
+                window,
+                epoch,
+                checksum_algo,
+                padded,
+                frame_size,
+                cache,
+                impairment,
+                (RX_ADDR, port),
+                stats_file is not None,
+                fec,
+                codec,
+                level,
+                congestion,
+                pacer,
+            )
+            epoch ^= 1
+
+            # The end time is derived from a duration measured in one process, never from two clocks
+            duration = record["rx_duration"] if record["rx_duration"] is not None else record["elapsed"]
+            write_time_file(scenario, iter, loss, record["start_time"])
+            write_time_file(scenario, iter, loss, record["start_time"] + duration, "end")
+            write_transfer_record(mode, scenario, iter, loss, frame_size, record, fec, codec, congestion)
+            if stats_file is not None:
+                append_jsonl(stats_file, {"mode": mode, "scenario": scenario, "loss": loss, "iter": iter, **record})
+
+            if record["rx_duration"] is None:
+                time.sleep(1)  # no report, give the receiver a moment before the next run
+
+    if cache is not None:
+        print(f"Frame cache: {cache.hits} hits, {cache.disk_hits} loaded from disk, {cache.misses} encoded")
+    if pacer is not None:
+        paced = pacer.get_stats()
+        print(
+            f"Pacing: {paced['bytes']} bytes at {paced['rate']:.0f} B/s, waited {paced['waits']} times for "
+            f"{paced['waited']:.3f} s"
+        )
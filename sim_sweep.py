@@ -0,0 +1,194 @@
+import argparse
+import csv
+import dataclasses
+import os
+import socket as soc
+import time
+
+from checksum import CHECKSUM_ALGOS, XOR16
+from channel_emulator import EmulatedNetwork, EmulatedSocket, LinkConfig
+from compression import NO_COMPRESSION, decompress, parse_session_header
+from constants import *
+from frame_size_sweep import make_receiver
+from impairments import ImpairmentSpec, add_impairment_args, impairment_from_args
+from Packets import DataPacketView, SeqDataPacketView
+from results_store import SCENARIO_NAMES, mode_name
+from sender_app import image_file_2_bytes, make_data_pkt, make_sender, make_seq_data_pkt, run_sender
+
+
+def handle_CLI():
+    """Reads command line arguments to get the sweep grid and the link impairments"""
+    parser = argparse.ArgumentParser(description="Loss sweep over the in-process channel emulator (virtual time)")
+    parser.add_argument("-i", "--input_file", default="megamind",
+                        help="Image base name to send (no extension)")
+    parser.add_argument("-b", "--bytes", default=None, type=int,
+                        help="Only send the first BYTES bytes of the image")
+    parser.add_argument("-m", "--modes", default=[RDT22_MODE, GBN_MODE, SR_MODE], type=int, nargs="+",
+                        help="Transport protocols: 1=RDT 2.2, 2=Go-Back-N, 3=Selective Repeat")
+    parser.add_argument("-s", "--scenarios", default=[NO_LOSS, TX_ACK_LOSS, RX_DATA_LOSS], type=int, nargs="+",
+                        help="Data transfer scenarios: 1=NO_LOSS, 2=TX_ACK_LOSS, 3=RX_DATA_LOSS")
+    parser.add_argument("-l", "--losses", default=list(range(0, 61, 5)), type=int, nargs="+",
+                        help="Loss percentages for the lossy scenarios")
+    parser.add_argument("-n", "--iterations", default=NUM_ITER, type=int,
+                        help="Transfers per grid point, each with its own seed")
+    parser.add_argument("-w", "--window", default=WINDOW_SIZE, type=int,
+                        help="Window size in frames for the pipelined protocols")
+    parser.add_argument("-f", "--frame_size", default=FRAME_SIZE, type=int,
+                        help="Datagram size of a data frame in bytes")
+    parser.add_argument("-c", "--checksum", default=XOR16, type=int, choices=sorted(CHECKSUM_ALGOS),
+                        help="Checksum for the pipelined protocols: 0=XOR16, 1=INET16 (RFC 1071), 2=CRC32")
+    parser.add_argument("--seed", default=0, type=int, help="Base seed, the sweep is repeatable for a given seed")
+    parser.add_argument("--fec", default=None, type=int,
+                        help="Selective Repeat with one XOR parity frame per this many data frames (1-16), 0 adapts "
+                             "the blocks to the observed loss; rows are labelled sr+fec so they plot separately")
+    parser.add_argument("--aimd", action="store_true",
+                        help="AIMD congestion control in the pipelined protocols, rows are labelled e.g. gbn+aimd")
+    parser.add_argument("--link_loss", default=0.0, type=float, help="Probability a datagram is dropped")
+    parser.add_argument("--link_corrupt", default=0.0, type=float, help="Probability a datagram has a bit flipped")
+    parser.add_argument("--delay", default=0.0005, type=float, help="One-way delay in seconds")
+    parser.add_argument("--jitter", default=0.0, type=float, help="Uniform extra delay in seconds")
+    parser.add_argument("--duplicate", default=0.0, type=float, help="Probability a datagram is delivered twice")
+    parser.add_argument("--reorder", default=0.0, type=float, help="Probability a datagram is held back")
+    parser.add_argument("--bandwidth", default=None, type=float, help="Link rate in bytes per second")
+    add_impairment_args(parser, seed=False)
+    args = parser.parse_args()
+    link = LinkConfig(
+        loss=args.link_loss,
+        corrupt=args.link_corrupt,
+        delay=args.delay,
+        jitter=args.jitter,
+        duplicate=args.duplicate,
+        reorder=args.reorder,
+        bandwidth=args.bandwidth,
+    )
+    return args, link, impairment_from_args(args)
+
+
+class ImageCollector:
+    """Callback counterpart of receiver_app.receive_one_image: the first frame carries the packet count"""
+
+    def __init__(self):
+        self.num_pkts: int | None = None
+        self.codec = NO_COMPRESSION
+        self.chunks: list[bytes] = []
+
+    def add(self, pkt: DataPacketView | SeqDataPacketView):
+        if self.num_pkts is None:
+            self.num_pkts, self.codec, _, _ = parse_session_header(pkt.data)
+        elif len(self.chunks) < self.num_pkts:
+            self.chunks.append(bytes(pkt.data))
+
+    def image(self) -> bytes | None:
+        if self.num_pkts is None or len(self.chunks) < self.num_pkts:
+            return None
+        return decompress(b"".join(self.chunks), self.codec)
+
+
+def simulate_transfer(
+    packets: list,
+    bytes_image: bytes,
+    mode: int,
+    scenario: int,
+    loss: float,
+    window: int = WINDOW_SIZE,
+    frame_size: int = FRAME_SIZE,
+    link: LinkConfig = LinkConfig(),
+    seed: int = 0,
+    impairment: ImpairmentSpec = ImpairmentSpec(),
+    fec: int | None = None,
+    congestion: bool = False,
+) -> tuple[float, dict]:
+    """Sends pre-built packets over an emulated link in virtual time. The scenario impairments are seeded from seed
+    too. Returns the simulated transfer time in seconds and the sender's statistics, plus whether the image
+    arrived intact (a weak checksum can let corrupted frames through)."""
+    impairment = dataclasses.replace(impairment, seed=seed)
+    network = EmulatedNetwork(seed)
+    network.default_link = link
+    collector = ImageCollector()
+
+    def deliver():
+        # Let the receiver handle everything that arrived, it raises timeout once nothing is left
+        while True:
+            try:
+                pkt = receiver.get_data_pkt()
+            except soc.timeout:
+                return
+            if pkt is not None:
+                collector.add(pkt)
+
+    rx_sock = EmulatedSocket(network, on_receive=deliver)
+    rx_sock.bind((RX_ADDR, RX_PORT))
+    receiver = make_receiver(rx_sock, mode, scenario, loss, window, frame_size, impairment)
+
+    tx_sock = EmulatedSocket(network)
+    clock = network.clock.monotonic
+    sender = make_sender(tx_sock, mode, scenario, loss, window, clock, impairment, fec=fec, congestion=congestion)
+
+    start = clock()
+    run_sender(sender, packets)
+    seconds = clock() - start
+
+    stats = sender.get_stats()
+    stats["intact"] = collector.image() == bytes_image
+    return seconds, stats
+
+
+if __name__ == "__main__":
+    args, link, impairment = handle_CLI()
+    bytes_image = image_file_2_bytes(args.input_file)[: args.bytes]
+
+    results_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+    os.makedirs(results_folder, exist_ok=True)
+    out_path = os.path.join(results_folder, "sim_sweep.csv")
+
+    rows = []
+    wall_start = time.perf_counter()
+    for mode in args.modes:
+        fec = args.fec if mode == SR_MODE else None
+        congestion = args.aimd and mode in (GBN_MODE, SR_MODE)
+        name = mode_name(mode, fec, congestion=congestion)
+        # Frames never change within a mode, so they are built once
+        if mode in (GBN_MODE, SR_MODE):
+            packets = make_seq_data_pkt(bytes_image, 0, args.checksum, frame_size=args.frame_size)
+        else:
+            packets = make_data_pkt(bytes_image, frame_size=args.frame_size)
+
+        for scenario in args.scenarios:
+            for loss in [0] if scenario == NO_LOSS else args.losses:
+                for iter in range(args.iterations):
+                    seed = hash((args.seed, mode, scenario, loss, iter)) & 0xFFFFFFFF
+                    seconds, stats = simulate_transfer(
+                        packets,
+                        bytes_image,
+                        mode,
+                        scenario,
+                        loss / 100.0,
+                        args.window,
+                        args.frame_size,
+                        link,
+                        seed,
+                        impairment,
+                        fec,
+                        congestion,
+                    )
+                    rows.append(
+                        [name, SCENARIO_NAMES[scenario], loss, iter, seed, seconds,
+                         stats["frames_sent"], stats["retransmissions"], stats["timeouts"], stats["intact"]]
+                    )
+                point = rows[-args.iterations :]
+                corrupted = sum(not row[9] for row in point)
+                print(
+                    f"{name:>5} {SCENARIO_NAMES[scenario]:>12} loss={loss:>2}%: "
+                    f"{sum(row[5] for row in point) / args.iterations:8.3f} s simulated"
+                    + (f", {corrupted} corrupted image(s)" if corrupted else "")
+                )
+    wall = time.perf_counter() - wall_start
+
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["mode", "scenario", "loss", "iter", "seed", "seconds", "frames_sent", "retransmissions",
+                         "timeouts", "intact"])
+        writer.writerows(rows)
+
+    print(f"\n{len(rows)} transfers in {wall:.2f} s wall time ({len(rows) / wall:.1f} transfers/s), "
+          f"results in {out_path}")
@@ -0,0 +1,194 @@
+import socket as soc
+from collections import deque
+
+from bulk_io import BatchReceiver, BatchSender, receive_capacity
+from checksum import XOR16
+from constants import *
+from fec import FecDecoder
+from impairments import ImpairmentSpec
+from Packets import FinPacket, ParityPacket, ReportPacket, SeqAckPacket, SeqDataPacket, SeqDataPacketView
+
+def udt_rcv(rx: BatchReceiver) -> tuple[bytes, tuple[str, int]]:
+    # use recvfrom on UDP, frames that arrived together come from one system call; the address is where ACKs go
+    return rx.recvfrom()
+
+
+def udt_send(out: BatchSender, pkt: bytes, addr: tuple[str, int] | None):
+    # send ACKs back to the sender (not RX_ADDR/RX_PORT), they leave on out.flush()
+    if addr is not None:
+        out.sendto(pkt, addr)
+
+
+class SRReceiver:
+    """Selective Repeat receiver: ACKs every frame in the window individually and buffers
+    out of order frames until the gap before them is filled"""
+
+    def __init__(
+        self,
+        sock: soc.socket,
+        scenario: int,
+        loss_rate: float,
+        window: int = WINDOW_SIZE,
+        frame_size: int = FRAME_SIZE,
+        impairment: ImpairmentSpec = ImpairmentSpec(),
+        batch: bool = True,
+    ):
+        self.sock = sock
+        self.peer: tuple[str, int] | None = None  # Where ACKs go: the sender of the last datagram
+        self.frame_size = frame_size  # Frames of the session are at most this long
+        self.rx = BatchReceiver(sock, frame_size, enabled=batch)
+        self.out = BatchSender(sock, enabled=batch)  # ACKs for a burst of frames go back together
+        self.capacity = receive_capacity(sock, frame_size)  # Frames the socket buffer holds
+        self.window = window
+        self.rcv_base = 0  # Oldest sequence number not yet delivered
+        self.reorder_buffer: dict[int, SeqDataPacketView] = {}  # frames received ahead of rcv_base
+        self.ready: deque[SeqDataPacketView] = deque()  # in-order frames waiting for the application
+        self.epoch: int | None = None  # Epoch of the transfer currently being received
+        self.transfer_peer: tuple[str, int] | None = None  # Sender of the transfer currently being received
+        self.start_data: bytes | None = None  # Its count frame's payload, with the session nonce in it
+        self.checksum_algo = XOR16  # ACKs use the checksum the sender picked for the transfer
+        self.completed: ReportPacket | None = None  # Report of the last complete transfer, sent back on FIN
+        self.frames_received = 0  # Valid data frames, duplicates included
+        self.duplicates = 0
+        self.corrupt = 0
+        self.fec = FecDecoder()  # Rebuilds lost frames when the sender adds parity frames
+        self.recovered = 0  # Frames rebuilt from parity instead of received
+        self.scenario = scenario
+        # normalize to 0..1 if 0..100 was passed
+        self.loss_rate = loss_rate if 0.0 <= loss_rate <= 1.0 else max(0.0, min(1.0, loss_rate / 100.0))
+        # Middle bit flips land in the DATA area, avoiding the header and the checksum
+        self.impairment = impairment.build(self.loss_rate, SeqDataPacket.HEADER_LENGTH, 2)
+
+    def get_data_pkt(self) -> SeqDataPacketView | None:
+        "Called by application to get the next in-order frame, returns None if nothing can be delivered yet"
+        if self.ready:
+            return self.ready.popleft()
+
+        rcvpkt, self.peer = udt_rcv(self.rx)
+        data = self.__handle(rcvpkt)
+        if not self.rx.has_pending():
+            self.out.flush()  # The burst is handled, one call ACKs all of it
+        return data
+
+    def __handle(self, rcvpkt: bytes) -> SeqDataPacketView | None:
+
+        # The sender is done and wants the report, control packets skip the impairments
+        if FinPacket.is_fin(rcvpkt):
+            self.__answer_fin(FinPacket.packet_from_bytes(rcvpkt))
+            return None
+
+        rcvpkt = self.__corrupt_data_bytes(rcvpkt)
+        if rcvpkt is None:
+            return None  # Dropped on the way, as if it never arrived
+
+        if ParityPacket.is_parity(rcvpkt):
+            self.__handle_parity(rcvpkt)
+            return self.ready.popleft() if self.ready else None
+
+        # Validates the checksum once and views the payload in place
+        data = SeqDataPacketView.from_bytes(rcvpkt, self.frame_size)
+        if data is None:
+            self.corrupt += 1
+            return None  # No NAKs, the sender's timer for this frame will fire
+        self.frames_received += 1
+
+        if data.is_start and self.__is_new_transfer(data):
+            # First frame of a new transfer
+            self.epoch = data.epoch
+            self.transfer_peer = self.peer
+            self.start_data = bytes(data.data)
+            self.checksum_algo = data.checksum_algo
+            self.rcv_base = 0
+            self.reorder_buffer.clear()
+            self.fec.reset()
+        elif data.epoch != self.epoch or self.peer != self.transfer_peer:
+            # Either a straggler from an older transfer or the new transfer lost its first frame. Not even an
+            # ACK: the old transfer's window may cover its sequence number
+            return None
+
+        seq = data.seq_num
+        if self.rcv_base <= seq < self.rcv_base + self.window:
+            self.__send_ack(seq)
+            if seq in self.reorder_buffer:
+                self.duplicates += 1
+            else:
+                self.reorder_buffer[seq] = data
+                self.__add_recovered(self.fec.add_data(seq, data.data))
+            self.__release()
+
+        elif self.rcv_base - self.window <= seq < self.rcv_base:
+            # Already delivered, our ACK must have been lost
+            self.duplicates += 1
+            self.__send_ack(seq)
+
+        if self.ready:
+            return self.ready.popleft()
+        return None
+
+    def get_stats(self) -> dict:
+        """Receiver side counters of the transfers so far"""
+        return {
+            "frames_received": self.frames_received,
+            "duplicates": self.duplicates,
+            "corrupt": self.corrupt,
+            "recovered": self.recovered,
+            "syscalls": self.rx.syscalls + self.out.syscalls,
+        }
+
+    def __is_new_transfer(self, start: SeqDataPacketView) -> bool:
+        # Another epoch, another sender, or another session from the same one (a resent start frame of the
+        # current transfer is an exact copy)
+        return start.epoch != self.epoch or self.peer != self.transfer_peer or start.data != self.start_data
+
+    def __handle_parity(self, rcvpkt: bytes):
+        parity = ParityPacket.packet_from_bytes(rcvpkt, self.frame_size)
+        if parity is None:
+            self.corrupt += 1
+            return
+        if self.epoch is None or parity.epoch != self.epoch or self.peer != self.transfer_peer:
+            return  # Belongs to another transfer
+        self.__add_recovered(self.fec.add_parity(parity))
+        self.__release()
+
+    def __add_recovered(self, recovered: list[tuple[int, bytes]]):
+        # Rebuilt frames are ACKed like received ones, flagged so the sender can tell how lossy the path is
+        flags = SeqDataPacket.FLAG_EPOCH if self.epoch else 0
+        for seq, payload in recovered:
+            if not self.rcv_base <= seq < self.rcv_base + self.window or seq in self.reorder_buffer:
+                continue
+            frame = SeqDataPacket(payload, seq, flags, self.checksum_algo, False, self.frame_size)
+            self.reorder_buffer[seq] = SeqDataPacketView.from_bytes(frame.full_pkt, self.frame_size)
+            self.recovered += 1
+            self.__send_ack(seq, SeqAckPacket.FLAG_RECOVERED)
+
+    def __release(self):
+        # Release every frame that is now in order
+        while self.rcv_base in self.reorder_buffer:
+            self.ready.append(self.reorder_buffer.pop(self.rcv_base))
+            self.rcv_base += 1
+        self.fec.advance(self.rcv_base)
+
+    def __answer_fin(self, fin: FinPacket):
+        # Only the transfer the FIN is about (same epoch and session nonce) gets a report, others go unanswered
+        completed = self.completed
+        if completed is not None and completed.epoch == fin.epoch and completed.session == fin.session:
+            udt_send(self.out, completed.to_bytes(), self.peer)
+
+    def __send_ack(self, seq: int, flags: int = 0):
+        if self.epoch:
+            flags |= SeqAckPacket.FLAG_EPOCH
+        # Advertise the room left: the socket buffer less the frames drained but not handled yet, buffered out
+        # of order, or in order but not taken by the application
+        window = self.capacity - self.rx.backlog() - len(self.reorder_buffer) - len(self.ready)
+        udt_send(self.out, SeqAckPacket(seq, flags, self.checksum_algo, window).to_bytes(), self.peer)
+
+    def __corrupt_data_bytes(self, rx_bytes: bytes) -> bytes | None:
+        """Impairs data packets depending on the scenario and loss rate, returns None if the packet was dropped"""
+        if self.scenario == NO_LOSS:
+            return rx_bytes
+        elif self.scenario == TX_ACK_LOSS:
+            return rx_bytes
+        elif self.scenario == RX_DATA_LOSS:
+            return self.impairment.apply(rx_bytes)
+        else:
+            raise NotImplementedError
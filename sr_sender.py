@@ -0,0 +1,259 @@
+import heapq
+import socket as soc
+import time
+from typing import Callable
+
+from bulk_io import BatchReceiver, BatchSender
+from congestion import AIMDWindow
+from constants import *
+from fec import FecEncoder
+from impairments import ImpairmentSpec
+from pacing import TokenBucket
+from Packets import ParityPacket, SeqAckPacket, SeqDataPacket
+from rto import RTOEstimator
+
+
+def udt_rcv(rx: BatchReceiver) -> bytes:
+    # Use recvfrom on UDP (works without connect()), ACKs that arrived together come from one system call
+    data, _ = rx.recvfrom()
+    return data
+
+
+def udt_send(out: BatchSender, pkt: bytes, addr: tuple[str, int] = (RX_ADDR, RX_PORT)):
+    out.sendto(pkt, addr)  # Leaves with the rest of the batch on out.flush()
+
+
+class SRSender:
+    """Selective Repeat sender: up to `window` frames in flight, individual ACKs and a retransmission
+    deadline per frame. The deadlines live in a single heap so only the earliest one drives the socket timeout."""
+
+    def __init__(
+        self,
+        sock: soc.socket,
+        scenario: int,
+        loss_rate: float,
+        window: int = WINDOW_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+        impairment: ImpairmentSpec = ImpairmentSpec(),
+        dest: tuple[str, int] = (RX_ADDR, RX_PORT),
+        batch: bool = True,
+        fec: int | None = None,
+        congestion: bool = False,
+        pacer: TokenBucket | None = None,
+    ):
+        self.sock = sock
+        # Frames queue up here until the sender waits for an ACK, resends wait for the pacer's tokens in sendto()
+        self.out = BatchSender(sock, enabled=batch, pacer=pacer)
+        self.pacer = pacer  # Spaces new frames out to a rate, None sends them as soon as the window allows
+        self.paced_len: int | None = None  # Length of the frame rdt_send() last held back for the pacer
+        self.acks = BatchReceiver(sock, 1024, enabled=batch)
+        self.dest = dest  # Address of the receiver
+        self.clock = clock  # Time source for RTT samples and timers, swapped for a virtual clock in simulation
+        self.rto = RTOEstimator()  # resend a frame if it isn't ACKed in time
+        self.window = window
+        self.rwnd = window  # Receiver's advertised window, from the latest ACK that carried one
+        self.cc = AIMDWindow(window) if congestion else None  # Congestion window, None keeps the fixed window
+        self.base = 0  # Oldest unACKed sequence number
+        self.next_seq = 0  # Sequence number of the next frame handed to rdt_send
+        self.unacked: dict[int, SeqDataPacket] = {}  # buffer of frames in flight
+        self.deadlines: dict[int, float] = {}  # current retransmission deadline of each frame in flight
+        self.sent_times: dict[int, float] = {}  # first transmission time of frames never resent
+        self.timers: list[tuple[float, int]] = []  # heap of (deadline, seq), may hold stale entries
+        self.epoch: int | None = None
+        self.scenario = scenario
+        # Normalize loss_rate to 0..1 if user passes 0..100
+        self.loss_rate = loss_rate if 0.0 <= loss_rate <= 1.0 else max(0.0, min(1.0, loss_rate / 100.0))
+        self.impairment = impairment.build(self.loss_rate)  # Applied to incoming ACKs in TX_ACK_LOSS
+        # One parity frame per block of fec frames (FEC_ADAPTIVE sizes them from the loss), None sends none
+        self.fec = FecEncoder(fec) if fec is not None else None
+        self.sent_since_input = False  # New frames went out since the last input(), the FEC block may grow
+
+        self.frames_sent = 0
+        self.retransmissions = 0
+        self.timeouts = 0
+        self.parity_sent = 0
+
+    def can_send(self) -> bool:
+        """True if the window has room for another frame"""
+        return self.next_seq < self.base + self.send_window()
+
+    def send_window(self) -> int:
+        """Frames allowed past the oldest unACKed one: the configured window, capped by the receiver's advertised
+        window and the congestion window. Never below one, so a closed advertised window is probed with a single
+        frame."""
+        window = min(self.window, self.rwnd)
+        if self.cc is not None:
+            window = min(window, self.cc.window)
+        return max(1, window)
+
+    def in_flight(self) -> int:
+        """Number of frames sent but not yet ACKed"""
+        return len(self.unacked)
+
+    def rdt_send(self, curr_packet: SeqDataPacket) -> bool:
+        """Called by application to send one frame, returns False if the window is full or the pacer holds
+        the frame back; input() then also waits for the pacer"""
+        self.paced_len = None
+        if not self.can_send():
+            return False
+        if self.pacer is not None and self.pacer.delay(len(curr_packet.full_pkt)) > 0:
+            self.paced_len = len(curr_packet.full_pkt)
+            return False
+
+        if curr_packet.seq_num != self.next_seq:
+            raise ValueError(f"Expected frame {self.next_seq}, got {curr_packet.seq_num}")
+
+        if self.epoch is None:
+            self.epoch = curr_packet.epoch
+
+        self.unacked[curr_packet.seq_num] = curr_packet
+        self.__transmit(curr_packet)
+        self.sent_times[curr_packet.seq_num] = self.clock()
+        self.next_seq += 1
+        if self.fec is not None:
+            self.__send_parity(self.fec.add(curr_packet))
+            self.sent_since_input = True
+        return True
+
+    def input(self) -> bool:
+        """Called to wait for one ACK (or the earliest timer), returns True if any frame was resent"""
+        if self.fec is not None:
+            if not self.sent_since_input:
+                # Nothing new since the last wait (end of the data or a full window), protect the partial block
+                self.__send_parity([self.fec.flush()])
+            self.sent_since_input = False
+        self.out.flush()
+        # Throw away timers of frames that were ACKed or rescheduled since they were pushed
+        while self.timers and self.deadlines.get(self.timers[0][1]) != self.timers[0][0]:
+            heapq.heappop(self.timers)
+
+        if not self.timers:
+            if self.paced_len is not None:
+                self.pacer.wait(self.paced_len)  # Nothing in flight, no ACK to read meanwhile
+            return False
+
+        remaining = self.timers[0][0] - self.clock()
+        # ACKs are read while a held back frame waits for the pacer, the wait ends when it may leave
+        wait = remaining if self.paced_len is None else min(remaining, self.pacer.delay(self.paced_len))
+        try:
+            if wait <= 0:
+                raise soc.timeout
+            self.sock.settimeout(wait)
+            rcvpkt = udt_rcv(self.acks)
+        except soc.timeout:
+            if wait < remaining:
+                return False  # The held back frame may leave, no timer expired
+            # The deadline may have passed while we were sending or pacing, with the ACKs already waiting
+            self.__drain_acks()
+            return self.__resend_expired()
+
+        self.__handle_ack(rcvpkt)
+        return False
+
+    def __drain_acks(self):
+        # Handles every ACK that has already arrived without blocking, so only frames still unACKed are resent
+        self.sock.settimeout(0)
+        while True:
+            try:
+                rcvpkt = udt_rcv(self.acks)
+            except (soc.timeout, BlockingIOError):
+                return
+            self.__handle_ack(rcvpkt)
+
+    def __handle_ack(self, rcvpkt: bytes):
+        rcvpkt = self.__corrupt_ACK_bytes(rcvpkt)
+        if rcvpkt is None:
+            return  # Dropped on the way, the timer keeps running
+
+        if SeqAckPacket.is_corrupt(rcvpkt):
+            return  # Ignore corrupt ACKs, the frame's timer will take care of it
+
+        ack = SeqAckPacket.packet_from_bytes(rcvpkt)
+        if ack is None or ack.epoch != self.epoch:
+            return  # Stale ACK from a previous transfer
+
+        if ack.window is not None:
+            self.rwnd = ack.window
+
+        # Individual ACK: only this frame is confirmed
+        if ack.seq_num in self.unacked:
+            del self.unacked[ack.seq_num]
+            del self.deadlines[ack.seq_num]
+            if self.cc is not None:
+                self.cc.on_ack()
+
+            # Karn's algorithm: only time frames that were sent exactly once
+            sent_time = self.sent_times.pop(ack.seq_num, None)
+            if sent_time is not None:
+                self.rto.sample(self.clock() - sent_time)
+                if self.fec is not None:
+                    self.fec.observe(ack.recovered)  # Resent frames were counted as lost when they timed out
+            self.rto.reset_backoff()
+
+            # Slide the window up to the oldest frame still in flight
+            while self.base < self.next_seq and self.base not in self.unacked:
+                self.base += 1
+
+    def __transmit(self, pkt: SeqDataPacket):
+        udt_send(self.out, pkt.full_pkt, self.dest)
+        self.frames_sent += 1
+
+        deadline = self.clock() + self.rto.rto
+        self.deadlines[pkt.seq_num] = deadline
+        heapq.heappush(self.timers, (deadline, pkt.seq_num))
+
+    def get_stats(self) -> dict:
+        """Per-transfer statistics, RTO/SRTT in seconds"""
+        return {
+            "frames_sent": self.frames_sent,
+            "retransmissions": self.retransmissions,
+            "timeouts": self.timeouts,
+            "rto": self.rto.rto,
+            "srtt": self.rto.srtt,
+            "syscalls": self.out.syscalls + self.acks.syscalls,
+            "parity_sent": self.parity_sent,
+            "rwnd": self.rwnd,
+            "cwnd": self.cc.cwnd if self.cc is not None else None,
+        }
+
+    def __send_parity(self, parities: list[ParityPacket | None]):
+        # Parity frames are never ACKed or resent, a lost one just leaves its block to the timers
+        for parity in parities:
+            if parity is not None:
+                udt_send(self.out, parity.full_pkt, self.dest)
+                self.parity_sent += 1
+
+    def __resend_expired(self) -> bool:
+        # Returns True if any frame was resent, none is when the ACKs drained before covered them all
+        expired = False
+        now = self.clock()
+        while self.timers and self.timers[0][0] <= now:
+            deadline, seq = heapq.heappop(self.timers)
+            if self.deadlines.get(seq) != deadline:
+                continue  # Stale timer
+            if not expired:
+                # One backoff per timer expiry, however many frames expired together
+                self.timeouts += 1
+                self.rto.backoff()
+                expired = True
+            first_loss = self.sent_times.pop(seq, None) is not None
+            if self.cc is not None and self.cc.is_new_loss(seq):
+                self.cc.on_loss(self.next_seq)
+            self.__transmit(self.unacked[seq])
+            self.retransmissions += 1
+            if self.fec is not None and first_loss:
+                self.fec.observe(True)  # Once per frame, however often it times out
+        self.out.flush()
+        return expired
+
+    def __corrupt_ACK_bytes(self, rx_bytes: bytes) -> bytes | None:
+        """Impairs ACK packets depending on the scenario and loss rate, returns None if the ACK was dropped"""
+
+        if self.scenario == NO_LOSS:
+            return rx_bytes
+        elif self.scenario == TX_ACK_LOSS:
+            return self.impairment.apply(rx_bytes)
+        elif self.scenario == RX_DATA_LOSS:
+            return rx_bytes
+        else:
+            raise NotImplementedError
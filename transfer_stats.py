@@ -0,0 +1,54 @@
+from bisect import bisect_left
+
+# RTT histogram bucket upper bounds in seconds, doubling from 100 us to about 3.3 s, plus one overflow bucket
+RTT_BUCKETS = tuple(0.0001 * 2**k for k in range(16))
+
+
+class SenderStats:
+    """Detailed per-transfer counters a sender keeps only when handed one. The senders always count frames,
+    retransmissions and timeouts; this adds why frames were resent, what happened to the ACKs, the RTT
+    distribution and the bytes spent on padding. Without it the hot path pays one `is None` check per event."""
+
+    __slots__ = (
+        "bytes_sent",
+        "padding_bytes",
+        "resent_timeout",
+        "resent_corrupt_ack",
+        "resent_duplicate_ack",
+        "acks_received",
+        "acks_dropped",
+        "rtt_histogram",
+    )
+
+    def __init__(self):
+        self.bytes_sent = 0  # Datagram bytes, retransmissions included
+        self.padding_bytes = 0  # Of those, bytes of zero padding
+        self.resent_timeout = 0
+        self.resent_corrupt_ack = 0  # Corrupt or not an ACK at all
+        self.resent_duplicate_ack = 0  # ACK for the other sequence number
+        self.acks_received = 0  # Datagrams read while waiting, whatever they were
+        self.acks_dropped = 0  # Dropped by the TX_ACK_LOSS impairment
+        self.rtt_histogram = [0] * (len(RTT_BUCKETS) + 1)
+
+    def add_rtt(self, rtt: float):
+        self.rtt_histogram[bisect_left(RTT_BUCKETS, rtt)] += 1
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ReceiverStats:
+    """Detailed counters a receiver keeps only when handed one, on top of its frame/duplicate/corrupt counts"""
+
+    __slots__ = ("bytes_received", "padding_bytes", "acks_sent", "reacks", "dropped", "fins")
+
+    def __init__(self):
+        self.bytes_received = 0  # Datagram bytes of valid data frames
+        self.padding_bytes = 0  # Of those, bytes of zero padding
+        self.acks_sent = 0  # ACKs for new frames
+        self.reacks = 0  # Last good ACK sent again for a corrupt or duplicate frame
+        self.dropped = 0  # Dropped by the RX_DATA_LOSS impairment
+        self.fins = 0  # FINs received
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}